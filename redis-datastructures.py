@@ -1,23 +1,29 @@
-import redis
 import os
+import time
+import random
+import argparse
 from dotenv import load_dotenv
+from redis_near_cache import NearCache, format_stats
+from redis_connection import get_client
+from redis_leaderboard import Leaderboard
 
 # Connect to Redis with username and password authentication
 load_dotenv()  # Loads variables from .env
 
-r = redis.Redis(
-    host=os.getenv('REDIS_HOST'),
-    port=os.getenv('REDIS_PORT'),
-    username=os.getenv('REDIS_USERNAME'), 
-    password=os.getenv('REDIS_PASSWORD'),
-    decode_responses=True
-)
+# WORKSHOP_HEADLESS=1 skips pauses and screen clears, so the demo can run unattended
+HEADLESS = os.getenv('WORKSHOP_HEADLESS') == '1'
+
+r = get_client()
 
 def wait_for_user(command="continue"):
+    if HEADLESS:
+        return
     input("\nPress Enter to "+ command +"...\n")
     clear_screen()
 
 def clear_screen():
+    if HEADLESS:
+        return
     if os.name == 'nt':  # Windows
         os.system('cls')
     else:                # Linux, macOS, and others
@@ -123,15 +129,22 @@ def demo_sorted_set():
         'Dave': 2000
     }
     r.delete('game:leaderboard')
-    for player, score in leaderboard.items():
-        r.zadd('game:leaderboard', {player: score})
+    board = Leaderboard(r, 'game:leaderboard', windows=False)
+    board.submit(leaderboard)
     print("\n\n\n\n\n'game:leaderboard' added to Redis DB")
     wait_for_user()
 
-    print("\n\n\n\n\n Now lets View our Full leaderboard (highest to lowest):")
+    print("\n\n\n\n\n Now lets View the top of our leaderboard (highest to lowest), one page at a time:")
     wait_for_user("View the Leaderboard")
-    board = r.zrevrange('game:leaderboard', 0, -1, withscores=True)
-    for rank, (player, score) in enumerate(board, start=1):
+    for rank, player, score in board.page(0, page_size=10):
+        print(f"{rank}. {player} - {score}")
+
+    wait_for_user()
+    print("\n\n\n\n\nOn a board with millions of players we show a player's rank and their neighbours instead")
+    wait_for_user("Get Alice's rank with one player on each side")
+    around = board.around('Alice', radius=1)
+    print(f"\n\n\n\n\nAlice is ranked #{around['rank']} with {around['score']}")
+    for rank, player, score in around['neighbours']:
         print(f"{rank}. {player} - {score}")
 
     wait_for_user()
@@ -151,9 +164,11 @@ def demo_bitmap():
         r.setbit('user:attendance', day, 1)
     wait_for_user()
 
-    print("GET attendance bitmap bits for days 0 to 6:")
-    attendance = [r.getbit('user:attendance', day) for day in range(7)]
+    print("GET attendance bitmap bits for days 0 to 6 with a single BITFIELD read:")
+    (week,) = r.bitfield('user:attendance').get('u7', 0).execute()
+    attendance = [(week >> (6 - day)) & 1 for day in range(7)]
     print(f"Attendance bits: {attendance}")
+    print(f"Days present (BITCOUNT): {r.bitcount('user:attendance')}")
 
     print("\nCheck if user was present on day 3 (0-based):")
     day3 = r.getbit('user:attendance', 3)
@@ -165,8 +180,8 @@ def demo_hyperloglog():
     print("Let's approximate the unique visitors on a website.")
     r.delete('unique_visitors')
     visitors = ['user1', 'user2', 'user3', 'user2', 'user4', 'user1', 'user5']
-    for visitor in visitors:
-        r.pfadd('unique_visitors', visitor)
+    # One variadic PFADD instead of a round trip per visitor
+    r.pfadd('unique_visitors', *visitors)
     wait_for_user()
 
     print("Approximate unique visitor count:")
@@ -174,7 +189,139 @@ def demo_hyperloglog():
     print(f"Unique visitors: {count}")
     wait_for_user()
 
+# =================== Bulk mode ===================
+# Non-interactive loaders that time the per-element commands used by the demos
+# above against variadic commands sent in pipelines.
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def pipelined(items, batch, send):
+    # send(pipe, chunk) queues one variadic command per chunk; the pipeline is flushed every 100 commands
+    pipe = r.pipeline(transaction=False)
+    for chunk in chunks(items, batch):
+        send(pipe, chunk)
+        if len(pipe) >= 100:
+            pipe.execute()
+    pipe.execute()
+
+def bulk_list(items, batch):
+    pipelined(items, batch, lambda p, c: p.rpush('bulk:searches', *c))
+
+def naive_list(items):
+    for item in items:
+        r.rpush('bulk:searches', item)
+
+def bulk_set(items, batch):
+    pipelined(items, batch, lambda p, c: p.sadd('bulk:post:tags', *c))
+
+def naive_set(items):
+    for tag in items:
+        r.sadd('bulk:post:tags', tag)
+
+def bulk_sorted_set(items, batch):
+    pipelined(items, batch, lambda p, c: p.zadd('bulk:game:leaderboard', dict(c)))
+
+def naive_sorted_set(items):
+    for player, score in items:
+        r.zadd('bulk:game:leaderboard', {player: score})
+
+def bulk_bitmap(items, batch):
+    # One BITFIELD carries many single-bit SETs; the read-back uses BITFIELD GETs the same way
+    def write(p, offsets):
+        bf = p.bitfield('bulk:user:attendance')
+        for offset in offsets:
+            bf.set('u1', offset, 1)
+        bf.execute()
+
+    def read(p, offsets):
+        bf = p.bitfield('bulk:user:attendance')
+        for offset in offsets:
+            bf.get('u1', offset)
+        bf.execute()
+    pipelined(items, batch, write)
+    pipelined(items, batch, read)
+
+def naive_bitmap(items):
+    for day in items:
+        r.setbit('bulk:user:attendance', day, 1)
+    for day in items:
+        r.getbit('bulk:user:attendance', day)
+
+def bulk_hyperloglog(items, batch):
+    pipelined(items, batch, lambda p, c: p.pfadd('bulk:unique_visitors', *c))
+
+def naive_hyperloglog(items):
+    for visitor in items:
+        r.pfadd('bulk:unique_visitors', visitor)
+
+def bulk_datasets(size, seed):
+    rng = random.Random(seed)
+    return {
+        'list': ([f"search query {i}" for i in range(size)], 'bulk:searches', naive_list, bulk_list),
+        'set': ([f"tag:{rng.randrange(size)}" for _ in range(size)], 'bulk:post:tags', naive_set, bulk_set),
+        'sorted_set': ([(f"player:{i}", rng.randint(0, 1000000)) for i in range(size)],
+                       'bulk:game:leaderboard', naive_sorted_set, bulk_sorted_set),
+        'bitmap': ([rng.randrange(size * 8) for _ in range(size)], 'bulk:user:attendance', naive_bitmap, bulk_bitmap),
+        'hyperloglog': ([f"user{rng.randrange(size)}" for _ in range(size)],
+                        'bulk:unique_visitors', naive_hyperloglog, bulk_hyperloglog),
+    }
+
+def timed_rate(fn, count):
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+def run_bulk(args):
+    print(f"Bulk mode: {args.size} elements per structure, {args.batch} elements per variadic command, "
+          f"naive path timed on {min(args.size, args.naive_limit)} elements\n")
+    print(f"{'structure':<12} {'naive el/s':>14} {'bulk el/s':>14} {'speedup':>9}")
+    structures = [s.strip() for s in args.structures.split(',')]
+    for name, (items, key, naive, bulk) in bulk_datasets(args.size, args.seed).items():
+        if name not in structures:
+            continue
+        sample = items[:min(len(items), args.naive_limit)]
+        # bitmap paths both write and read each element
+        ops = 2 if name == 'bitmap' else 1
+        r.delete(key)
+        naive_rate = timed_rate(lambda: naive(sample), len(sample) * ops)
+        r.delete(key)
+        bulk_rate = timed_rate(lambda: bulk(items, args.batch), len(items) * ops)
+        print(f"{name:<12} {naive_rate:>14,.0f} {bulk_rate:>14,.0f} {bulk_rate / naive_rate:>8.1f}x")
+        if not args.keep:
+            r.delete(key)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Redis Data Structures Demo")
+    parser.add_argument('--near-cache', action='store_true',
+                        help="serve GET/HGET/HGETALL from an in-process cache kept coherent with CLIENT TRACKING")
+    parser.add_argument('--near-cache-size', type=int, default=10000,
+                        help="max cached entries (default: 10000)")
+    parser.add_argument('--near-cache-ttl', type=float, default=60.0,
+                        help="seconds a cached entry may be served (default: 60)")
+    parser.add_argument('--bulk', action='store_true',
+                        help="non-interactive: load generated datasets and compare per-element vs variadic/pipelined writes")
+    parser.add_argument('--size', type=int, default=100000,
+                        help="elements per structure in bulk mode (default: 100000)")
+    parser.add_argument('--batch', type=int, default=1000,
+                        help="elements per variadic command in bulk mode (default: 1000)")
+    parser.add_argument('--naive-limit', type=int, default=10000,
+                        help="time the per-element path on at most this many elements (default: 10000)")
+    parser.add_argument('--structures', default='list,set,sorted_set,bitmap,hyperloglog',
+                        help="comma-separated structures to run in bulk mode")
+    parser.add_argument('--keep', action='store_true', help="keep the bulk:* keys after the run")
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
 def main():
+    global r
+    args = parse_args()
+    if args.near_cache:
+        r = NearCache(r, max_entries=args.near_cache_size, ttl=args.near_cache_ttl)
+    if args.bulk:
+        run_bulk(args)
+        return
     print("Welcome to Redis Data Structures Demo!\n")
     demo_string()
     demo_hash()
@@ -184,6 +331,9 @@ def main():
     # demo_bitmap()
     # demo_hyperloglog()
     print("Demo complete. Thanks for learning Redis with Python!")
+    if args.near_cache:
+        print(f"Near cache: {format_stats(r.stats())}")
+        r.close()
 
 if __name__ == '__main__':
     main()
@@ -1,29 +1,30 @@
-import redis
 import os
 from dotenv import load_dotenv
+from redis_connection import get_client
+from redis_json_docs import JsonDocuments
 
 load_dotenv()  # Loads variables from .env
 
+# WORKSHOP_HEADLESS=1 skips pauses and screen clears, so the demo can run unattended
+HEADLESS = os.getenv('WORKSHOP_HEADLESS') == '1'
+
 # --- Helper functions for pausing and clearing the terminal ---
 def wait_for_user(command="continue"):
+    if HEADLESS:
+        return
     input("\nPress Enter to " + command + "...")
     clear_screen()
 
 def clear_screen():
+    if HEADLESS:
+        return
     if os.name == 'nt':  # Windows
         os.system('cls')
     else:                # Linux, macOS, and others
         os.system('clear')
 
-clear_screen()  # Clear at the very start
-
-r = redis.Redis(
-    host=os.getenv('REDIS_HOST'),
-    port=os.getenv('REDIS_PORT'),
-    username=os.getenv('REDIS_USERNAME'),
-    password=os.getenv('REDIS_PASSWORD'),
-    decode_responses=True
-)
+r = get_client()
+docs = JsonDocuments(r)
 
 nested_json = {
     "user": {
@@ -44,40 +45,58 @@ nested_json = {
     }
 }
 
-print("=== 1. Storing nested JSON as key 'user:1002' in Redis ===")
-wait_for_user("store the JSON")
-r.json().set('user:1002', '$', nested_json)
-print("JSON document stored.")
-wait_for_user()
+def main():
+    clear_screen()  # Clear at the very start
+
+    print("=== 1. Storing nested JSON as key 'user:1002' in Redis ===")
+    wait_for_user("store the JSON")
+    r.json().set('user:1002', '$', nested_json)
+    print("JSON document stored.")
+    wait_for_user()
+
+    print("=== 2. Fetching the user's city (nested field: user.address.city) ===")
+    wait_for_user("fetch the city")
+    city = r.json().get('user:1002', '$.user.address.city')
+    print("City result:", city)
+    print("City value (first item):", city[0][0] if isinstance(city, list) and city and city[0] else city)
+    wait_for_user()
+
+    print("=== 3. Incrementing the visits count (user.stats.visits += 1) ===")
+    wait_for_user("increment visits")
+    new_visits = r.json().numincrby('user:1002', '$.user.stats.visits', 1)
+    print("Visits field after increment:", new_visits)
+    wait_for_user()
 
-print("=== 2. Fetching the user's city (nested field: user.address.city) ===")
-wait_for_user("fetch the city")
-city = r.json().get('user:1002', '$.user.address.city')
-print("City result:", city)
-print("City value (first item):", city[0][0] if isinstance(city, list) and city and city[0] else city)
-wait_for_user()
+    print("=== 4. Fetching email contacts (filtering within contacts array) ===")
+    wait_for_user("fetch email contacts")
+    email_contacts = r.json().get('user:1002', '$.user.contacts[?(@.type=="email")]')
+    print("Email contacts result:", email_contacts)
+    wait_for_user()
 
-print("=== 3. Incrementing the visits count (user.stats.visits += 1) ===")
-wait_for_user("increment visits")
-new_visits = r.json().numincrby('user:1002', '$.user.stats.visits', 1)
-print("Visits field after increment:", new_visits)
-wait_for_user()
+    print("=== 5. Updating the user's city to 'San Francisco' ===")
+    wait_for_user("update the city")
+    r.json().set('user:1002', '$.user.address.city', "San Francisco")
+    print("City updated.")
+    wait_for_user()
 
-print("=== 4. Fetching email contacts (filtering within contacts array) ===")
-wait_for_user("fetch email contacts")
-email_contacts = r.json().get('user:1002', '$.user.contacts[?(@.type=="email")]')
-print("Email contacts result:", email_contacts)
-wait_for_user()
+    print("=== 6. Fetching just the updated fields in one JSON.GET ===")
+    print("(large documents are expensive to fetch whole; ask only for the paths you need)")
+    wait_for_user("fetch the updated fields")
+    updated = docs.get_paths('user:1002', ['$.user.address.city', '$.user.stats.visits', '$.user.name'])
+    print("Updated fields:")
+    for path, value in updated.items():
+        print(f"  {path}: {value}")
+    wait_for_user()
 
-print("=== 5. Updating the user's city to 'San Francisco' ===")
-wait_for_user("update the city")
-r.json().set('user:1002', '$.user.address.city', "San Francisco")
-print("City updated.")
-wait_for_user()
+    print("=== 7. Several updates in one round trip ===")
+    wait_for_user("move Alice to Boston, count a visit and add a contact")
+    docs.update('user:1002',
+                values={'$.user.address.city': "Boston", '$.user.address.zip': "02108"},
+                increments={'$.user.stats.visits': 1},
+                appends={'$.user.contacts': [{"type": "twitter", "value": "@alice"}]})
+    print("Updated user JSON:")
+    print(r.json().get('user:1002', '$'))
+    wait_for_user("finish")
 
-print("=== 6. Fetching the entire updated user JSON ===")
-wait_for_user("fetch the complete JSON")
-updated_json = r.json().get('user:1002', '$')
-print("Updated user JSON:")
-print(updated_json)
-wait_for_user("finish")
+if __name__ == '__main__':
+    main()
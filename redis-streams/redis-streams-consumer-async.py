@@ -0,0 +1,179 @@
+import redis
+import asyncio
+import signal
+import time
+import argparse
+from dotenv import load_dotenv
+from stream_records import decode_batch
+
+load_dotenv()  # Loads variables from .env
+from stream_connection import get_async_client
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="asyncio Redis Stream CONSUMER")
+    parser.add_argument('--consumers', type=int, default=1,
+                        help="number of consumers in this process, each with its own name (default: 1)")
+    parser.add_argument('--consumer-prefix', default='async',
+                        help="consumer names are <prefix>-<n> (default: async)")
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help="max in-flight handler tasks per consumer (default: 100)")
+    parser.add_argument('--count', type=int, default=100,
+                        help="max entries per XREADGROUP call (default: 100)")
+    parser.add_argument('--block', type=int, default=1000,
+                        help="XREADGROUP block timeout in milliseconds (default: 1000)")
+    parser.add_argument('--handler-latency', type=float, default=20,
+                        help="simulated handler I/O time in milliseconds (default: 20)")
+    parser.add_argument('--ack-interval', type=float, default=0.01,
+                        help="seconds between coalesced XACK flushes (default: 0.01)")
+    parser.add_argument('--duration', type=float, default=0,
+                        help="stop after this many seconds, 0 means until Ctrl+C (default: 0)")
+    parser.add_argument('--report-interval', type=float, default=2.0,
+                        help="seconds between throughput reports (default: 2)")
+    parser.add_argument('--verbose', action='store_true',
+                        help="print every handled event")
+    return parser.parse_args()
+
+# --- Redis connection details ---
+stream_key = 'user_activity_log'
+group = 'activity_consumers'
+
+async def ensure_group(conn):
+    # Create consumer group if it doesn't exist
+    try:
+        await conn.xgroup_create(stream_key, group, id='0', mkstream=True)
+    except redis.exceptions.ResponseError as e:
+        # Ignore error if group already exists
+        if "BUSYGROUP" not in str(e):
+            raise
+
+async def handle_event(record, args):
+    # Stand-in for a handler that calls other services
+    await asyncio.sleep(args.handler_latency / 1000)
+    if args.verbose:
+        print(f"{record.id:<20} {record.user:<10} {record.action:<15} {record.time_text:<20}")
+
+class AsyncConsumer:
+    """
+    One consumer-group member. Keeps at most `concurrency` handler tasks in
+    flight, only reads as many entries as there are free slots, and acknowledges
+    entries once their handler has finished (coalesced into multi-ID XACKs).
+    """
+
+    def __init__(self, conn, name, args, stop_event):
+        self.conn = conn
+        self.name = name
+        self.args = args
+        self.stop_event = stop_event
+        self.in_flight = set()
+        self.completed = []
+        self.processed = 0
+        self.failed = 0
+
+    async def run(self):
+        acker = asyncio.create_task(self.ack_loop())
+        try:
+            while not self.stop_event.is_set():
+                free = self.args.concurrency - len(self.in_flight)
+                if free <= 0:
+                    # Backpressure: stop reading until a handler finishes
+                    await asyncio.wait(self.in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                resp = await self.conn.xreadgroup(group, self.name, {stream_key: '>'},
+                                                  count=min(self.args.count, free), block=self.args.block)
+                for record in decode_batch(resp):
+                    task = asyncio.create_task(self.run_handler(record))
+                    self.in_flight.add(task)
+                    task.add_done_callback(self.in_flight.discard)
+        finally:
+            # Drain: let in-flight handlers finish, then flush their acks
+            if self.in_flight:
+                await asyncio.gather(*self.in_flight, return_exceptions=True)
+            acker.cancel()
+            await asyncio.gather(acker, return_exceptions=True)
+            await self.flush_acks()
+
+    async def run_handler(self, record):
+        try:
+            await handle_event(record, self.args)
+        except Exception as e:
+            # Not acknowledged: the entry stays pending for the reclaimer
+            self.failed += 1
+            print(f"[{self.name}] handler failed for {record.id}: {e}")
+            return
+        self.completed.append(record.id)
+
+    async def ack_loop(self):
+        while True:
+            await asyncio.sleep(self.args.ack_interval)
+            try:
+                await self.flush_acks()
+            except redis.exceptions.RedisError as e:
+                print(f"[{self.name}] XACK failed, retrying: {e}")
+
+    async def flush_acks(self):
+        if not self.completed:
+            return
+        # Only drop IDs once XACK succeeded; handlers may append more while we wait
+        ids = self.completed[:]
+        await self.conn.xack(stream_key, group, *ids)
+        del self.completed[:len(ids)]
+        self.processed += len(ids)
+
+async def report_loop(consumers, args, start):
+    previous = [0] * len(consumers)
+    last = start
+    while True:
+        await asyncio.sleep(args.report_interval)
+        now = time.perf_counter()
+        total = 0
+        print(f"[{now - start:7.1f}s]")
+        for i, c in enumerate(consumers):
+            rate = (c.processed - previous[i]) / (now - last)
+            total += rate
+            previous[i] = c.processed
+            print(f"  {c.name:<16} {rate:>12,.0f} msg/s  in-flight {len(c.in_flight):>5}")
+        print(f"  {'aggregate':<16} {total:>12,.0f} msg/s")
+        last = now
+
+async def run(args):
+    conn = get_async_client(decode_responses=False, max_connections=args.consumers * 2 + 2, block_ms=args.block)
+    await ensure_group(conn)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGINT, stop_event.set)
+        loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+    except NotImplementedError:
+        pass  # Windows: Ctrl+C surfaces as KeyboardInterrupt instead
+    if args.duration:
+        loop.call_later(args.duration, stop_event.set)
+
+    consumers = [AsyncConsumer(conn, f"{args.consumer_prefix}-{i + 1}", args, stop_event)
+                 for i in range(args.consumers)]
+    print(f"Consuming '{stream_key}' / '{group}' with {args.consumers} async consumer(s), "
+          f"up to {args.concurrency} in-flight handlers each... Press Ctrl+C to stop.\n")
+    start = time.perf_counter()
+    reporter = asyncio.create_task(report_loop(consumers, args, start))
+    try:
+        await asyncio.gather(*(c.run() for c in consumers))
+    finally:
+        reporter.cancel()
+        elapsed = time.perf_counter() - start
+        print("\n===== Async consumer summary =====")
+        total = 0
+        for c in consumers:
+            total += c.processed
+            print(f"  {c.name:<16} {c.processed:>10} msgs {c.processed / elapsed:>12,.0f} msg/s  failed {c.failed}")
+        print(f"  {'aggregate':<16} {total:>10} msgs {total / elapsed:>12,.0f} msg/s")
+        await conn.aclose()
+
+def main():
+    args = parse_args()
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\nConsumer stopped by user.")
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,295 @@
 import redis
 import time
 import os
-from datetime import datetime
+import argparse
+import threading
+import multiprocessing
 from dotenv import load_dotenv
+from stream_batches import read_batch, ack_batch
+from stream_reclaimer import add_reclaimer_args, reclaimer_from_args, format_metrics, print_entry
+from stream_shards import ShardMembership, shard_keys
 
 load_dotenv()  # Loads variables from .env
+from stream_connection import get_client, get_cluster_client, pool_metrics, format_pool_metrics
+
+# WORKSHOP_HEADLESS=1 skips pauses and screen clears, so the demo can run unattended
+HEADLESS = os.getenv('WORKSHOP_HEADLESS') == '1'
 
 def clear_screen():
+    if HEADLESS:
+        return
     if os.name == 'nt':
         os.system('cls')
     else:
         os.system('clear')
 
 def press_enter_to_continue():
+    if HEADLESS:
+        return
     input("\nPress Enter to continue...\n")
 
-def format_timestamp(ts_str):
-    try:
-        ts_float = float(ts_str)
-        local_time = datetime.fromtimestamp(ts_float)
-        return local_time.strftime("%Y-%m-%d %H:%M:%S")
-    except Exception:
-        return ts_str
+def parse_args():
+    parser = argparse.ArgumentParser(description="Redis Stream CONSUMER demo")
+    parser.add_argument('--count', type=int, default=5,
+                        help="max entries per XREADGROUP call (default: 5)")
+    parser.add_argument('--block', type=int, default=2000,
+                        help="XREADGROUP block timeout in milliseconds (default: 2000)")
+    parser.add_argument('--decoder', choices=['fast', 'legacy'], default='fast',
+                        help="batch decoder for read replies; 'legacy' decodes field by field (default: fast)")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="run N parallel workers, each with its own consumer name, "
+                             "instead of the interactive table view (default: 0)")
+    parser.add_argument('--pool', choices=['thread', 'process'], default='process',
+                        help="worker pool type used with --workers (default: process)")
+    parser.add_argument('--consumer-prefix', default='worker',
+                        help="worker consumer names are <prefix>-<n> (default: worker)")
+    parser.add_argument('--duration', type=float, default=0,
+                        help="stop the worker pool after this many seconds, 0 means until Ctrl+C (default: 0)")
+    parser.add_argument('--report-interval', type=float, default=2.0,
+                        help="seconds between worker pool throughput reports (default: 2)")
+    parser.add_argument('--reclaim', action='store_true',
+                        help="run a background XAUTOCLAIM reclaimer for entries left pending by dead consumers")
+    add_reclaimer_args(parser)
+    parser.add_argument('--shards', type=int, default=0,
+                        help="read the sharded streams <stream>:{0..N-1} written by 'producer --shards N' (default: 0, one stream)")
+    parser.add_argument('--heartbeat-interval', type=float, default=2.0,
+                        help="seconds between shard membership heartbeats (default: 2)")
+    parser.add_argument('--member-ttl', type=float, default=10.0,
+                        help="consumers silent for this many seconds lose their shards (default: 10)")
+    parser.add_argument('--cluster', action='store_true',
+                        help="connect with the OSS cluster API and read each hash slot separately")
+    return parser.parse_args()
 
 # --- Redis connection details ---
-username = os.getenv('REDIS_USERNAME')
-password = os.getenv('REDIS_PASSWORD')
-host = os.getenv('REDIS_HOST')
-port = os.getenv('REDIS_PORT')
 stream_key = 'user_activity_log'
 group = 'activity_consumers'
 consumer = 'consumer1'
 
-redis_url = f'redis://{username}:{password}@{host}:{port}/0'
-r = redis.from_url(redis_url)
-
-# Create consumer group if it doesn't exist
-try:
-    r.xgroup_create(stream_key, group, id='0', mkstream=True)
-except redis.exceptions.ResponseError as e:
-    # Ignore error if group already exists
-    if "BUSYGROUP" not in str(e):
-        raise
-
-clear_screen()
-print("Welcome to the Redis Stream CONSUMER demo!")
-print("-" * 60)
-print(f"This script reads user activity events from the Redis stream")
-print(f"'{stream_key}', using consumer group '{group}'.")
-print("It will display the events in a clean table and remember progress.")
-press_enter_to_continue()
-clear_screen()
+def connect(args):
+    # Stream replies are decoded in batches by stream_records, so keep raw bytes here
+    if args.cluster:
+        return get_cluster_client(decode_responses=False, block_ms=args.block)
+    # Thread workers and reclaimers share this process's pool and each hold a connection
+    # for the whole XREADGROUP BLOCK, so the pool needs one per reader plus headroom
+    reclaimers = len(all_stream_keys(args.shards)) if args.reclaim else 0
+    return get_client(decode_responses=False, max_connections=args.workers + reclaimers + 2, block_ms=args.block)
+
+def all_stream_keys(shards):
+    return shard_keys(stream_key, shards) if shards else [stream_key]
+
+def ensure_group(conn, keys):
+    # Create consumer group if it doesn't exist
+    for key in keys:
+        try:
+            conn.xgroup_create(key, group, id='0', mkstream=True)
+        except redis.exceptions.ResponseError as e:
+            # Ignore error if group already exists
+            if "BUSYGROUP" not in str(e):
+                raise
+
+def recover_pending(conn, consumer_name, keys, count, handler, decoder='fast', cluster=False):
+    """
+    Entries delivered to this consumer name before a crash are re-read with
+    ID 0 and passed to handler(rows), batch by batch, until its PEL is empty.
+    Each batch is acknowledged after handler returns. Returns the number of
+    entries recovered.
+    """
+    recovered = 0
+    while True:
+        rows, pending = read_batch(conn, group, consumer_name, keys, count, None, start_id='0',
+                                   decoder=decoder, cluster=cluster)
+        if not rows:
+            return recovered
+        handler(rows)
+        ack_batch(conn, group, pending)
+        recovered += len(rows)
+
+class StreamAssignment:
+    """
+    The stream keys a consumer reads: the single stream, or with --shards its
+    share of the shard streams, recomputed on every membership heartbeat.
+    While a rebalance settles two consumers may briefly read the same shard;
+    the consumer group still delivers each entry to only one of them.
+    """
+
+    def __init__(self, conn, consumer_name, args):
+        self.consumer_name = consumer_name
+        self.interval = args.heartbeat_interval
+        self.next_heartbeat = 0
+        self.membership = None
+        self.keys = [stream_key]
+        if args.shards:
+            self.membership = ShardMembership(conn, stream_key, group, consumer_name,
+                                              args.shards, args.member_ttl)
+            self.keys = []
+
+    def refresh(self):
+        if self.membership is None or time.monotonic() < self.next_heartbeat:
+            return
+        self.next_heartbeat = time.monotonic() + self.interval
+        if self.membership.heartbeat():
+            self.keys = list(self.membership.assigned)
+            print(f"[{self.consumer_name}] rebalanced: {len(self.membership.members)} consumers, "
+                  f"reading {', '.join(self.keys) or 'no shards'}")
+
+    def leave(self):
+        if self.membership is not None:
+            self.membership.leave()
+
+def start_reclaimers(args):
+    if not args.reclaim:
+        return []
+    reclaimers = []
+    for key in all_stream_keys(args.shards):
+        reclaimer = reclaimer_from_args(connect(args), key, group, args,
+                                        handler=print_entry)
+        reclaimer.start()
+        reclaimers.append(reclaimer)
+    return reclaimers
+
+def stop_reclaimers(reclaimers):
+    for reclaimer in reclaimers:
+        reclaimer.stop()
+        print(f"Reclaimer {reclaimer.stream_key}: {format_metrics(reclaimer.metrics())}")
 
 def print_header():
     print(f"{'ID':<20} {'User':<10} {'Action':<15} {'Timestamp':<20}")
     print("-" * 65)
 
-print("Starting to consume... Press Ctrl+C to stop.\n")
-print_header()
+def run_demo(args, conn):
+    clear_screen()
+    print("Welcome to the Redis Stream CONSUMER demo!")
+    print("-" * 60)
+    print(f"This script reads user activity events from the Redis stream")
+    print(f"'{stream_key}', using consumer group '{group}'.")
+    print("It will display the events in a clean table and remember progress.")
+    press_enter_to_continue()
+    clear_screen()
 
-try:
-    while True:
-        resp = r.xreadgroup(group, consumer, {stream_key: '>'}, count=5, block=2000)
-        if resp:
-            for stream, messages in resp:
-                for msg_id, msg_data in messages:
-                    # Decode msg_id if bytes
-                    msg_id_str = msg_id.decode() if isinstance(msg_id, bytes) else str(msg_id)
-                    user = msg_data.get(b'user', b'').decode().capitalize()
-                    action = msg_data.get(b'action', b'').decode().replace('_', ' ').capitalize()
-                    ts = format_timestamp(msg_data.get(b'timestamp', b'0').decode())
+    print("Starting to consume... Press Ctrl+C to stop.\n")
+    print_header()
+    def print_recovered(rows):
+        for msg_id_str, user, action, ts in rows:
+            print(f"{msg_id_str:<20} {user:<10} {action:<15} {ts:<20} (recovered)")
+    recover_pending(conn, consumer, all_stream_keys(args.shards), args.count, print_recovered,
+                    args.decoder, args.cluster)
+    reclaimers = start_reclaimers(args)
+    assignment = StreamAssignment(conn, consumer, args)
 
+    try:
+        while True:
+            assignment.refresh()
+            rows, pending = read_batch(conn, group, consumer, assignment.keys, args.count, args.block,
+                                       decoder=args.decoder, cluster=args.cluster)
+            if rows:
+                for msg_id_str, user, action, ts in rows:
                     print(f"{msg_id_str:<20} {user:<10} {action:<15} {ts:<20}")
+                ack_batch(conn, group, pending)
+            else:
+                print("No new messages. Waiting...")
+                time.sleep(2)
+
+    except KeyboardInterrupt:
+        print("\nConsumer stopped by user.")
+    finally:
+        stop_reclaimers(reclaimers)
+        assignment.leave()
 
-                    # Acknowledge message to mark processed
-                    r.xack(stream_key, group, msg_id)
-        else:
-            print("No new messages. Waiting...")
-            time.sleep(2)
+def worker_loop(consumer_name, args, processed, stop_event):
+    # Thread workers share the process pool sized in connect(), each checking out its own connection
+    # per command; process workers build their own pool
+    conn = connect(args)
+    assignment = StreamAssignment(conn, consumer_name, args)
+    def count_rows(rows):
+        with processed.get_lock():
+            processed.value += len(rows)
+
+    try:
+        recover_pending(conn, consumer_name, all_stream_keys(args.shards), args.count, count_rows,
+                        args.decoder, args.cluster)
+        while not stop_event.is_set():
+            assignment.refresh()
+            rows, pending = read_batch(conn, group, consumer_name, assignment.keys, args.count, args.block,
+                                       decoder=args.decoder, cluster=args.cluster)
+            if rows:
+                count_rows(rows)
+                ack_batch(conn, group, pending)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        assignment.leave()
+        conn.close()
+
+def print_rates(names, counters, previous, interval):
+    current = [c.value for c in counters]
+    total = 0
+    for name, now, before in zip(names, current, previous):
+        rate = (now - before) / interval
+        total += rate
+        print(f"  {name:<16} {rate:>12,.0f} msg/s")
+    print(f"  {'aggregate':<16} {total:>12,.0f} msg/s")
+    return current
+
+def run_workers(args):
+    names = [f"{args.consumer_prefix}-{i + 1}" for i in range(args.workers)]
+    counters = [multiprocessing.Value('q', 0) for _ in names]
+    if args.pool == 'process':
+        stop_event = multiprocessing.Event()
+        worker_class = multiprocessing.Process
+    else:
+        stop_event = threading.Event()
+        worker_class = threading.Thread
+
+    print(f"Starting {args.workers} {args.pool} workers on '{stream_key}'"
+          f"{f' ({args.shards} shards)' if args.shards else ''} / '{group}' "
+          f"(count={args.count}, block={args.block}ms)... Press Ctrl+C to stop.\n")
+    workers = [
+        worker_class(target=worker_loop, args=(name, args, counter, stop_event), daemon=True)
+        for name, counter in zip(names, counters)
+    ]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    reclaimers = start_reclaimers(args)
+
+    previous = [0] * len(names)
+    last = start
+    try:
+        while not args.duration or time.perf_counter() - start < args.duration:
+            time.sleep(args.report_interval)
+            now = time.perf_counter()
+            print(f"[{now - start:7.1f}s]")
+            previous = print_rates(names, counters, previous, now - last)
+            for reclaimer in reclaimers:
+                print(f"  reclaimer {reclaimer.stream_key}: {format_metrics(reclaimer.metrics())}")
+            last = now
+    except KeyboardInterrupt:
+        print("\nStopping workers...")
+    finally:
+        stop_event.set()
+        stop_reclaimers(reclaimers)
+        for w in workers:
+            # Workers notice the stop flag after their current XREADGROUP block times out
+            w.join(timeout=args.block / 1000 + 5)
+
+    elapsed = time.perf_counter() - start
+    print("\n===== Worker pool summary =====")
+    grand_total = 0
+    for name, counter in zip(names, counters):
+        grand_total += counter.value
+        print(f"  {name:<16} {counter.value:>10} msgs {counter.value / elapsed:>12,.0f} msg/s")
+    print(f"  {'aggregate':<16} {grand_total:>10} msgs {grand_total / elapsed:>12,.0f} msg/s")
+    if args.pool == 'thread' and not args.cluster:
+        print(f"  {format_pool_metrics(pool_metrics(connect(args)))}")
+
+def main():
+    args = parse_args()
+    conn = connect(args)
+    ensure_group(conn, all_stream_keys(args.shards))
+    if args.workers:
+        run_workers(args)
+    else:
+        run_demo(args, conn)
 
-except KeyboardInterrupt:
-    print("\nConsumer stopped by user.")
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,197 @@
-import redis
 import time
 import random
 import os
+import argparse
 from dotenv import load_dotenv
+from stream_codec import ActivityEvent, add_codec_args, codec_from_args
+from stream_shards import shard_key_for, shard_keys
 
 load_dotenv()  # Loads variables from .env
+from stream_connection import get_client, get_cluster_client
+
+# WORKSHOP_HEADLESS=1 skips pauses and screen clears, so the demo can run unattended
+HEADLESS = os.getenv('WORKSHOP_HEADLESS') == '1'
 
 def clear_screen():
+    if HEADLESS:
+        return
     if os.name == 'nt':  # Windows
         os.system('cls')
     else:                # Linux, macOS, etc.
         os.system('clear')
 
 def press_enter_to_continue():
+    if HEADLESS:
+        return
     input("\nPress Enter to continue...\n")
 
-username = os.getenv('REDIS_USERNAME')
-password = os.getenv('REDIS_PASSWORD')
-host = os.getenv('REDIS_HOST')
-port = os.getenv('REDIS_PORT')
+def parse_args():
+    parser = argparse.ArgumentParser(description="Redis Stream PRODUCER demo")
+    parser.add_argument('--bulk', action='store_true',
+                        help="high-rate mode: send events in pipelined XADD batches instead of one per second")
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help="flush a batch once it holds this many events (default: 500)")
+    parser.add_argument('--flush-interval', type=float, default=0.05,
+                        help="flush a batch once its oldest event is this many seconds old (default: 0.05)")
+    parser.add_argument('--maxlen', type=int, default=None,
+                        help="cap the stream with XADD MAXLEN ~ <n> (default: no cap)")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="target events/sec, 0 means as fast as possible (default: 0)")
+    parser.add_argument('--duration', type=float, default=10,
+                        help="seconds to run in bulk mode, 0 means until Ctrl+C (default: 10)")
+    parser.add_argument('--events', type=int, default=0,
+                        help="stop after this many events, 0 means no limit (default: 0)")
+    parser.add_argument('--payload-bytes', type=int, default=0,
+                        help="attach a data blob of this many bytes to every event (default: 0)")
+    add_codec_args(parser)
+    parser.add_argument('--shards', type=int, default=0,
+                        help="spread events over N streams <stream>:{0..N-1} by hashing the user, "
+                             "which keeps each user's events in order (default: 0, one stream)")
+    parser.add_argument('--cluster', action='store_true',
+                        help="connect with the OSS cluster API so shard streams go to their own nodes")
+    return parser.parse_args()
+
 stream_key = 'user_activity_log'
 
-redis_url = f'redis://{username}:{password}@{host}:{port}/0'
-r = redis.from_url(redis_url)
+r = get_client(decode_responses=False)
 
 users = ['alice', 'bob', 'carol']
 actions = ['login', 'logout', 'purchase', 'update_profile']
 
-clear_screen()
-print("Welcome to the Redis Stream PRODUCER demo!")
-print("-" * 55)
-print("This script will continuously simulate user activity events")
-print(f"and push them into the Redis stream: '{stream_key}'.")
-print("You can monitor these events with a separate consumer process.")
-press_enter_to_continue()
-clear_screen()
-
-print(f"Producing to stream '{stream_key}'... Press Ctrl+C to stop.\n")
-try:
-    while True:
-        entry = {
-            'user': random.choice(users),
-            'action': random.choice(actions),
-            'timestamp': str(time.time())
-        }
-        r.xadd(stream_key, entry)
-        print("Produced:", entry)
-        time.sleep(1)
-except KeyboardInterrupt:
-    print("\nStopped producing events.")
+payload_words = ['redis', 'stream', 'event', 'session', 'cart', 'page', 'click']
+
+def make_event(payload_bytes=0):
+    entry = {
+        'user': random.choice(users),
+        'action': random.choice(actions),
+        'timestamp': str(time.time())
+    }
+    if payload_bytes:
+        entry['data'] = ' '.join(random.choice(payload_words) for _ in range(payload_bytes // 5))[:payload_bytes]
+    return entry
+
+def target_key(entry, shards):
+    if not shards:
+        return stream_key
+    return shard_key_for(stream_key, entry['user'], shards)
+
+def flush_batch(batch, codec, maxlen=None, shards=0):
+    # One round trip for the whole batch; MAXLEN ~ lets Redis trim whole macro nodes cheaply
+    pipe = r.pipeline(transaction=False)
+    for entry in batch:
+        pipe.xadd(target_key(entry, shards), codec.encode(ActivityEvent.from_entry(entry)),
+                  maxlen=maxlen, approximate=True)
+    pipe.execute()
+
+def run_demo(codec, shards=0):
+    clear_screen()
+    print("Welcome to the Redis Stream PRODUCER demo!")
+    print("-" * 55)
+    print("This script will continuously simulate user activity events")
+    print(f"and push them into the Redis stream: '{stream_key}'.")
+    print("You can monitor these events with a separate consumer process.")
+    press_enter_to_continue()
+    clear_screen()
+
+    print(f"Producing to stream '{stream_key}'... Press Ctrl+C to stop.\n")
+    try:
+        while True:
+            entry = make_event()
+            key = target_key(entry, shards)
+            r.xadd(key, codec.encode(ActivityEvent.from_entry(entry)))
+            print("Produced:", entry, f"-> {key}" if shards else "")
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopped producing events.")
+
+def run_bulk(args, codec):
+    print(f"Bulk producing to stream '{stream_key}' "
+          f"(batch size {args.batch_size}, flush interval {args.flush_interval}s, "
+          f"target rate {args.rate or 'unlimited'} events/sec, codec {codec.name}/{args.compress}, "
+          f"maxlen {'~' + str(args.maxlen) if args.maxlen else 'none'}, shards {args.shards or 'none'})... Press Ctrl+C to stop.\n")
+
+    batch = []
+    sent = 0
+    batches = 0
+    start = time.perf_counter()
+    deadline = start + args.duration if args.duration else None
+    batch_started = start
+    last_report = start
+    last_sent = 0
+
+    try:
+        while True:
+            now = time.perf_counter()
+            if deadline and now >= deadline:
+                break
+            if args.events and sent + len(batch) >= args.events:
+                break
+
+            if args.rate:
+                due = start + (sent + len(batch)) / args.rate
+                if due > now:
+                    # Sleep until the next event is due, but wake early if the open batch has to be flushed
+                    wake = min(due, batch_started + args.flush_interval) if batch else due
+                    if deadline:
+                        wake = min(wake, deadline)
+                    time.sleep(max(0.0, wake - now))
+                    now = time.perf_counter()
+                    if now < due:
+                        if batch and now - batch_started >= args.flush_interval:
+                            flush_batch(batch, codec, args.maxlen, args.shards)
+                            sent += len(batch)
+                            batches += 1
+                            batch = []
+                        continue
+
+            if not batch:
+                batch_started = now
+            batch.append(make_event(args.payload_bytes))
+
+            if len(batch) >= args.batch_size or now - batch_started >= args.flush_interval:
+                flush_batch(batch, codec, args.maxlen, args.shards)
+                sent += len(batch)
+                batches += 1
+                batch = []
+
+            if now - last_report >= 1.0:
+                print(f"Produced {sent} events ({(sent - last_sent) / (now - last_report):,.0f} events/sec)")
+                last_report = now
+                last_sent = sent
+    except KeyboardInterrupt:
+        print("\nStopping, flushing the last batch...")
+    finally:
+        if batch:
+            flush_batch(batch, codec, args.maxlen, args.shards)
+            sent += len(batch)
+            batches += 1
+
+    elapsed = time.perf_counter() - start
+    print("\n===== Producer summary =====")
+    print(f"Events sent:       {sent}")
+    print(f"Batches sent:      {batches} (avg {sent / batches if batches else 0:.1f} events/batch)")
+    print(f"Elapsed:           {elapsed:.2f}s")
+    print(f"Achieved rate:     {sent / elapsed if elapsed else 0:,.0f} events/sec"
+          + (f" (target {args.rate:,.0f})" if args.rate else ""))
+    if args.shards:
+        pipe = r.pipeline(transaction=False)
+        for key in shard_keys(stream_key, args.shards):
+            pipe.xlen(key)
+        lengths = pipe.execute()
+        print(f"Shard lengths now: {lengths}")
+    else:
+        print(f"Stream length now: {r.xlen(stream_key)}")
+
+def main():
+    args = parse_args()
+    global r
+    if args.cluster:
+        r = get_cluster_client(decode_responses=False)
+    codec = codec_from_args(args)
+    if args.bulk:
+        run_bulk(args, codec)
+    else:
+        run_demo(codec, args.shards)
+
+if __name__ == "__main__":
+    main()
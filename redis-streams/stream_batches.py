@@ -0,0 +1,35 @@
+import time
+from stream_records import DECODERS
+from stream_shards import group_by_slot
+
+def read_batch(conn, group, consumer_name, keys, count, block, start_id='>', decoder='fast', cluster=False):
+    """
+    Reads one batch for consumer_name in group from every key in keys with a
+    single XREADGROUP and decodes the whole reply at once. Returns (rows,
+    pending): pending lists each stream's message IDs, to pass to ack_batch
+    once the rows have been processed. With start_id='0' the batch comes from
+    the consumer's own pending entries.
+    """
+    if not keys:
+        # More consumers than shards: this one is idle until a rebalance
+        time.sleep((block or 0) / 1000)
+        return [], []
+    if cluster:
+        # A cluster only serves multi-key reads within one slot, so poll each slot group
+        resp = []
+        for slot_keys in group_by_slot(keys):
+            resp.extend(conn.xreadgroup(group, consumer_name, {k: start_id for k in slot_keys}, count=count) or [])
+        if not resp and block:
+            time.sleep(min(block, 100) / 1000)
+    else:
+        resp = conn.xreadgroup(group, consumer_name, {k: start_id for k in keys}, count=count, block=block)
+    if not resp:
+        return [], []
+    rows = DECODERS[decoder](resp)
+    pending = [(stream, [msg_id for msg_id, _ in messages]) for stream, messages in resp if messages]
+    return rows, pending
+
+def ack_batch(conn, group, pending):
+    # Acknowledge messages to mark processed: one multi-ID XACK per stream
+    for stream, ids in pending:
+        conn.xack(stream, group, *ids)
@@ -0,0 +1,334 @@
+import time
+import zlib
+import struct
+import random
+import argparse
+from dotenv import load_dotenv
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for the msgpack codec
+    msgpack = None
+
+try:
+    import lz4.frame
+except ImportError:  # optional: only needed for lz4 compression
+    lz4 = None
+
+load_dotenv()  # Loads variables from .env
+from stream_connection import get_client
+
+# Packed entries keep everything in one field. Its first two bytes say how the
+# rest was written, so consumers can read entries from any producer version.
+PAYLOAD_FIELD = b'p'
+# Version 2 widened the struct codec's user/action lengths from one byte to four
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+# Field-per-attribute entries carry the same version in their own field;
+# entries without it predate versioning and are read as version 1.
+VERSION_FIELD = b'v'
+
+CODEC_IDS = {'struct': 1, 'msgpack': 2}
+COMPRESSION_IDS = {'none': 0, 'zlib': 1, 'lz4': 2}
+
+_EVENT_HEADS = {1: struct.Struct('<dBB'), 2: struct.Struct('<dII')}
+_EVENT_HEAD = _EVENT_HEADS[FORMAT_VERSION]
+_DATA_LEN = struct.Struct('<I')
+
+def _to_bytes(value):
+    if value is None:
+        return b''
+    return value if isinstance(value, bytes) else str(value).encode()
+
+class ActivityEvent:
+    __slots__ = ('user', 'action', 'timestamp', 'data')
+
+    def __init__(self, user, action, timestamp, data=b''):
+        self.user = user
+        self.action = action
+        self.timestamp = timestamp
+        self.data = data
+
+    @classmethod
+    def from_entry(cls, entry):
+        # Producer-side dicts of str values, as built by make_event()
+        return cls(_to_bytes(entry.get('user')), _to_bytes(entry.get('action')),
+                   float(entry.get('timestamp', 0)), _to_bytes(entry.get('data')))
+
+class FieldsCodec:
+    """
+    The original layout: one stream field per attribute, timestamp as text,
+    plus the format version.
+    """
+    name = 'fields'
+
+    def encode(self, event):
+        fields = {VERSION_FIELD: str(FORMAT_VERSION).encode(), b'user': event.user, b'action': event.action,
+                  b'timestamp': repr(event.timestamp).encode()}
+        if event.data:
+            fields[b'data'] = event.data
+        return fields
+
+class PackedCodec:
+    """
+    Base class for single-field codecs. Subclasses implement pack/unpack of the
+    event body; this class adds the version header and optional compression.
+    """
+    name = None
+
+    def __init__(self, compression='none', compress_min=256):
+        if compression == 'lz4' and lz4 is None:
+            raise RuntimeError("lz4 compression needs the 'lz4' package (pip install lz4)")
+        self.compression = compression
+        self.compress_min = compress_min
+
+    def encode(self, event):
+        body = self.pack(event)
+        compression = 'none'
+        if self.compression != 'none' and len(body) >= self.compress_min:
+            compression = self.compression
+            body = _compress(compression, body)
+        header = bytes((FORMAT_VERSION, CODEC_IDS[self.name] << 4 | COMPRESSION_IDS[compression]))
+        return {PAYLOAD_FIELD: header + body}
+
+class StructCodec(PackedCodec):
+    """
+    Fixed binary layout: float64 timestamp, length-prefixed user and action,
+    then an optional length-prefixed data blob.
+    """
+    name = 'struct'
+
+    def pack(self, event):
+        parts = [_EVENT_HEAD.pack(event.timestamp, len(event.user), len(event.action)),
+                 event.user, event.action]
+        if event.data:
+            parts.append(_DATA_LEN.pack(len(event.data)))
+            parts.append(event.data)
+        return b''.join(parts)
+
+    @staticmethod
+    def unpack(body, version=FORMAT_VERSION):
+        head = _EVENT_HEADS[version]
+        ts, user_len, action_len = head.unpack_from(body)
+        pos = head.size
+        user = body[pos:pos + user_len]
+        pos += user_len
+        action = body[pos:pos + action_len]
+        pos += action_len
+        data = b''
+        if pos < len(body):
+            (data_len,) = _DATA_LEN.unpack_from(body, pos)
+            pos += _DATA_LEN.size
+            data = body[pos:pos + data_len]
+        return ActivityEvent(user, action, ts, data)
+
+class MsgpackCodec(PackedCodec):
+    """
+    msgpack array [timestamp, user, action(, data)] with bytes kept as bin.
+    """
+    name = 'msgpack'
+
+    def __init__(self, compression='none', compress_min=256):
+        if msgpack is None:
+            raise RuntimeError("the msgpack codec needs the 'msgpack' package (pip install msgpack)")
+        super().__init__(compression, compress_min)
+
+    def pack(self, event):
+        values = [event.timestamp, event.user, event.action]
+        if event.data:
+            values.append(event.data)
+        return msgpack.packb(values, use_bin_type=True)
+
+    @staticmethod
+    def unpack(body, version=FORMAT_VERSION):
+        values = msgpack.unpackb(body, raw=True)
+        return ActivityEvent(values[1], values[2], values[0], values[3] if len(values) > 3 else b'')
+
+_UNPACKERS = {1: StructCodec.unpack, 2: MsgpackCodec.unpack}
+
+def _compress(compression, body):
+    if compression == 'zlib':
+        return zlib.compress(body, 1)
+    return lz4.frame.compress(body)
+
+def _decompress(compression_id, body):
+    if compression_id == 1:
+        return zlib.decompress(body)
+    if compression_id == 2:
+        if lz4 is None:
+            raise RuntimeError("entry is lz4-compressed but the 'lz4' package is not installed")
+        return lz4.frame.decompress(body)
+    return body
+
+def is_packed(msg_data):
+    return PAYLOAD_FIELD in msg_data
+
+def decode_payload(payload):
+    """
+    Decodes a packed payload written by any codec/compression combination.
+    """
+    if len(payload) < 2:
+        raise ValueError(f"truncated stream payload ({len(payload)} bytes)")
+    version, flags = payload[0], payload[1]
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"unsupported stream payload version {version}")
+    unpack = _UNPACKERS.get(flags >> 4)
+    if unpack is None:
+        raise ValueError(f"unknown stream payload codec id {flags >> 4}")
+    try:
+        return unpack(_decompress(flags & 0x0F, payload[2:]), version)
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"truncated or corrupt stream payload: {e}") from e
+
+def check_fields_version(msg_data):
+    """
+    Raises ValueError for a field-per-attribute entry written in a layout this
+    reader does not know.
+    """
+    version = msg_data.get(VERSION_FIELD)
+    if version is not None and int(version) not in SUPPORTED_VERSIONS:
+        raise ValueError(f"unsupported stream entry version {int(version)}")
+
+def decode_entry(msg_data):
+    """
+    Returns an ActivityEvent for a raw (bytes) stream entry in either layout.
+    """
+    payload = msg_data.get(PAYLOAD_FIELD)
+    if payload is not None:
+        return decode_payload(payload)
+    check_fields_version(msg_data)
+    try:
+        ts = float(msg_data.get(b'timestamp', b'0'))
+    except ValueError:
+        ts = 0.0
+    return ActivityEvent(msg_data.get(b'user', b''), msg_data.get(b'action', b''), ts, msg_data.get(b'data', b''))
+
+def unpack_fields(msg_data):
+    # Legacy field-map view of a packed entry, for code that reads b'user' etc. directly
+    if PAYLOAD_FIELD not in msg_data:
+        return msg_data
+    event = decode_payload(msg_data[PAYLOAD_FIELD])
+    fields = {b'user': event.user, b'action': event.action, b'timestamp': repr(event.timestamp).encode()}
+    if event.data:
+        fields[b'data'] = event.data
+    return fields
+
+def get_codec(name='fields', compression='none', compress_min=256):
+    if name == 'fields':
+        if compression != 'none':
+            raise ValueError("compression needs a packed codec (struct or msgpack)")
+        return FieldsCodec()
+    if name == 'struct':
+        return StructCodec(compression, compress_min)
+    if name == 'msgpack':
+        return MsgpackCodec(compression, compress_min)
+    raise ValueError(f"unknown codec '{name}'")
+
+def add_codec_args(parser):
+    parser.add_argument('--codec', choices=['fields', 'struct', 'msgpack'], default='fields',
+                        help="entry layout written by the producer (default: fields)")
+    parser.add_argument('--compress', choices=['none', 'zlib', 'lz4'], default='none',
+                        help="compress packed payloads (default: none)")
+    parser.add_argument('--compress-min', type=int, default=256,
+                        help="only compress payloads of at least this many bytes (default: 256)")
+
+def codec_from_args(args):
+    return get_codec(args.codec, args.compress, args.compress_min)
+
+def synthetic_events(n, payload_bytes=0):
+    users = [b'alice', b'bob', b'carol']
+    actions = [b'login', b'logout', b'purchase', b'update_profile']
+    words = [b'redis', b'stream', b'event', b'user', b'session', b'cart', b'page', b'click']
+    now = time.time()
+    events = []
+    for i in range(n):
+        data = b''
+        if payload_bytes:
+            # Word soup compresses roughly like real JSON-ish payloads
+            data = b' '.join(random.choice(words) for _ in range(payload_bytes // 5))[:payload_bytes]
+        events.append(ActivityEvent(random.choice(users), random.choice(actions), now + i / 1000, data))
+    return events
+
+def check_round_trip():
+    """
+    Encodes and decodes edge-case events (empty values, user/action/data
+    longer than 255 bytes) with every available codec; raises AssertionError
+    on the first mismatch.
+    """
+    events = [ActivityEvent(b'', b'', 0.0),
+              ActivityEvent(b'u' * 300, b'a' * 70000, 1700000000.25, b'd' * 1000)]
+    for name, compression in (('fields', 'none'), ('struct', 'none'), ('struct', 'zlib'), ('msgpack', 'none')):
+        try:
+            codec = get_codec(name, compression, compress_min=0)
+        except RuntimeError:
+            continue  # optional package not installed
+        for event in events:
+            decoded = decode_entry(codec.encode(event))
+            got = (decoded.user, decoded.action, decoded.timestamp, decoded.data)
+            assert got == (event.user, event.action, event.timestamp, event.data), \
+                f"{name}/{compression} round trip changed the event"
+
+def benchmark_codecs(configs, entries=50000, payload_bytes=0, conn=None, memory_entries=10000):
+    """
+    Measures encode and decode throughput of each (codec, compression) pair and,
+    when conn is given, bytes per entry of a stream written with it (MEMORY USAGE).
+    """
+    events = synthetic_events(entries, payload_bytes)
+    results = []
+    for name, compression in configs:
+        try:
+            codec = get_codec(name, compression)
+        except (RuntimeError, ValueError) as e:
+            print(f"  skipping {name}/{compression}: {e}")
+            continue
+        start = time.perf_counter()
+        encoded = [codec.encode(event) for event in events]
+        encode_rate = entries / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for fields in encoded:
+            decode_entry(fields)
+        decode_rate = entries / (time.perf_counter() - start)
+
+        result = {'codec': name, 'compression': compression,
+                  'encode_per_sec': encode_rate, 'decode_per_sec': decode_rate,
+                  'bytes_per_entry': None}
+        if conn is not None:
+            key = f"codec_bench:{name}:{compression}"
+            conn.delete(key)
+            pipe = conn.pipeline(transaction=False)
+            for fields in encoded[:memory_entries]:
+                pipe.xadd(key, fields)
+            pipe.execute()
+            used = conn.memory_usage(key, samples=0)
+            result['bytes_per_entry'] = used / min(memory_entries, entries)
+            conn.delete(key)
+        results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stream entry codecs")
+    parser.add_argument('--entries', type=int, default=50000)
+    parser.add_argument('--payload-bytes', type=int, default=0,
+                        help="add a data blob of this size to each event (default: 0)")
+    parser.add_argument('--memory', action='store_true',
+                        help="also write each variant to a scratch stream and report MEMORY USAGE per entry")
+    parser.add_argument('--memory-entries', type=int, default=10000)
+    args = parser.parse_args()
+
+    check_round_trip()
+    conn = None
+    if args.memory:
+        conn = get_client(decode_responses=False)
+
+    configs = [('fields', 'none'), ('struct', 'none'), ('struct', 'zlib'), ('struct', 'lz4'),
+               ('msgpack', 'none'), ('msgpack', 'zlib'), ('msgpack', 'lz4')]
+    print(f"{args.entries} events, {args.payload_bytes} byte payload:")
+    print(f"  {'codec':<18} {'encode/s':>12} {'decode/s':>12} {'bytes/entry':>12}")
+    for res in benchmark_codecs(configs, args.entries, args.payload_bytes, conn, args.memory_entries):
+        label = f"{res['codec']}/{res['compression']}"
+        size = f"{res['bytes_per_entry']:.1f}" if res['bytes_per_entry'] is not None else '-'
+        print(f"  {label:<18} {res['encode_per_sec']:>12,.0f} {res['decode_per_sec']:>12,.0f} {size:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The stream scripts run from this directory; the shared connection module lives one level up
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from redis_connection import (get_client, get_async_client, get_cluster_client,  # noqa: E402,F401
+                              pool_metrics, format_pool_metrics)
@@ -0,0 +1,225 @@
+import redis
+import time
+import argparse
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()  # Loads variables from .env
+from stream_connection import get_client
+from stream_records import format_message
+
+def _to_str(value):
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+def _id_millis(entry_id):
+    return int(_to_str(entry_id).split('-', 1)[0])
+
+class PendingReclaimer(threading.Thread):
+    """
+    Background thread that periodically claims pending entries which have been
+    idle for at least min_idle_ms (XAUTOCLAIM), hands them to handler and
+    acknowledges them once it returns. Without a handler entries are only
+    claimed and stay pending. Entries delivered more than max_deliveries times
+    are copied to dead_letter_key and acknowledged instead of being retried.
+    """
+
+    def __init__(self, conn, stream_key, group, consumer_name='reclaimer',
+                 min_idle_ms=60000, batch_size=100, interval=5.0,
+                 max_deliveries=5, dead_letter_key=None, handler=None):
+        super().__init__(name=f"reclaimer-{consumer_name}", daemon=True)
+        self.conn = conn
+        self.stream_key = stream_key
+        self.group = group
+        self.consumer_name = consumer_name
+        self.min_idle_ms = min_idle_ms
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_deliveries = max_deliveries
+        self.dead_letter_key = dead_letter_key or f"{stream_key}:dead"
+        self.handler = handler
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.stats = {
+            'runs': 0,
+            'claimed': 0,
+            'acked': 0,
+            'handler_errors': 0,
+            'dead_lettered': 0,
+            'deleted': 0,
+            'max_delivery_count': 0,
+            'pel_size': 0,
+            'oldest_pending_age_ms': 0,
+        }
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.reclaim_once()
+                self.refresh_pel_metrics()
+            except redis.exceptions.RedisError as e:
+                print(f"[reclaimer] {e}")
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def metrics(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def _bump(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                self.stats[name] += value
+
+    def delivery_counts(self, entry_ids):
+        # One pipelined XPENDING lookup per claimed entry, a single round trip for the batch
+        if not entry_ids:
+            return {}
+        pipe = self.conn.pipeline(transaction=False)
+        for entry_id in entry_ids:
+            pipe.xpending_range(self.stream_key, self.group, min=entry_id, max=entry_id, count=1)
+        counts = {}
+        for pending in pipe.execute():
+            for p in pending:
+                counts[_to_str(p['message_id'])] = p['times_delivered']
+        return counts
+
+    def reclaim_once(self):
+        """
+        Walks the whole PEL once with XAUTOCLAIM. Returns the number of entries claimed.
+        """
+        start_id = '0-0'
+        claimed_total = 0
+        while True:
+            resp = self.conn.xautoclaim(
+                self.stream_key, self.group, self.consumer_name,
+                min_idle_time=self.min_idle_ms, start_id=start_id, count=self.batch_size)
+            start_id, messages = resp[0], resp[1]
+            # Redis 7+ also reports IDs that were in the PEL but no longer exist in the stream
+            deleted = resp[2] if len(resp) > 2 else []
+            if deleted:
+                self._bump(deleted=len(deleted))
+
+            if messages:
+                claimed_total += len(messages)
+                self.process_claimed(messages)
+
+            if _to_str(start_id) == '0-0':
+                break
+        with self.lock:
+            self.stats['runs'] += 1
+        return claimed_total
+
+    def process_claimed(self, messages):
+        messages = [(msg_id, fields) for msg_id, fields in messages if msg_id is not None]
+        counts = self.delivery_counts([msg_id for msg_id, fields in messages if fields is not None])
+        ack_ids = []
+        dead = []
+        errors = 0
+        for msg_id, fields in messages:
+            if fields is None:
+                # Entry was trimmed away while pending; nothing left to process
+                ack_ids.append(msg_id)
+                continue
+            delivered = counts.get(_to_str(msg_id), 1)
+            with self.lock:
+                self.stats['max_delivery_count'] = max(self.stats['max_delivery_count'], delivered)
+            if delivered > self.max_deliveries:
+                dead.append((msg_id, fields, delivered))
+                continue
+            if self.handler is None:
+                # Claim only: whoever processes the entry acknowledges it
+                continue
+            try:
+                self.handler(msg_id, fields)
+                ack_ids.append(msg_id)
+            except Exception as e:
+                # Leave it pending; the next pass claims it again with a higher delivery count
+                errors += 1
+                print(f"[reclaimer] handler failed for {_to_str(msg_id)}: {e}")
+
+        pipe = self.conn.pipeline(transaction=False)
+        for msg_id, fields, delivered in dead:
+            entry = dict(fields)
+            entry['_origin_id'] = _to_str(msg_id)
+            entry['_origin_stream'] = self.stream_key
+            entry['_deliveries'] = str(delivered)
+            pipe.xadd(self.dead_letter_key, entry)
+        all_ids = ack_ids + [msg_id for msg_id, _, _ in dead]
+        if all_ids:
+            pipe.xack(self.stream_key, self.group, *all_ids)
+        if dead or all_ids:
+            pipe.execute()
+
+        self._bump(claimed=len(messages), acked=len(ack_ids),
+                   dead_lettered=len(dead), handler_errors=errors)
+
+    def refresh_pel_metrics(self):
+        summary = self.conn.xpending(self.stream_key, self.group)
+        pel_size = summary['pending']
+        oldest_age = 0
+        if pel_size and summary['min']:
+            seconds, micros = self.conn.time()
+            now_ms = seconds * 1000 + micros // 1000
+            oldest_age = max(0, now_ms - _id_millis(summary['min']))
+        with self.lock:
+            self.stats['pel_size'] = pel_size
+            self.stats['oldest_pending_age_ms'] = oldest_age
+
+def format_metrics(metrics):
+    return (f"PEL size={metrics['pel_size']} oldest={metrics['oldest_pending_age_ms'] / 1000:.1f}s "
+            f"claimed={metrics['claimed']} acked={metrics['acked']} "
+            f"dead-lettered={metrics['dead_lettered']} deleted={metrics['deleted']} "
+            f"handler-errors={metrics['handler_errors']} max-deliveries={metrics['max_delivery_count']}")
+
+def add_reclaimer_args(parser):
+    parser.add_argument('--min-idle', type=int, default=60000,
+                        help="claim entries pending for at least this many milliseconds (default: 60000)")
+    parser.add_argument('--reclaim-batch', type=int, default=100,
+                        help="XAUTOCLAIM COUNT per call (default: 100)")
+    parser.add_argument('--reclaim-interval', type=float, default=5.0,
+                        help="seconds between reclaim passes (default: 5)")
+    parser.add_argument('--max-deliveries', type=int, default=5,
+                        help="dead-letter entries delivered more than this many times (default: 5)")
+    parser.add_argument('--dead-letter-key', default=None,
+                        help="dead-letter stream (default: <stream>:dead)")
+
+def reclaimer_from_args(conn, stream_key, group, args, consumer_name='reclaimer', handler=None):
+    return PendingReclaimer(
+        conn, stream_key, group, consumer_name=consumer_name,
+        min_idle_ms=args.min_idle, batch_size=args.reclaim_batch,
+        interval=args.reclaim_interval, max_deliveries=args.max_deliveries,
+        dead_letter_key=args.dead_letter_key, handler=handler)
+
+def print_entry(msg_id, fields):
+    msg_id_str, user, action, ts = format_message(msg_id, fields)
+    print(f"{msg_id_str:<20} {user:<10} {action:<15} {ts:<20} (reclaimed)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Reclaim idle pending entries of a Redis stream consumer group")
+    parser.add_argument('--stream', default='user_activity_log')
+    parser.add_argument('--group', default='activity_consumers')
+    parser.add_argument('--consumer', default='reclaimer')
+    parser.add_argument('--claim-only', action='store_true',
+                        help="only claim idle entries and leave them pending instead of printing and acknowledging them")
+    add_reclaimer_args(parser)
+    args = parser.parse_args()
+
+    conn = get_client(decode_responses=False)
+
+    reclaimer = reclaimer_from_args(conn, args.stream, args.group, args, consumer_name=args.consumer,
+                                    handler=None if args.claim_only else print_entry)
+    print(f"Reclaiming entries idle for {args.min_idle}ms on '{args.stream}' / '{args.group}' "
+          f"every {args.reclaim_interval}s... Press Ctrl+C to stop.\n")
+    reclaimer.start()
+    try:
+        while True:
+            time.sleep(args.reclaim_interval)
+            print(format_metrics(reclaimer.metrics()))
+    except KeyboardInterrupt:
+        print("\nReclaimer stopped by user.")
+        reclaimer.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import sys
+import math
+import time
+import random
+import argparse
+from array import array
+from datetime import datetime
+from stream_codec import PAYLOAD_FIELD, decode_payload, unpack_fields, check_fields_version
+
+def format_timestamp(ts_str):
+    try:
+        ts_float = float(ts_str)
+        local_time = datetime.fromtimestamp(ts_float)
+        return local_time.strftime("%Y-%m-%d %H:%M:%S")
+    except Exception:
+        return ts_str
+
+def format_message(msg_id, msg_data):
+    msg_data = unpack_fields(msg_data)
+    # Decode msg_id if bytes
+    msg_id_str = msg_id.decode() if isinstance(msg_id, bytes) else str(msg_id)
+    user = msg_data.get(b'user', b'').decode().capitalize()
+    action = msg_data.get(b'action', b'').decode().replace('_', ' ').capitalize()
+    ts = format_timestamp(msg_data.get(b'timestamp', b'0').decode())
+    return msg_id_str, user, action, ts
+
+def decode_batch_legacy(resp):
+    """
+    The original per-message path: every field decoded and formatted on its own.
+    """
+    rows = []
+    for stream, messages in resp or []:
+        for msg_id, msg_data in messages:
+            rows.append(format_message(msg_id, msg_data or {}))
+    return rows
+
+class ActivityRecord:
+    __slots__ = ('id', 'user', 'action', 'timestamp', 'time_text')
+
+    def __init__(self, id, user, action, timestamp, time_text):
+        self.id = id
+        self.user = user
+        self.action = action
+        self.timestamp = timestamp
+        self.time_text = time_text
+
+    def __iter__(self):
+        # Unpacks like the legacy (id, user, action, time) row tuples
+        return iter((self.id, self.user, self.action, self.time_text))
+
+    def __repr__(self):
+        return f"ActivityRecord({self.id!r}, {self.user!r}, {self.action!r}, {self.time_text!r})"
+
+class TimestampFormatter:
+    """
+    Formats epoch timestamps at second granularity, caching the text per second.
+    Events arrive in roughly time order, so the cache hit rate is close to 100%.
+    Returns None for times the platform cannot represent.
+    """
+
+    def __init__(self, fmt="%Y-%m-%d %H:%M:%S", max_entries=4096):
+        self.fmt = fmt
+        self.max_entries = max_entries
+        self.cache = {}
+
+    def __call__(self, ts):
+        try:
+            second = int(ts)
+        except (OverflowError, ValueError):
+            return None
+        text = self.cache.get(second)
+        if text is None:
+            try:
+                text = datetime.fromtimestamp(second).strftime(self.fmt)
+            except (OverflowError, OSError, ValueError):
+                return None
+            if len(self.cache) >= self.max_entries:
+                self.cache.clear()
+            self.cache[second] = text
+        return text
+
+class LabelTable:
+    """
+    Maps raw field bytes to interned display strings, so each distinct user or
+    action is decoded and formatted once instead of once per event.
+    """
+
+    def __init__(self, transform, max_entries=65536):
+        self.transform = transform
+        self.max_entries = max_entries
+        self.labels = {}
+
+    def __call__(self, raw):
+        label = self.labels.get(raw)
+        if label is None:
+            if len(self.labels) >= self.max_entries:
+                self.labels.clear()
+            label = sys.intern(self.transform(raw.decode()))
+            self.labels[raw] = label
+        return label
+
+format_time = TimestampFormatter()
+user_labels = LabelTable(str.capitalize)
+action_labels = LabelTable(lambda action: action.replace('_', ' ').capitalize())
+
+def _parse_ts(raw):
+    try:
+        # float() accepts bytes directly, no decode needed
+        ts = float(raw)
+    except (TypeError, ValueError):
+        return None
+    # inf and nan parse but are not times; the raw text is shown instead
+    return ts if math.isfinite(ts) else None
+
+def decode_batch(resp):
+    """
+    Turns a whole XREADGROUP/XREAD reply into ActivityRecord objects in one pass.
+    """
+    records = []
+    append = records.append
+    for stream, messages in resp or []:
+        for msg_id, msg_data in messages:
+            msg_data = msg_data or {}
+            payload = msg_data.get(PAYLOAD_FIELD)
+            if payload is not None:
+                event = decode_payload(payload)
+                append(ActivityRecord(msg_id.decode(), user_labels(event.user), action_labels(event.action),
+                                      event.timestamp, format_time(event.timestamp) or repr(event.timestamp)))
+                continue
+            check_fields_version(msg_data)
+            ts = _parse_ts(msg_data.get(b'timestamp', b'0'))
+            text = format_time(ts) if ts is not None else None
+            append(ActivityRecord(
+                msg_id.decode(),
+                user_labels(msg_data.get(b'user', b'')),
+                action_labels(msg_data.get(b'action', b'')),
+                ts,
+                # Unparsable or out of range: the raw text, as format_timestamp shows it
+                text if text is not None else msg_data.get(b'timestamp', b'').decode()))
+    return records
+
+class ActivityColumns:
+    __slots__ = ('ids', 'users', 'actions', 'timestamps')
+
+    def __init__(self):
+        self.ids = []
+        self.users = []
+        self.actions = []
+        self.timestamps = array('d')
+
+    def __len__(self):
+        return len(self.ids)
+
+def decode_columns(resp):
+    """
+    Column-oriented variant of decode_batch for aggregations: one list per field
+    and the raw epoch timestamps in a float array (NaN when unparsable).
+    """
+    cols = ActivityColumns()
+    for stream, messages in resp or []:
+        for msg_id, msg_data in messages:
+            msg_data = msg_data or {}
+            if PAYLOAD_FIELD in msg_data:
+                event = decode_payload(msg_data[PAYLOAD_FIELD])
+                cols.ids.append(msg_id)
+                cols.users.append(user_labels(event.user))
+                cols.actions.append(action_labels(event.action))
+                cols.timestamps.append(event.timestamp)
+                continue
+            check_fields_version(msg_data)
+            ts = _parse_ts(msg_data.get(b'timestamp', b'0'))
+            cols.ids.append(msg_id)
+            cols.users.append(user_labels(msg_data.get(b'user', b'')))
+            cols.actions.append(action_labels(msg_data.get(b'action', b'')))
+            cols.timestamps.append(ts if ts is not None else float('nan'))
+    return cols
+
+DECODERS = {
+    'legacy': decode_batch_legacy,
+    'fast': decode_batch,
+    'columns': decode_columns,
+}
+
+def synthetic_reply(n, stream_key=b'user_activity_log'):
+    # Same shape redis-py returns for XREADGROUP without decode_responses
+    users = [b'alice', b'bob', b'carol']
+    actions = [b'login', b'logout', b'purchase', b'update_profile']
+    base_ms = int(time.time() * 1000)
+    messages = []
+    for i in range(n):
+        ms = base_ms + i // 10
+        messages.append((f"{ms}-{i % 10}".encode(), {
+            b'user': random.choice(users),
+            b'action': random.choice(actions),
+            b'timestamp': str(ms / 1000).encode(),
+        }))
+    return [[stream_key, messages]]
+
+def benchmark(messages=100000, batch_size=100, rounds=3):
+    reply = synthetic_reply(messages)
+    batches = [[[reply[0][0], reply[0][1][i:i + batch_size]]] for i in range(0, messages, batch_size)]
+    results = {}
+    for name, decoder in DECODERS.items():
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for batch in batches:
+                decoder(batch)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = messages / best
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stream entry decoders")
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    results = benchmark(args.messages, args.batch_size, args.rounds)
+    baseline = results['legacy']
+    print(f"Decoding {args.messages} entries in batches of {args.batch_size} (best of {args.rounds}):")
+    for name, rate in results.items():
+        print(f"  {name:<8} {rate:>12,.0f} msg/s  {rate / baseline:5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import zlib
+from redis.crc import key_slot
+
+def shard_keys(base_key, shards):
+    # The hash tag puts every shard in its own slot, so a cluster spreads them over its nodes
+    return [f"{base_key}:{{{i}}}" for i in range(shards)]
+
+def shard_for(partition_key, shards):
+    """
+    Stable shard index for a partition key. crc32 rather than hash(), which is
+    randomized per process and would send one user to different shards.
+    """
+    if isinstance(partition_key, str):
+        partition_key = partition_key.encode()
+    return zlib.crc32(partition_key) % shards
+
+def shard_key_for(base_key, partition_key, shards):
+    return f"{base_key}:{{{shard_for(partition_key, shards)}}}"
+
+def group_by_slot(keys):
+    """
+    Splits keys into lists that share a hash slot; each list can be read with one
+    multi-key XREADGROUP on a cluster. Order of first appearance is kept.
+    """
+    groups = {}
+    for key in keys:
+        groups.setdefault(key_slot(key.encode() if isinstance(key, str) else key), []).append(key)
+    return list(groups.values())
+
+def assign_shards(members, member, shards):
+    """
+    Round-robin assignment of shard indexes over the sorted live members.
+    Every member computes the same table from the same member list.
+    """
+    members = sorted(members)
+    if member not in members:
+        return []
+    position = members.index(member)
+    return [i for i in range(shards) if i % len(members) == position]
+
+class ShardMembership:
+    """
+    Tracks live consumers of a group in a sorted set scored by their last
+    heartbeat (server time, ms) and derives this consumer's shard assignment.
+    Members that miss heartbeats for member_ttl seconds drop out, which moves
+    their shards to the remaining consumers on the next heartbeat.
+    """
+
+    def __init__(self, conn, base_key, group, consumer_name, shards, member_ttl=10.0):
+        self.conn = conn
+        self.base_key = base_key
+        self.consumer_name = consumer_name
+        self.shards = shards
+        self.member_ttl = member_ttl
+        self.members_key = f"{base_key}:members:{group}"
+        self.keys = shard_keys(base_key, shards)
+        self.assigned = []
+        self.members = []
+
+    def _now_ms(self):
+        seconds, micros = self.conn.time()
+        return seconds * 1000 + micros // 1000
+
+    def heartbeat(self):
+        """
+        Refreshes this consumer's heartbeat, expires dead members and recomputes
+        the assignment. Returns True when the assigned shard set changed.
+        """
+        now = self._now_ms()
+        pipe = self.conn.pipeline(transaction=False)
+        pipe.zadd(self.members_key, {self.consumer_name: now})
+        pipe.zremrangebyscore(self.members_key, '-inf', now - int(self.member_ttl * 1000))
+        pipe.zrange(self.members_key, 0, -1)
+        members = [m.decode() if isinstance(m, bytes) else m for m in pipe.execute()[2]]
+
+        assigned = [self.keys[i] for i in assign_shards(members, self.consumer_name, self.shards)]
+        changed = assigned != self.assigned
+        self.members = sorted(members)
+        self.assigned = assigned
+        return changed
+
+    def leave(self):
+        # Lets the other members pick up our shards right away instead of after member_ttl
+        self.conn.zrem(self.members_key, self.consumer_name)
+        self.assigned = []
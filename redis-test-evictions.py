@@ -1,16 +1,28 @@
-import redis
 import os
+import time
+import random
+import argparse
+import threading
 from dotenv import load_dotenv
+from redis_info_sampler import InfoSampler, print_summary
+from redis_connection import get_client, pool_metrics, format_pool_metrics
 
 load_dotenv()  # Loads variables from .env
 
+# WORKSHOP_HEADLESS=1 skips pauses and screen clears, so the demo can run unattended
+HEADLESS = os.getenv('WORKSHOP_HEADLESS') == '1'
+
 def clear_screen():
+    if HEADLESS:
+        return
     if os.name == 'nt':  # Windows
         os.system('cls')
     else:                # Linux, macOS, others
         os.system('clear')
 
 def press_enter_to_continue():
+    if HEADLESS:
+        return
     input("\nPress Enter to continue...\n")
 
 def generate_value(size_bytes):
@@ -20,20 +32,169 @@ def generate_value(size_bytes):
     remainder = size_bytes % len(chunk)
     return (chunk * repeat_times) + chunk[:remainder]
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Redis eviction policy lab")
+    parser.add_argument('--bulk', action='store_true',
+                        help="non-interactive loader: pipelined batches from reusable payload buffers")
+    parser.add_argument('--keys', type=int, default=3000,
+                        help="number of keys to write (default: 3000)")
+    parser.add_argument('--value-size', type=int, default=320 * 1024,
+                        help="value size in bytes; the mean for non-fixed distributions (default: 327680)")
+    parser.add_argument('--size-dist', choices=['fixed', 'uniform', 'exponential'], default='fixed',
+                        help="value size distribution (default: fixed)")
+    parser.add_argument('--min-size', type=int, default=1024,
+                        help="smallest value for uniform/exponential sizes (default: 1024)")
+    parser.add_argument('--max-size', type=int, default=1024 * 1024,
+                        help="largest value for uniform/exponential sizes (default: 1048576)")
+    parser.add_argument('--ttl', type=int, default=0,
+                        help="expire keys after this many seconds, 0 means no TTL (default: 0)")
+    parser.add_argument('--ttl-jitter', type=float, default=0.0,
+                        help="randomize each TTL by up to this fraction, e.g. 0.2 (default: 0)")
+    parser.add_argument('--batch', type=int, default=50,
+                        help="SETs per pipeline (default: 50)")
+    parser.add_argument('--threads', type=int, default=1,
+                        help="loader threads, each sending its own pipelines (default: 1)")
+    parser.add_argument('--key-prefix', default='key:',
+                        help="key name prefix (default: 'key:')")
+    parser.add_argument('--no-flush', action='store_true',
+                        help="do not FLUSHDB before loading")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sample-interval', type=float, default=1.0,
+                        help="seconds between INFO memory/stats samples, 0 disables sampling (default: 1)")
+    parser.add_argument('--sample-out', default=None,
+                        help="write the INFO time series to this .csv or .json file")
+    return parser.parse_args()
+
+def value_sizes(args):
+    rng = random.Random(args.seed)
+    if args.size_dist == 'fixed':
+        return [args.value_size] * args.keys
+    if args.size_dist == 'uniform':
+        return [rng.randint(args.min_size, args.max_size) for _ in range(args.keys)]
+    return [min(args.max_size, max(args.min_size, int(rng.expovariate(1 / args.value_size))))
+            for _ in range(args.keys)]
+
+class BulkLoader:
+    """
+    Writes keys from slices of one pre-built payload buffer, so no value is
+    rebuilt or copied per key, and sends them in pipelined batches.
+    """
+
+    def __init__(self, r, args):
+        self.r = r
+        self.args = args
+        self.sizes = value_sizes(args)
+        self.payload = memoryview(generate_value(max(self.sizes)).encode())
+        self.lock = threading.Lock()
+        self.keys_written = 0
+        self.bytes_written = 0
+
+    def ttl_for(self, rng):
+        if not self.args.ttl:
+            return None
+        jitter = self.args.ttl * self.args.ttl_jitter
+        return max(1, int(self.args.ttl + rng.uniform(-jitter, jitter)))
+
+    def load_range(self, start, stop, seed):
+        rng = random.Random(seed)
+        pipe = self.r.pipeline(transaction=False)
+        pending_keys = 0
+        pending_bytes = 0
+        for i in range(start, stop):
+            size = self.sizes[i]
+            pipe.set(f"{self.args.key_prefix}{i + 1}", self.payload[:size], ex=self.ttl_for(rng))
+            pending_keys += 1
+            pending_bytes += size
+            if pending_keys >= self.args.batch:
+                pipe.execute()
+                self._count(pending_keys, pending_bytes)
+                pending_keys = pending_bytes = 0
+        if pending_keys:
+            pipe.execute()
+            self._count(pending_keys, pending_bytes)
+
+    def _count(self, keys, nbytes):
+        with self.lock:
+            self.keys_written += keys
+            self.bytes_written += nbytes
+
+    def run(self, report_interval=1.0):
+        threads = []
+        per_thread = -(-self.args.keys // self.args.threads)
+        for t in range(self.args.threads):
+            start, stop = t * per_thread, min(self.args.keys, (t + 1) * per_thread)
+            if start >= stop:
+                break
+            threads.append(threading.Thread(target=self.load_range, args=(start, stop, self.args.seed + 100 + t),
+                                            daemon=True))
+
+        began = time.perf_counter()
+        for t in threads:
+            t.start()
+        last, last_keys, last_bytes = began, 0, 0
+        while True:
+            alive = [t for t in threads if t.is_alive()]
+            if not alive:
+                break
+            alive[0].join(timeout=report_interval)
+            now = time.perf_counter()
+            if now - last >= report_interval:
+                keys, nbytes = self.keys_written, self.bytes_written
+                print(f"Inserted {keys} keys... {(keys - last_keys) / (now - last):,.0f} keys/s, "
+                      f"{(nbytes - last_bytes) / (now - last) / 1e6:,.1f} MB/s")
+                last, last_keys, last_bytes = now, keys, nbytes
+        return time.perf_counter() - began
+
+def start_sampler(r, args, live=True):
+    if not args.sample_interval:
+        return None
+    sampler = InfoSampler(r, interval=args.sample_interval, live=live)
+    sampler.start()
+    return sampler
+
+def finish_sampler(sampler, args):
+    if sampler is None:
+        return
+    sampler.stop()
+    print_summary(sampler.summary())
+    if args.sample_out:
+        sampler.write(args.sample_out)
+        print(f"INFO time series written to {args.sample_out}")
+
+def run_bulk(args):
+    r = get_client(decode_responses=False, max_connections=args.threads + 2)
+    if not args.no_flush:
+        r.flushdb()
+        print("Redis database flushed.")
+
+    loader = BulkLoader(r, args)
+    total_mb = sum(loader.sizes) / 1e6
+    print(f"Loading {args.keys} keys ({args.size_dist} sizes, {total_mb:,.1f} MB total) "
+          f"with {args.threads} thread(s), {args.batch} SETs per pipeline"
+          f"{f', TTL {args.ttl}s' if args.ttl else ''}...")
+    sampler = start_sampler(r, args)
+    try:
+        elapsed = loader.run()
+    finally:
+        finish_sampler(sampler, args)
+
+    print("\n===== Bulk load summary =====")
+    print(f"Keys written:  {loader.keys_written}")
+    print(f"Data written:  {loader.bytes_written / 1e6:,.1f} MB")
+    print(f"Elapsed:       {elapsed:.2f}s")
+    print(f"Throughput:    {loader.keys_written / elapsed:,.0f} keys/sec, "
+          f"{loader.bytes_written / elapsed / 1e6:,.1f} MB/s")
+    print(f"Keys in DB:    {r.dbsize()}")
+    print(f"Connections:   {format_pool_metrics(pool_metrics(r))}")
+
+def run_lab(args):
     clear_screen()
     print("\nPlease NOTE - Before you start this Lab, make sure your Redis Database's 'Data eviction policy' (in 'Durability Section') has been set to 'allkeys-lru'")
     press_enter_to_continue()
     clear_screen()
     print("Connecting to Redis database...")
 
-    r = redis.Redis(
-        host = os.getenv('REDIS_HOST'),
-        port = os.getenv('REDIS_PORT'),
-        username = os.getenv('REDIS_USERNAME'),
-        password = os.getenv('REDIS_PASSWORD'),
-        decode_responses=True
-    )
+    r = get_client()
     print("Connected to Redis Database.")
     print("Next, Lets flush the database before we run this Lab")
     press_enter_to_continue()
@@ -45,6 +206,7 @@ def main():
     print("Redis database flushed.")
     print("Now lets start inserting keys into the Redis Database, Once you press enter below, switch to Redis Database Monitoring and monitor below metrics")
     print("'Used memory' AND 'Evicted objects/sec'")
+    print("(This script also samples INFO memory/stats itself and prints a summary at the end.)")
     press_enter_to_continue()
     clear_screen()
 
@@ -53,17 +215,26 @@ def main():
     clear_screen()
     print(f"Inserting 3000 keys with values of approximately {value_size} bytes each...")
 
+    sampler = start_sampler(r, args, live=False)
+    value = generate_value(value_size)  # Same payload for every key, build it once
     for i in range(1, 3001):
         key = f"key:{i}"
-        value = generate_value(value_size)
         r.set(key, value)
         if i % 100 == 0:
             print(f"Inserted {i} keys...")
+    finish_sampler(sampler, args)
 
     print("Insertion complete.")
     print("Monitoring the 'Used memory' and 'Evicted objects/sec' metrics, you would have observed that once the database is full, \nRedis automatically starts evicting least recently used keys from the Database to make space for the incoming inserts")
     print("That is visible by observing that the 'Evicted objects/sec' metrics starts once the Database is full")
     print("\n===== This concludes our Test Evition Policy Lab =====")
 
+def main():
+    args = parse_args()
+    if args.bulk:
+        run_bulk(args)
+    else:
+        run_lab(args)
+
 if __name__ == "__main__":
     main()
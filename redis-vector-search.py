@@ -1,30 +1,37 @@
 import redis
 import os
-import numpy as np
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+from redis_connection import get_client
+from redis_vector_ingest import get_embedder, ingest
+from redis_vector_index import spec_from_env, create_index
+from redis_vector_knn import ExactKNN
+from redis_vector_query import VectorSearcher, tag_filter
+from redis_embedding_cache import EmbeddingCache, format_stats
 
 load_dotenv()  # Loads variables from .env
 
+# WORKSHOP_HEADLESS=1 skips pauses and screen clears, so the demo can run unattended
+HEADLESS = os.getenv('WORKSHOP_HEADLESS') == '1'
+
 def clear_screen():
+    if HEADLESS:
+        return
     if os.name == 'nt':  # Windows
         os.system('cls')
     else:                # Linux, macOS, others
         os.system('clear')
 
 def press_enter_to_continue():
+    if HEADLESS:
+        return
     input("\nPress Enter to continue...\n")
 
-# Initialize the embedding model once globally
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# The embedding model is loaded on first use, not at import time
+# (WORKSHOP_EMBEDDER=hashing swaps in a deterministic stand-in for tests)
+embedder = get_embedder()
 
-def embed_text(text):
-    """
-    Encodes the input text into a normalized float32 vector 
-    and returns its raw bytes for Redis storage.
-    """
-    embedding = model.encode(text, convert_to_numpy=True, normalize_embeddings=True)
-    return embedding.astype(np.float32).tobytes()
+# FLAT FLOAT32 by default; VECTOR_ALGORITHM=HNSW, VECTOR_TYPE=FLOAT16, HNSW_M etc. change it (see redis_vector_index.py)
+index_spec = None
 
 def main():
     clear_screen()
@@ -36,12 +43,12 @@ def main():
     print("Step 1: Connect to Redis")
     
     
-    client = redis.Redis(
-        host=os.getenv('REDIS_HOST'),
-        port=os.getenv('REDIS_PORT'),
-        username=os.getenv('REDIS_USERNAME'),
-        password=os.getenv('REDIS_PASSWORD'),
-        decode_responses=True)
+    client = get_client()
+    # Vectors and search replies stay bytes on this one; nothing is decoded that is not printed
+    raw_client = get_client(decode_responses=False)
+    # Repeated documents and popular queries are served from the cache instead of the model
+    global embedder
+    embedder = EmbeddingCache(embedder, raw_client)
 
     print(f"Connected to Redis")
     press_enter_to_continue()
@@ -49,27 +56,15 @@ def main():
     clear_screen()
     print("Step 2: Create vector search index with RediSearch module")
 
+    global index_spec
+    dim = embedder.dim  # 384 for `all-MiniLM-L6-v2`
+    index_spec = spec_from_env(dim)
     try:
-        client.execute_command("FT.DROPINDEX", "idx:vector_search")
-    except redis.exceptions.ResponseError:
-        pass  # ignore if index doesn't exist
-    
-    dim = 384  # Embedding dimension of `all-MiniLM-L6-v2`
-    
-    schema = [
-        "ON", "HASH",
-        "PREFIX", "1", "doc:",
-        "SCHEMA",
-        "id", "TEXT",
-        "content", "TEXT",
-        "embedding", "VECTOR", "FLAT", "6",
-        "TYPE", "FLOAT32",
-        "DIM", str(dim),
-        "DISTANCE_METRIC", "COSINE"
-    ]
-
-    client.execute_command("FT.CREATE", "idx:vector_search", *schema)
-    print(f"Index 'idx:vector_search' created with vector dimension {dim}.")
+        create_index(client, index_spec, "idx:vector_search", "doc:", tag_fields=("category",))
+        print(f"Index 'idx:vector_search' created ({index_spec.describe()}) with vector dimension {dim}.")
+    except (redis.exceptions.ResponseError, RuntimeError) as e:
+        # No search module (or no FLOAT16/BFLOAT16 support): the lab still runs, with exact KNN computed locally in step 4
+        print(f"Could not create the index ({e}); searches will fall back to local exact KNN.")
     press_enter_to_continue()
     
     clear_screen()
@@ -93,17 +88,21 @@ def main():
         "vs14": "travel neck pillow",
         "vs15": "facial cleansing brush"
     }
+    # A TAG per document, so searches can be restricted to a category before the KNN step
+    categories = {
+        "vs1": "electronics", "vs2": "electronics", "vs3": "home", "vs4": "outdoors", "vs5": "outdoors",
+        "vs6": "food", "vs7": "travel", "vs8": "books", "vs9": "beauty", "vs10": "home",
+        "vs11": "outdoors", "vs12": "outdoors", "vs13": "food", "vs14": "travel", "vs15": "beauty"
+    }
 
     print(f"Embedding and inserting {len(sample_texts)} documents into Redis...")
     
-    for doc_id, text in sample_texts.items():
-        vector = embed_text(text)
-        key = f"doc:{doc_id}"
-        client.hset(key, mapping={
-            "id": doc_id,
-            "content": text,
-            "embedding": vector
-        })
+    # One batched encode and one pipelined write per batch instead of a model call and HSET per document
+    ingest(client, sample_texts.items(), embedder, batch_size=64, to_bytes=index_spec.to_bytes)
+    pipe = client.pipeline(transaction=False)
+    for doc_id, category in categories.items():
+        pipe.hset(f"doc:{doc_id}", "category", category)
+    pipe.execute()
     
     print("Sample data inserted successfully.")
     press_enter_to_continue()
@@ -111,39 +110,42 @@ def main():
     clear_screen()
     print("Step 4: Perform a vector similarity search")
     
-    query = input("Enter a query string to search for similar items (e.g., 'wireless headphones'): ").strip()
+    query = "" if HEADLESS else input("Enter a query string to search for similar items (e.g., 'wireless headphones'): ").strip()
     if not query:
         query = "wireless headphones"
-    query_vec = embed_text(query)
-    
-    query_command = [
-        "FT.SEARCH", "idx:vector_search",
-        f"*=>[KNN 5 @embedding $vec_param AS vector_score]",
-        "PARAMS", "2", "vec_param", query_vec,
-        "SORTBY", "vector_score",
-        "RETURN", "2", "content", "vector_score",
-        "DIALECT", "2"
-    ]
+    searcher = VectorSearcher(raw_client, "idx:vector_search", index_spec)
 
     print(f"\nSearching for top 5 similar items to '{query}' ...")
-    results = client.execute_command(*query_command)
+    try:
+        results = searcher.search(embedder.encode([query]), k=5, return_fields=("content",))
+    except redis.exceptions.ResponseError as e:
+        print(f"FT.SEARCH unavailable ({e}); using local exact KNN instead.")
+        # The cache already holds the sample embeddings, so this does not call the model again
+        local = ExactKNN(embedder.encode(sample_texts.values()), list(sample_texts))
+        ids, distances = local.search(embedder.encode([query]), k=5)
+        for i, (doc_id, distance) in enumerate(zip(ids[0], distances[0])):
+            print(f"Result {i+1}: content='{sample_texts[doc_id]}', similarity score={distance:.5f}")
+        return
 
-    total = results[0]
-    if total == 0:
+    if results.totals[0] == 0:
         print("No results found.")
     else:
-        print(f"Found {total} results.")
-        for i in range(total):
-            key = results[1 + i * 2]
-            fields = results[2 + i * 2]
-            content = None
-            score = None
-            for j in range(0, len(fields), 2):
-                if fields[j] == "content":
-                    content = fields[j + 1]
-                elif fields[j] == "vector_score":
-                    score = float(fields[j + 1])
-            print(f"Result {i+1}: content='{content}', similarity score={score:.5f}")
+        print(f"Found {results.totals[0]} results.")
+        for i, (doc, score) in enumerate(zip(results.fields[0], results.scores[0])):
+            print(f"Result {i+1}: content='{doc['content'].decode()}', similarity score={score:.5f}")
+    press_enter_to_continue()
+
+    clear_screen()
+    print("Step 5: Batched searches with a category filter")
+
+    # Several queries, one pipeline: one round trip for all of them, scores decoded straight into an array
+    queries = ["gift for a coffee lover", "weekend in the mountains", "long flight essentials"]
+    results = searcher.search(embedder.encode(queries), k=3, filters=tag_filter("category", ["outdoors", "travel", "food"]))
+    for query, ids, scores in zip(queries, results.ids("doc:"), results.scores):
+        print(f"\n'{query}':")
+        for doc_id, score in zip(ids, scores):
+            print(f"  [{categories[doc_id]}] {sample_texts[doc_id]} ({score:.5f})")
+    print(f"\nEmbedding cache: {format_stats(embedder.stats())}")
 
 if __name__ == "__main__":
     main()
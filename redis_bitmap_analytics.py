@@ -0,0 +1,300 @@
+import time
+import uuid
+import random
+import argparse
+import datetime
+from redis_connection import get_client
+from workshop_bench import LatencyHistogram
+
+try:
+    import numpy as np
+except ImportError:  # optional: only needed for the local (client-side) queries
+    np = None
+
+class ActivityBitmaps:
+    """
+    Per-day activity bitmaps: bit N of a day's key is set when user ID N was
+    active that day, so a million users cost 125 KB per day.
+
+    Counting queries (DAU/WAU/MAU, retention) run server-side with BITOP and
+    BITCOUNT; only the counts cross the network. The local_* methods fetch whole
+    bitmaps and compute with NumPy instead, which moves work off the server at
+    the cost of transferring the bitmaps. The client must not decode responses.
+    """
+
+    def __init__(self, r, prefix='activity', batch=1000):
+        self.r = r
+        # Day keys share a hash tag so BITOP across them works on a cluster too
+        self.prefix = f"{{{prefix}}}"
+        self.batch = batch
+
+    def day_key(self, day):
+        return f"{self.prefix}:{day:%Y%m%d}"
+
+    def _days_keys(self, days):
+        return [self.day_key(day) for day in days]
+
+    # --- writes ---
+
+    def record(self, user_ids, day):
+        """
+        Marks users active on `day`, with one BITFIELD of `batch` SETs per command.
+        """
+        key = self.day_key(day)
+        user_ids = list(user_ids)
+        pipe = self.r.pipeline(transaction=False)
+        for i in range(0, len(user_ids), self.batch):
+            bf = pipe.bitfield(key)
+            for user_id in user_ids[i:i + self.batch]:
+                bf.set('u1', user_id, 1)
+            bf.execute()
+            if len(pipe) >= 100:
+                pipe.execute()
+        pipe.execute()
+
+    # --- reads ---
+
+    def is_active(self, user_ids, day):
+        """
+        Returns 0/1 per user for one day, reading `batch` bits per BITFIELD.
+        """
+        key = self.day_key(day)
+        user_ids = list(user_ids)
+        pipe = self.r.pipeline(transaction=False)
+        for i in range(0, len(user_ids), self.batch):
+            bf = pipe.bitfield(key)
+            for user_id in user_ids[i:i + self.batch]:
+                bf.get('u1', user_id)
+            bf.execute()
+        return [bit for reply in pipe.execute() for bit in reply]
+
+    def history(self, user_id, days):
+        pipe = self.r.pipeline(transaction=False)
+        for key in self._days_keys(days):
+            pipe.getbit(key, user_id)
+        return pipe.execute()
+
+    def active_count(self, day):
+        return self.r.bitcount(self.day_key(day))
+
+    def _combined_counts(self, ops):
+        # ops: [(operation, keys)]; each becomes BITOP into a scratch key + BITCOUNT
+        pipe = self.r.pipeline(transaction=True)
+        scratch = []
+        for operation, keys in ops:
+            dest = f"{self.prefix}:tmp:{uuid.uuid4().hex}"
+            scratch.append(dest)
+            pipe.bitop(operation, dest, *keys)
+            pipe.bitcount(dest)
+        pipe.delete(*scratch)
+        replies = pipe.execute()
+        return replies[1:-1:2]
+
+    def unique_count(self, days):
+        """
+        Users active on at least one of `days` (WAU for 7 days, MAU for 30).
+        """
+        return self._combined_counts([('OR', self._days_keys(days))])[0]
+
+    def retention(self, cohort_day, later_days):
+        """
+        Share of users active on cohort_day who were also active on each of
+        later_days, computed in one transaction.
+        """
+        cohort = self.day_key(cohort_day)
+        cohort_size = self.r.bitcount(cohort)
+        if not cohort_size:
+            return [0.0] * len(later_days)
+        return [n / cohort_size for n in self._combined_counts(
+            [('AND', [cohort, self.day_key(day)]) for day in later_days])]
+
+    # --- local computation ---
+
+    def fetch(self, days):
+        """
+        Returns the raw bitmaps as equal-length uint8 arrays, one row per day.
+        """
+        if np is None:
+            raise RuntimeError("local bitmap queries need NumPy (pip install numpy)")
+        pipe = self.r.pipeline(transaction=False)
+        for key in self._days_keys(days):
+            pipe.get(key)
+        raw = [value or b'' for value in pipe.execute()]
+        width = max((len(value) for value in raw), default=0)
+        rows = np.zeros((len(raw), width), dtype=np.uint8)
+        for i, value in enumerate(raw):
+            rows[i, :len(value)] = np.frombuffer(value, dtype=np.uint8)
+        return rows
+
+    def local_unique_count(self, days):
+        rows = self.fetch(days)
+        return int(np.unpackbits(np.bitwise_or.reduce(rows, axis=0)).sum()) if rows.size else 0
+
+    def local_active_users(self, day):
+        # Redis bit 0 is the most significant bit of byte 0, which is unpackbits' default order
+        rows = self.fetch([day])
+        return np.flatnonzero(np.unpackbits(rows[0]))
+
+    def local_retention(self, cohort_day, later_days):
+        rows = self.fetch([cohort_day] + list(later_days))
+        cohort = rows[0]
+        cohort_size = int(np.unpackbits(cohort).sum())
+        if not cohort_size:
+            return [0.0] * len(later_days)
+        return [int(np.unpackbits(cohort & row).sum()) / cohort_size for row in rows[1:]]
+
+    def memory_usage(self, days):
+        pipe = self.r.pipeline(transaction=False)
+        for key in self._days_keys(days):
+            pipe.memory_usage(key, samples=0)
+        return sum(n or 0 for n in pipe.execute())
+
+    def delete(self, days):
+        self.r.delete(*self._days_keys(days))
+
+class ActivitySets:
+    """
+    The same queries on one set of user IDs per day, as a baseline.
+    """
+
+    def __init__(self, r, prefix='activity_sets', batch=1000):
+        self.r = r
+        self.prefix = f"{{{prefix}}}"
+        self.batch = batch
+
+    def day_key(self, day):
+        return f"{self.prefix}:{day:%Y%m%d}"
+
+    def record(self, user_ids, day):
+        key = self.day_key(day)
+        user_ids = list(user_ids)
+        pipe = self.r.pipeline(transaction=False)
+        for i in range(0, len(user_ids), self.batch):
+            pipe.sadd(key, *user_ids[i:i + self.batch])
+            if len(pipe) >= 100:
+                pipe.execute()
+        pipe.execute()
+
+    def active_count(self, day):
+        return self.r.scard(self.day_key(day))
+
+    def unique_count(self, days):
+        dest = f"{self.prefix}:tmp:{uuid.uuid4().hex}"
+        pipe = self.r.pipeline(transaction=True)
+        pipe.sunionstore(dest, [self.day_key(day) for day in days])
+        pipe.delete(dest)
+        return pipe.execute()[0]
+
+    def retention(self, cohort_day, later_days):
+        cohort = self.day_key(cohort_day)
+        pipe = self.r.pipeline(transaction=True)
+        pipe.scard(cohort)
+        scratch = []
+        for day in later_days:
+            dest = f"{self.prefix}:tmp:{uuid.uuid4().hex}"
+            scratch.append(dest)
+            pipe.sinterstore(dest, [cohort, self.day_key(day)])
+        pipe.delete(*scratch)
+        replies = pipe.execute()
+        cohort_size = replies[0]
+        return [n / cohort_size if cohort_size else 0.0 for n in replies[1:-1]]
+
+    def memory_usage(self, days):
+        pipe = self.r.pipeline(transaction=False)
+        for day in days:
+            pipe.memory_usage(self.day_key(day), samples=0)
+        return sum(n or 0 for n in pipe.execute())
+
+    def delete(self, days):
+        self.r.delete(*[self.day_key(day) for day in days])
+
+# =================== Benchmark ===================
+
+def timed(ops, fn):
+    hist = LatencyHistogram()
+    for _ in range(ops):
+        t0 = time.perf_counter()
+        fn()
+        hist.record(time.perf_counter() - t0)
+    return hist.summary_ms()
+
+def run_queries(store, days, ops, local=False):
+    last = days[-1]
+    queries = {
+        'DAU': lambda: store.active_count(last),
+        'WAU': lambda: store.unique_count(days[-7:]),
+        'MAU': lambda: store.unique_count(days),
+        'retention d1..d7': lambda: store.retention(days[-8], days[-7:]),
+    }
+    if local:
+        queries = {
+            'MAU (NumPy)': lambda: store.local_unique_count(days),
+            'retention (NumPy)': lambda: store.local_retention(days[-8], days[-7:]),
+        }
+    return {name: timed(ops, fn) for name, fn in queries.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Bitmap vs set cohort analytics: memory and query latency")
+    parser.add_argument('--users', type=int, default=2_000_000, help="user ID space (default: 2M)")
+    parser.add_argument('--active', type=float, default=0.1, help="share of users active per day (default: 0.1)")
+    parser.add_argument('--days', type=int, default=30, help="days of activity (default: 30)")
+    parser.add_argument('--ops', type=int, default=50, help="timed runs per query (default: 50)")
+    parser.add_argument('--lookups', type=int, default=10000,
+                        help="users checked per BITFIELD read benchmark (default: 10000)")
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--skip-sets', action='store_true', help="only benchmark the bitmap layout")
+    parser.add_argument('--keep', action='store_true')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if args.days < 8:
+        parser.error("--days must be at least 8 for the retention query")
+
+    r = get_client(decode_responses=False)
+    rng = random.Random(args.seed)
+    today = datetime.date.today()
+    days = [today - datetime.timedelta(days=args.days - 1 - i) for i in range(args.days)]
+    per_day = int(args.users * args.active)
+    stores = [('bitmap', ActivityBitmaps(r, batch=args.batch))]
+    if not args.skip_sets:
+        stores.append(('set', ActivitySets(r, batch=args.batch)))
+
+    print(f"{args.users:,} users, {per_day:,} active per day, {args.days} days")
+    load_seconds = {name: 0.0 for name, _ in stores}
+    for name, store in stores:
+        store.delete(days)
+    for day in days:
+        active = rng.sample(range(args.users), per_day)
+        for name, store in stores:
+            start = time.perf_counter()
+            store.record(active, day)
+            load_seconds[name] += time.perf_counter() - start
+
+    results = {}
+    for name, store in stores:
+        results[name] = run_queries(store, days, args.ops)
+        memory = store.memory_usage(days)
+        print(f"\n{name}: {memory / 1e6:,.1f} MB for {args.days} days, "
+              f"loaded at {per_day * args.days / load_seconds[name]:,.0f} users/s")
+        for query, summary in results[name].items():
+            print(f"  {query:<20} p50 {summary['p50']:>9.3f} ms  p99 {summary['p99']:>9.3f} ms")
+
+    bitmaps = stores[0][1]
+    lookup_ids = [rng.randrange(args.users) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    bitmaps.is_active(lookup_ids, days[-1])
+    print(f"\nBITFIELD read of {args.lookups:,} users' bits: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if np is not None:
+        for query, summary in run_queries(bitmaps, days, args.ops, local=True).items():
+            print(f"  {query:<20} p50 {summary['p50']:>9.3f} ms  p99 {summary['p99']:>9.3f} ms")
+        if bitmaps.local_unique_count(days) != bitmaps.unique_count(days):
+            print("WARNING: local and server-side MAU differ")
+    else:
+        print("NumPy not installed: skipping local queries")
+
+    if not args.keep:
+        for _, store in stores:
+            store.delete(days)
+
+if __name__ == "__main__":
+    main()
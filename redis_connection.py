@@ -0,0 +1,220 @@
+import os
+import time
+import threading
+import redis
+import redis.asyncio
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+from redis.utils import HIREDIS_AVAILABLE
+from dotenv import load_dotenv
+
+load_dotenv()  # Loads variables from .env, once for every script that imports this module
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, '') else default
+
+# Connection details plus pool tuning; every value can be overridden in .env
+SETTINGS = {
+    'host': os.getenv('REDIS_HOST', 'localhost'),
+    'port': _env_int('REDIS_PORT', 6379),
+    'username': os.getenv('REDIS_USERNAME') or None,
+    'password': os.getenv('REDIS_PASSWORD') or None,
+    'ssl': os.getenv('REDIS_SSL') == '1',
+    'max_connections': _env_int('REDIS_MAX_CONNECTIONS', 50),
+    'pool_timeout': _env_float('REDIS_POOL_TIMEOUT', 20.0),
+    'socket_timeout': _env_float('REDIS_SOCKET_TIMEOUT', 10.0),
+    'connect_timeout': _env_float('REDIS_CONNECT_TIMEOUT', 5.0),
+    'health_check_interval': _env_int('REDIS_HEALTH_CHECK_INTERVAL', 30),
+    'retries': _env_int('REDIS_RETRIES', 3),
+    'backoff_base': _env_float('REDIS_BACKOFF_BASE', 0.05),
+    'backoff_cap': _env_float('REDIS_BACKOFF_CAP', 2.0),
+    # auto: use hiredis when it is installed; 0 forces the pure-Python parser
+    'hiredis': os.getenv('REDIS_HIREDIS', 'auto'),
+}
+
+def _parser_class():
+    if SETTINGS['hiredis'] == 'auto':
+        return None
+    try:
+        from redis._parsers import _HiredisParser as HiredisParser, _RESP2Parser as PythonParser
+    except ImportError:  # redis-py 4.x
+        from redis.connection import HiredisParser, PythonParser
+    if SETTINGS['hiredis'] == '1':
+        if not HIREDIS_AVAILABLE:
+            raise RuntimeError("REDIS_HIREDIS=1 but hiredis is not installed (pip install hiredis)")
+        return HiredisParser
+    return PythonParser
+
+# Only failures to reach the server are retried. A timeout may come after the
+# command was applied, and re-sending XADD, ZINCRBY or PFADD would apply it twice.
+RETRY_ERRORS = (redis.exceptions.ConnectionError,)
+
+def _retry(retry_class=Retry):
+    return retry_class(ExponentialBackoff(cap=SETTINGS['backoff_cap'], base=SETTINGS['backoff_base']),
+                       SETTINGS['retries'], supported_errors=RETRY_ERRORS)
+
+def _socket_timeout(block_ms):
+    # Blocking reads (XREADGROUP BLOCK) legitimately wait block_ms before replying
+    timeout = SETTINGS['socket_timeout']
+    if block_ms and timeout is not None:
+        timeout += block_ms / 1000
+    return timeout
+
+def connection_kwargs(decode_responses=True, block_ms=None):
+    kwargs = {
+        'host': SETTINGS['host'],
+        'port': SETTINGS['port'],
+        'username': SETTINGS['username'],
+        'password': SETTINGS['password'],
+        'decode_responses': decode_responses,
+        'socket_timeout': _socket_timeout(block_ms),
+        'socket_connect_timeout': SETTINGS['connect_timeout'],
+        'socket_keepalive': True,
+        'health_check_interval': SETTINGS['health_check_interval'],
+        'retry': _retry(),
+        'retry_on_error': list(RETRY_ERRORS),
+    }
+    parser_class = _parser_class()
+    if parser_class is not None:
+        kwargs['parser_class'] = parser_class
+    return kwargs
+
+class InstrumentedBlockingPool(redis.BlockingConnectionPool):
+    """
+    BlockingConnectionPool that records how long callers wait for a connection
+    and how long each connection stays checked out.
+    """
+
+    # Waits shorter than this are just lock overhead, not pool exhaustion
+    WAIT_THRESHOLD = 0.001
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics_lock = threading.Lock()
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        with self.metrics_lock:
+            self.metrics = {
+                'checkouts': 0,
+                'blocked_checkouts': 0,
+                'wait_total_s': 0.0,
+                'wait_max_s': 0.0,
+                'checkout_total_s': 0.0,
+                'checkout_max_s': 0.0,
+                'in_use': 0,
+                'in_use_peak': 0,
+            }
+
+    def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        connection = super().get_connection(*args, **kwargs)
+        now = time.perf_counter()
+        waited = now - started
+        connection._checked_out_at = now
+        with self.metrics_lock:
+            m = self.metrics
+            m['checkouts'] += 1
+            m['wait_total_s'] += waited
+            m['wait_max_s'] = max(m['wait_max_s'], waited)
+            if waited >= self.WAIT_THRESHOLD:
+                m['blocked_checkouts'] += 1
+            m['in_use'] += 1
+            m['in_use_peak'] = max(m['in_use_peak'], m['in_use'])
+        return connection
+
+    def release(self, connection):
+        checked_out_at = getattr(connection, '_checked_out_at', None)
+        if checked_out_at is not None:
+            held = time.perf_counter() - checked_out_at
+            connection._checked_out_at = None
+            with self.metrics_lock:
+                m = self.metrics
+                m['checkout_total_s'] += held
+                m['checkout_max_s'] = max(m['checkout_max_s'], held)
+                m['in_use'] -= 1
+        super().release(connection)
+
+    def snapshot(self):
+        with self.metrics_lock:
+            m = dict(self.metrics)
+        checkouts = m['checkouts'] or 1
+        m['wait_avg_ms'] = m['wait_total_s'] / checkouts * 1000
+        m['wait_max_ms'] = m['wait_max_s'] * 1000
+        m['checkout_avg_ms'] = m['checkout_total_s'] / checkouts * 1000
+        m['checkout_max_ms'] = m['checkout_max_s'] * 1000
+        m['max_connections'] = self.max_connections
+        return m
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(decode_responses=True, max_connections=None, block_ms=None):
+    """
+    Returns the process-wide pool for this decode mode, size and blocking
+    timeout, creating it on first use.
+    """
+    size = max_connections or SETTINGS['max_connections']
+    key = (os.getpid(), decode_responses, size, block_ms or 0)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            connection_class = redis.SSLConnection if SETTINGS['ssl'] else redis.Connection
+            pool = InstrumentedBlockingPool(
+                max_connections=size,
+                timeout=SETTINGS['pool_timeout'],
+                connection_class=connection_class,
+                **connection_kwargs(decode_responses, block_ms))
+            _pools[key] = pool
+        return pool
+
+def get_client(decode_responses=True, max_connections=None, block_ms=None):
+    """
+    A redis.Redis client on the shared, tuned pool. Clients are cheap; the pool
+    is what gets shared, so threads can each call this or share one client.
+    Callers issuing blocking reads pass their longest BLOCK in block_ms so the
+    socket timeout does not cut the wait short.
+    """
+    return redis.Redis(connection_pool=get_pool(decode_responses, max_connections, block_ms))
+
+def get_async_client(decode_responses=True, max_connections=None, block_ms=None):
+    from redis.asyncio.retry import Retry as AsyncRetry
+    kwargs = connection_kwargs(decode_responses, block_ms)
+    kwargs['retry'] = _retry(AsyncRetry)
+    kwargs.pop('parser_class', None)
+    if SETTINGS['ssl']:
+        kwargs['connection_class'] = redis.asyncio.SSLConnection
+    pool = redis.asyncio.BlockingConnectionPool(
+        max_connections=max_connections or SETTINGS['max_connections'],
+        timeout=SETTINGS['pool_timeout'],
+        **kwargs)
+    return redis.asyncio.Redis(connection_pool=pool)
+
+def get_cluster_client(decode_responses=True, block_ms=None):
+    from redis.cluster import RedisCluster
+    return RedisCluster(
+        host=SETTINGS['host'], port=SETTINGS['port'],
+        username=SETTINGS['username'], password=SETTINGS['password'], ssl=SETTINGS['ssl'],
+        decode_responses=decode_responses,
+        socket_timeout=_socket_timeout(block_ms),
+        socket_connect_timeout=SETTINGS['connect_timeout'],
+        socket_keepalive=True,
+        health_check_interval=SETTINGS['health_check_interval'],
+        retry=_retry())
+
+def pool_metrics(client):
+    pool = getattr(client, 'connection_pool', None)
+    return pool.snapshot() if isinstance(pool, InstrumentedBlockingPool) else None
+
+def format_pool_metrics(metrics):
+    if not metrics:
+        return "pool metrics unavailable"
+    return (f"pool {metrics['in_use_peak']}/{metrics['max_connections']} peak in use, "
+            f"{metrics['checkouts']} checkouts ({metrics['blocked_checkouts']} waited), "
+            f"wait avg {metrics['wait_avg_ms']:.3f} ms max {metrics['wait_max_ms']:.1f} ms, "
+            f"checkout avg {metrics['checkout_avg_ms']:.3f} ms max {metrics['checkout_max_ms']:.1f} ms")
@@ -0,0 +1,231 @@
+import re
+import time
+import random
+import hashlib
+import argparse
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+import redis
+from redis_connection import get_client
+from redis_vector_ingest import get_embedder
+from workshop_bench import LatencyHistogram
+
+def normalize_text(text, lowercase=False):
+    # Only safe to lowercase when the model does it too (uncased tokenizers), otherwise case changes the vector
+    text = re.sub(r"\s+", " ", unicodedata.normalize('NFKC', text)).strip()
+    return text.lower() if lowercase else text
+
+class EmbeddingCache:
+    """
+    Two-level cache in front of an embedder, with the same encode(texts)
+    interface so callers do not change.
+
+    Level 1 is an in-process LRU of max_entries vectors, each served for up to
+    local_ttl seconds. Level 2 is shared through Redis: float32 bytes under
+    prefix + blake2b(model name, normalized text), with a ttl-second expiry so
+    the tier stays bounded (volatile-* eviction policies can also drop it under
+    memory pressure). Only texts missing from both levels reach the model, as
+    one batch. Redis errors degrade to cache misses, so an outage slows queries
+    down rather than failing them. The client must not decode responses.
+    lowercase=None folds case only when the embedder reports that it ignores
+    case anyway (its `lowercases` attribute).
+    """
+
+    def __init__(self, embedder, r, max_entries=10000, ttl=7 * 86400, local_ttl=3600,
+                 prefix='embcache:', lowercase=None):
+        self.embedder = embedder
+        self.r = r
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.prefix = prefix
+        self._lowercase = lowercase
+        self.entries = OrderedDict()  # key -> (expires_at, vector)
+        self.lock = threading.Lock()
+        self.counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'shared_errors': 0,
+                         'encode_calls': 0, 'encode_s': 0.0}
+
+    @property
+    def name(self):
+        return self.embedder.name
+
+    @property
+    def dim(self):
+        return self.embedder.dim
+
+    @property
+    def lowercase(self):
+        if self._lowercase is None:
+            self._lowercase = bool(getattr(self.embedder, 'lowercases', False))
+        return self._lowercase
+
+    def key(self, text):
+        digest = hashlib.blake2b(f"{self.embedder.name}\0{normalize_text(text, self.lowercase)}".encode(),
+                                 digest_size=16).hexdigest()
+        return f"{self.prefix}{digest}"
+
+    def _local_get(self, key):
+        cached = self.entries.get(key)
+        if cached is None:
+            return None
+        if cached[0] < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return cached[1]
+
+    def _local_put(self, key, vector):
+        self.entries[key] = (time.monotonic() + self.local_ttl, vector)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def encode(self, texts):
+        """
+        Returns a (len(texts), dim) float32 array, encoding only cache misses.
+        """
+        texts = list(texts)
+        keys = [self.key(text) for text in texts]
+        found = {}
+        with self.lock:
+            for key in set(keys):
+                vector = self._local_get(key)
+                if vector is not None:
+                    found[key] = vector
+            self.counters['local_hits'] += sum(1 for key in keys if key in found)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            shared = self._shared_get(missing)
+            with self.lock:
+                for key, vector in shared.items():
+                    found[key] = vector
+                    self._local_put(key, vector)
+                self.counters['shared_hits'] += sum(1 for key in keys if key in shared)
+
+        to_encode = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                to_encode.setdefault(key, text)
+        if to_encode:
+            t0 = time.perf_counter()
+            vectors = self.embedder.encode(list(to_encode.values()))
+            elapsed = time.perf_counter() - t0
+            encoded = dict(zip(to_encode, vectors))
+            self._shared_put(encoded)
+            with self.lock:
+                for key, vector in encoded.items():
+                    found[key] = vector
+                    self._local_put(key, vector)
+                self.counters['misses'] += sum(1 for key in keys if key in encoded)
+                self.counters['encode_calls'] += 1
+                self.counters['encode_s'] += elapsed
+
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def _shared_get(self, keys):
+        try:
+            values = self.r.mget(keys)
+        except redis.exceptions.RedisError:
+            with self.lock:
+                self.counters['shared_errors'] += 1
+            return {}
+        expected = self.dim * 4
+        # A value of the wrong size was written for another dimension; treat it as a miss
+        return {key: np.frombuffer(value, dtype=np.float32)
+                for key, value in zip(keys, values) if value is not None and len(value) == expected}
+
+    def _shared_put(self, encoded):
+        try:
+            pipe = self.r.pipeline(transaction=False)
+            for key, vector in encoded.items():
+                pipe.set(key, np.asarray(vector, dtype=np.float32).tobytes(), ex=self.ttl)
+            pipe.execute()
+        except redis.exceptions.RedisError:
+            with self.lock:
+                self.counters['shared_errors'] += 1
+
+    def clear_local(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self.entries)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        stats['local_hit_ratio'] = stats['local_hits'] / lookups if lookups else 0.0
+        return stats
+
+def format_stats(stats):
+    return (f"hit-ratio={stats['hit_ratio']:.1%} (local {stats['local_hits']}, shared {stats['shared_hits']}) "
+            f"misses={stats['misses']} encode-calls={stats['encode_calls']} "
+            f"encode-time={stats['encode_s']:.2f}s shared-errors={stats['shared_errors']} entries={stats['entries']}")
+
+# =================== Benchmark ===================
+
+def query_log(count, distinct, zipf_s, seed):
+    """
+    Synthetic search queries whose popularity follows a Zipf distribution.
+    """
+    rng = random.Random(seed)
+    words = ['wireless', 'headphones', 'hiking', 'jacket', 'coffee', 'organic', 'bike', 'tent', 'lamp',
+             'shoes', 'running', 'travel', 'pillow', 'novel', 'oil', 'pan', 'suitcase', 'bread']
+    vocabulary = [' '.join(rng.sample(words, rng.randint(2, 4))) for _ in range(distinct)]
+    # P(rank) proportional to 1 / rank**s; vocabulary order is already random, so ranks need no shuffling
+    weights = 1.0 / np.arange(1, distinct + 1) ** zipf_s
+    picks = np.random.default_rng(seed).choice(distinct, size=count, p=weights / weights.sum())
+    return [vocabulary[i] for i in picks]
+
+def run_queries(encoder, queries):
+    hist = LatencyHistogram()
+    for query in queries:
+        t0 = time.perf_counter()
+        encoder.encode([query])
+        hist.record(time.perf_counter() - t0)
+    return hist.summary_ms()
+
+def main():
+    parser = argparse.ArgumentParser(description="Query-embedding latency with and without the two-level cache")
+    parser.add_argument('--embedder', default=None, help="'hashing' or a sentence-transformers model (default: minilm)")
+    parser.add_argument('--queries', type=int, default=5000, help="queries replayed (default: 5000)")
+    parser.add_argument('--distinct', type=int, default=2000, help="distinct query strings (default: 2000)")
+    parser.add_argument('--zipf-s', type=float, default=1.0, help="query popularity skew (default: 1.0)")
+    parser.add_argument('--max-entries', type=int, default=500, help="in-process LRU size (default: 500)")
+    parser.add_argument('--ttl', type=int, default=3600, help="Redis tier TTL in seconds (default: 3600)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    r = get_client(decode_responses=False)
+    embedder = get_embedder(args.embedder)
+    queries = query_log(args.queries, args.distinct, args.zipf_s, args.seed)
+    embedder.encode(queries[:1])  # load the model outside the timed runs
+
+    prefix = 'embcache_bench:'
+    for key in r.scan_iter(f"{prefix}*", count=1000):
+        r.unlink(key)
+
+    print(f"{args.queries:,} queries over {args.distinct:,} distinct strings, embedder {embedder.name}\n")
+    print(f"{'run':<30} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+    def show(label, summary):
+        print(f"{label:<30} {summary['p50']:>9.3f} {summary['p99']:>9.3f} {summary['mean']:>9.3f}")
+
+    show('model only', run_queries(embedder, queries))
+    cache = EmbeddingCache(embedder, r, args.max_entries, args.ttl, prefix=prefix)
+    show('cold cache', run_queries(cache, queries))
+    print(f"  {format_stats(cache.stats())}")
+    # A fresh process on another node: empty LRU, warm Redis tier
+    other = EmbeddingCache(embedder, r, args.max_entries, args.ttl, prefix=prefix)
+    show('new process, shared tier warm', run_queries(other, queries))
+    print(f"  {format_stats(other.stats())}")
+
+    for key in r.scan_iter(f"{prefix}*", count=1000):
+        r.unlink(key)
+
+if __name__ == "__main__":
+    main()
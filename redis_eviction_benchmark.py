@@ -0,0 +1,201 @@
+import time
+import random
+import bisect
+import argparse
+import json
+from dotenv import load_dotenv
+from redis_info_sampler import InfoSampler
+from redis_connection import get_client
+
+load_dotenv()  # Loads variables from .env
+
+POLICIES = ['allkeys-lru', 'allkeys-lfu', 'allkeys-random']
+
+class ZipfianKeys:
+    """
+    Draws key indexes with probability proportional to 1 / rank**s. A random
+    permutation spreads the hot ranks over the keyspace.
+    """
+
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        self.ranks = list(range(n))
+        rng.shuffle(self.ranks)
+        total = 0.0
+        self.cdf = []
+        for rank in range(1, n + 1):
+            total += 1.0 / rank ** s
+            self.cdf.append(total)
+        self.total = total
+
+    def __call__(self):
+        return self.ranks[bisect.bisect_left(self.cdf, self.rng.random() * self.total)]
+
+class HotSetKeys:
+    """
+    hot_fraction of the keys receive hot_weight of the accesses.
+    """
+
+    def __init__(self, n, hot_fraction, hot_weight, rng):
+        self.rng = rng
+        self.n = n
+        self.hot = max(1, int(n * hot_fraction))
+        self.hot_weight = hot_weight
+
+    def __call__(self):
+        if self.rng.random() < self.hot_weight:
+            return self.rng.randrange(self.hot)
+        return self.rng.randrange(self.hot, self.n) if self.hot < self.n else self.rng.randrange(self.n)
+
+class ScanHeavyKeys:
+    """
+    A Zipfian working set interrupted by sequential scans over the whole
+    keyspace, the access pattern that flushes a plain LRU cache.
+    """
+
+    def __init__(self, n, s, scan_fraction, rng):
+        self.rng = rng
+        self.n = n
+        self.zipf = ZipfianKeys(n, s, rng)
+        self.scan_fraction = scan_fraction
+        self.cursor = 0
+
+    def __call__(self):
+        if self.rng.random() < self.scan_fraction:
+            self.cursor = (self.cursor + 1) % self.n
+            return self.cursor
+        return self.zipf()
+
+def make_key_chooser(args, rng):
+    if args.workload == 'zipf':
+        return ZipfianKeys(args.keys, args.zipf_s, rng)
+    if args.workload == 'hotset':
+        return HotSetKeys(args.keys, args.hot_fraction, args.hot_weight, rng)
+    return ScanHeavyKeys(args.keys, args.zipf_s, args.scan_fraction, rng)
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_policy(r, policy, args):
+    """
+    Replays the workload against a flushed database under one eviction policy.
+    A GET miss is treated as a cache miss and followed by a SET, like a
+    read-through cache would do.
+    """
+    r.flushdb()
+    r.config_set('maxmemory-policy', policy)
+    r.config_set('maxmemory', args.maxmemory)
+    r.config_resetstat()
+
+    rng = random.Random(args.seed)
+    choose = make_key_chooser(args, rng)
+    value = b'x' * args.value_size
+
+    # Warm-up writes fill memory past maxmemory so evictions are active during the measured phase
+    pipe = r.pipeline(transaction=False)
+    for _ in range(args.warmup):
+        pipe.set(f"cache:{choose()}", value)
+        if len(pipe) >= 500:
+            pipe.execute()
+    pipe.execute()
+    r.config_resetstat()
+
+    sampler = InfoSampler(r, interval=args.sample_interval, live=False)
+    sampler.start()
+    latencies = []
+    hits = misses = writes = 0
+    start = time.perf_counter()
+    for _ in range(args.ops):
+        key = f"cache:{choose()}"
+        if rng.random() < args.write_ratio:
+            r.set(key, value)
+            writes += 1
+            continue
+        t0 = time.perf_counter()
+        found = r.get(key)
+        latencies.append(time.perf_counter() - t0)
+        if found is None:
+            misses += 1
+            r.set(key, value)
+        else:
+            hits += 1
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+
+    latencies.sort()
+    stats = r.info('stats')
+    memory = r.info('memory')
+    reads = hits + misses
+    return {
+        'policy': policy,
+        'ops': args.ops,
+        'ops_per_sec': args.ops / elapsed,
+        'reads': reads,
+        'writes': writes,
+        'hit_ratio': hits / reads if reads else 0.0,
+        'get_p50_ms': percentile(latencies, 50) * 1000,
+        'get_p99_ms': percentile(latencies, 99) * 1000,
+        'evicted_keys': stats['evicted_keys'],
+        'used_memory': memory['used_memory'],
+        'keys_resident': r.dbsize(),
+        'sampler': sampler.summary(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare eviction policies under a skewed cache workload (run against a local redis-server)")
+    parser.add_argument('--policies', default=','.join(POLICIES),
+                        help=f"comma-separated maxmemory-policy values (default: {','.join(POLICIES)})")
+    parser.add_argument('--workload', choices=['zipf', 'hotset', 'scan'], default='zipf')
+    parser.add_argument('--keys', type=int, default=200000, help="keyspace size (default: 200000)")
+    parser.add_argument('--value-size', type=int, default=1024, help="value bytes (default: 1024)")
+    parser.add_argument('--maxmemory', default='64mb',
+                        help="maxmemory for the runs; keep it below keys * value size (default: 64mb)")
+    parser.add_argument('--ops', type=int, default=200000, help="measured operations per policy (default: 200000)")
+    parser.add_argument('--warmup', type=int, default=200000, help="warm-up SETs per policy (default: 200000)")
+    parser.add_argument('--write-ratio', type=float, default=0.1,
+                        help="fraction of operations that are blind SETs (default: 0.1)")
+    parser.add_argument('--zipf-s', type=float, default=0.99, help="Zipf exponent (default: 0.99)")
+    parser.add_argument('--hot-fraction', type=float, default=0.1)
+    parser.add_argument('--hot-weight', type=float, default=0.9)
+    parser.add_argument('--scan-fraction', type=float, default=0.2,
+                        help="share of scan accesses in the 'scan' workload (default: 0.2)")
+    parser.add_argument('--sample-interval', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--out', default=None, help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    r = get_client(decode_responses=False)
+    original = r.config_get('maxmemory*')
+
+    print(f"Workload '{args.workload}' over {args.keys} keys of {args.value_size} bytes, "
+          f"maxmemory {args.maxmemory}, {args.ops} ops per policy")
+    print("NOTE: this FLUSHES the database and changes maxmemory settings between runs.\n")
+    results = []
+    try:
+        for policy in [p.strip() for p in args.policies.split(',') if p.strip()]:
+            print(f"Running {policy}...")
+            res = run_policy(r, policy, args)
+            results.append(res)
+            print(f"  hit ratio {res['hit_ratio']:.1%}, GET p50 {res['get_p50_ms']:.3f} ms, "
+                  f"p99 {res['get_p99_ms']:.3f} ms, evicted {res['evicted_keys']}, "
+                  f"{res['ops_per_sec']:,.0f} ops/s")
+    finally:
+        for name in ('maxmemory', 'maxmemory-policy'):
+            if name in original:
+                r.config_set(name, original[name])
+
+    print(f"\n{'policy':<18} {'hit ratio':>10} {'p50 ms':>8} {'p99 ms':>8} {'evicted':>10} {'resident':>10}")
+    for res in results:
+        print(f"{res['policy']:<18} {res['hit_ratio']:>10.1%} {res['get_p50_ms']:>8.3f} "
+              f"{res['get_p99_ms']:>8.3f} {res['evicted_keys']:>10} {res['keys_resident']:>10}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import csv
+import json
+import time
+import threading
+
+STATS_FIELDS = ['used_memory', 'maxmemory', 'evicted_keys', 'expired_keys',
+                'keyspace_hits', 'keyspace_misses', 'instantaneous_ops_per_sec']
+
+class InfoSampler(threading.Thread):
+    """
+    Samples INFO memory and INFO stats on a background thread at a fixed
+    interval and keeps the time series, so a load run can be analysed without
+    the Redis Cloud / Enterprise monitoring UI.
+    """
+
+    def __init__(self, r, interval=1.0, live=True):
+        super().__init__(name="info-sampler", daemon=True)
+        self.r = r
+        self.interval = interval
+        self.live = live
+        self.samples = []
+        self.eviction_start = None
+        self.stop_event = threading.Event()
+        self.started_at = None
+
+    def take_sample(self):
+        pipe = self.r.pipeline(transaction=False)
+        pipe.info('memory')
+        pipe.info('stats')
+        memory, stats = pipe.execute()
+        now = time.perf_counter()
+        sample = {'t': round(now - self.started_at, 3)}
+        for field in STATS_FIELDS:
+            sample[field] = memory.get(field, stats.get(field, 0))
+
+        previous = self.samples[-1] if self.samples else None
+        if previous:
+            dt = sample['t'] - previous['t'] or self.interval
+            sample['evictions_per_sec'] = (sample['evicted_keys'] - previous['evicted_keys']) / dt
+        else:
+            sample['evictions_per_sec'] = 0.0
+        lookups = sample['keyspace_hits'] + sample['keyspace_misses']
+        sample['hit_ratio'] = sample['keyspace_hits'] / lookups if lookups else None
+
+        if self.eviction_start is None and previous and sample['evicted_keys'] > self.samples[0]['evicted_keys']:
+            self.eviction_start = {
+                't': sample['t'],
+                'ops_per_sec': sample['instantaneous_ops_per_sec'],
+                'used_memory': sample['used_memory'],
+            }
+        self.samples.append(sample)
+        return sample
+
+    def run(self):
+        self.started_at = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                sample = self.take_sample()
+                if self.live:
+                    print(format_sample(sample))
+            except Exception as e:
+                print(f"[sampler] {e}")
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join(timeout=self.interval + 5)
+        # One last sample so the series ends after the load finished
+        if self.started_at is not None:
+            try:
+                self.take_sample()
+            except Exception as e:
+                # Called from finally blocks; must not replace the exception that ended the run
+                print(f"[sampler] {e}")
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        first, last = self.samples[0], self.samples[-1]
+        evictions = last['evicted_keys'] - first['evicted_keys']
+        duration = last['t'] - first['t']
+        return {
+            'samples': len(self.samples),
+            'duration_s': duration,
+            'peak_used_memory': max(s['used_memory'] for s in self.samples),
+            'maxmemory': last['maxmemory'],
+            'evicted_keys': evictions,
+            'avg_evictions_per_sec': evictions / duration if duration else 0.0,
+            'peak_evictions_per_sec': max(s['evictions_per_sec'] for s in self.samples),
+            'peak_ops_per_sec': max(s['instantaneous_ops_per_sec'] for s in self.samples),
+            'eviction_start': self.eviction_start,
+        }
+
+    def write(self, path):
+        """
+        Writes the series as JSON (samples plus summary) or, for a .csv path, one row per sample.
+        """
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(self.samples[0].keys()) if self.samples else ['t'])
+                writer.writeheader()
+                writer.writerows(self.samples)
+        else:
+            with open(path, 'w') as f:
+                json.dump({'summary': self.summary(), 'samples': self.samples}, f, indent=2)
+
+def format_sample(sample):
+    hit_ratio = f"{sample['hit_ratio']:.1%}" if sample['hit_ratio'] is not None else "n/a"
+    return (f"[{sample['t']:7.1f}s] used {sample['used_memory'] / 2**20:8.1f} MB"
+            f" / max {sample['maxmemory'] / 2**20:,.0f} MB | ops/s {sample['instantaneous_ops_per_sec']:>7}"
+            f" | evicted {sample['evicted_keys']:>8} ({sample['evictions_per_sec']:,.0f}/s) | hits {hit_ratio}")
+
+def print_summary(summary):
+    if not summary:
+        print("No INFO samples collected.")
+        return
+    print("\n===== Memory / eviction summary =====")
+    print(f"Samples:               {summary['samples']} over {summary['duration_s']:.1f}s")
+    print(f"Peak used memory:      {summary['peak_used_memory'] / 2**20:,.1f} MB"
+          f" (maxmemory {summary['maxmemory'] / 2**20:,.0f} MB)")
+    print(f"Keys evicted:          {summary['evicted_keys']}")
+    print(f"Eviction rate:         avg {summary['avg_evictions_per_sec']:,.0f}/s,"
+          f" peak {summary['peak_evictions_per_sec']:,.0f}/s")
+    print(f"Peak ops/sec:          {summary['peak_ops_per_sec']:,}")
+    start = summary['eviction_start']
+    if start:
+        print(f"Evictions started at:  {start['t']:.1f}s, {start['ops_per_sec']:,} ops/sec,"
+              f" used memory {start['used_memory'] / 2**20:,.1f} MB")
+    else:
+        print("Evictions started at:  no evictions observed")
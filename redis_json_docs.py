@@ -0,0 +1,270 @@
+import json
+import time
+import random
+import argparse
+from redis_connection import get_client
+from workshop_bench import LatencyHistogram
+
+class JsonBatch:
+    """
+    Queues JSON.SET / NUMINCRBY / ARRAPPEND / DEL / GET calls, on any number of
+    keys, and sends them in one pipeline (transaction=True wraps them in
+    MULTI/EXEC). Usable as a context manager, which executes on a clean exit.
+    """
+
+    def __init__(self, r, transaction=False):
+        self.pipe = r.pipeline(transaction=transaction)
+        self.json = self.pipe.json()
+        self.results = None
+
+    def set(self, key, path, value):
+        self.json.set(key, path, value)
+        return self
+
+    def numincrby(self, key, path, amount):
+        self.json.numincrby(key, path, amount)
+        return self
+
+    def arrappend(self, key, path, *values):
+        self.json.arrappend(key, path, *values)
+        return self
+
+    def delete(self, key, path):
+        self.json.delete(key, path)
+        return self
+
+    def get(self, key, *paths):
+        self.json.get(key, *paths)
+        return self
+
+    def __len__(self):
+        return len(self.pipe)
+
+    def execute(self):
+        self.results = self.pipe.execute()
+        return self.results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.execute()
+        else:
+            self.pipe.reset()
+
+class JsonDocuments:
+    """
+    Path-level access to RedisJSON documents, so callers fetch and change only
+    the fields they need instead of moving whole documents.
+    """
+
+    def __init__(self, r, batch=100):
+        self.r = r
+        self.batch = batch
+
+    def get_paths(self, key, paths, first=True):
+        """
+        Reads several JSONPaths with one JSON.GET. Returns {path: value}, the
+        first match per path (None if nothing matched) or, with first=False,
+        the full list of matches.
+        """
+        paths = list(paths)
+        reply = self.r.json().get(key, *paths)
+        if reply is None:
+            return None
+        # A single path comes back as its match list, several as {path: matches}
+        matches = {paths[0]: reply} if len(paths) == 1 else reply
+        if not first:
+            return matches
+        return {path: (matches.get(path) or [None])[0] for path in paths}
+
+    def mget(self, keys, path, first=True):
+        """
+        Reads one path from many documents with JSON.MGET, `batch` keys per
+        command in one pipeline. Returns one value per key (None if missing).
+        """
+        keys = list(keys)
+        pipe = self.r.pipeline(transaction=False)
+        for i in range(0, len(keys), self.batch):
+            pipe.json().mget(keys[i:i + self.batch], path)
+        values = [value for reply in pipe.execute() for value in reply]
+        if not first:
+            return values
+        return [value[0] if value else None for value in values]
+
+    def mget_paths(self, keys, paths):
+        """
+        Several paths from many documents: one multi-path JSON.GET per key,
+        all in a single pipeline. Returns a {path: first match} dict per key.
+        """
+        paths = list(paths)
+        batch = JsonBatch(self.r)
+        for key in keys:
+            batch.get(key, *paths)
+        results = []
+        for reply in batch.execute():
+            if reply is None:
+                results.append(None)
+                continue
+            matches = {paths[0]: reply} if len(paths) == 1 else reply
+            results.append({path: (matches.get(path) or [None])[0] for path in paths})
+        return results
+
+    def batch(self, transaction=False):
+        return JsonBatch(self.r, transaction)
+
+    def update(self, key, values=None, increments=None, appends=None, transaction=False):
+        """
+        Applies {path: value} sets, {path: amount} increments and
+        {path: [items]} appends to one document in a single round trip.
+        """
+        batch = JsonBatch(self.r, transaction)
+        for path, value in (values or {}).items():
+            batch.set(key, path, value)
+        for path, amount in (increments or {}).items():
+            batch.numincrby(key, path, amount)
+        for path, items in (appends or {}).items():
+            batch.arrappend(key, path, *items)
+        return batch.execute()
+
+# =================== Benchmark ===================
+
+def make_document(target_bytes, rng, user_id=1002):
+    """
+    A user document shaped like redis-json.py's, padded with a history array
+    until its serialized size reaches target_bytes.
+    """
+    doc = {"user": {"id": user_id, "name": "Alice",
+                    "address": {"city": "New York", "zip": "10001"},
+                    "contacts": [{"type": "email", "value": "alice@example.com"},
+                                 {"type": "phone", "value": "555-1234"}],
+                    "stats": {"visits": 34, "is_active": True},
+                    "history": []}}
+    size = len(json.dumps(doc))
+    while size < target_bytes:
+        event = {"ts": 1700000000 + rng.randrange(10**7), "action": rng.choice(["view", "click", "buy"]),
+                 "item": f"sku-{rng.randrange(10**6)}"}
+        doc["user"]["history"].append(event)
+        size += len(json.dumps(event)) + 2
+    return doc
+
+def arg_bytes(*args):
+    return sum(len(a if isinstance(a, bytes) else str(a).encode()) for a in args)
+
+class ByteCounter:
+    """
+    Issues raw JSON commands on a non-decoding client and tallies request and
+    reply payload bytes.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sent = 0
+        self.received = 0
+
+    def __call__(self, *args):
+        self.sent += arg_bytes(*args)
+        reply = self.raw.execute_command(*args)
+        if isinstance(reply, bytes):
+            self.received += len(reply)
+        elif isinstance(reply, list):
+            self.received += sum(len(x) for x in reply if isinstance(x, bytes))
+        return reply
+
+READ_PATHS = ['$.user.name', '$.user.address.city', '$.user.stats.visits']
+
+def bench_size(r, raw, target, args, rng):
+    docs = JsonDocuments(r)
+    keys = [f"json_bench:{target}:{i}" for i in range(args.docs)]
+    load = JsonBatch(r)
+    for i, key in enumerate(keys):
+        load.set(key, '$', make_document(target, rng, i))
+        if len(load) >= 50:
+            load.execute()
+            load = JsonBatch(r)
+    load.execute()
+
+    results = {}
+    def measure(name, fn, counter=None):
+        hist = LatencyHistogram()
+        for _ in range(args.ops):
+            key = rng.choice(keys)
+            t0 = time.perf_counter()
+            fn(key)
+            hist.record(time.perf_counter() - t0)
+        summary = hist.summary_ms()
+        if counter is not None:
+            summary['bytes_per_op'] = (counter.sent + counter.received) / args.ops
+        results[name] = summary
+
+    whole = ByteCounter(raw)
+    measure('read: whole doc', lambda k: json.loads(whole('JSON.GET', k, '$')), whole)
+    partial = ByteCounter(raw)
+    measure('read: 3 paths', lambda k: partial('JSON.GET', k, *READ_PATHS), partial)
+
+    def rewrite(key):
+        doc = json.loads(whole_rw('JSON.GET', key, '$'))[0]
+        doc['user']['address']['city'] = 'San Francisco'
+        doc['user']['stats']['visits'] += 1
+        doc['user']['history'].append({"ts": 0, "action": "view", "item": "sku-1"})
+        whole_rw('JSON.SET', key, '$', json.dumps(doc))
+    whole_rw = ByteCounter(raw)
+    measure('update: get + set doc', rewrite, whole_rw)
+
+    partial_rw = ByteCounter(raw)
+    def patch(key):
+        pipe = raw.pipeline(transaction=False)
+        commands = [('JSON.SET', key, '$.user.address.city', '"San Francisco"'),
+                    ('JSON.NUMINCRBY', key, '$.user.stats.visits', 1),
+                    ('JSON.ARRAPPEND', key, '$.user.history', '{"ts":0,"action":"view","item":"sku-1"}')]
+        for command in commands:
+            partial_rw.sent += arg_bytes(*command)
+            pipe.execute_command(*command)
+        for reply in pipe.execute():
+            if isinstance(reply, bytes):
+                partial_rw.received += len(reply)
+    measure('update: 3-path pipeline', patch, partial_rw)
+
+    measure('update: JsonDocuments', lambda k: docs.update(
+        k, values={'$.user.address.city': 'San Francisco'}, increments={'$.user.stats.visits': 1},
+        appends={'$.user.history': [{"ts": 0, "action": "view", "item": "sku-1"}]}))
+
+    sample = keys[:min(len(keys), 100)]
+    t0 = time.perf_counter()
+    pipe = raw.pipeline(transaction=False)
+    for key in sample:
+        pipe.execute_command('JSON.GET', key, '$')
+    whole_bytes = sum(len(x) for x in pipe.execute() if x)
+    whole_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    mget_reply = raw.execute_command('JSON.MGET', *sample, '$.user.address.city')
+    mget_bytes = sum(len(x) for x in mget_reply if x)
+    mget_ms = (time.perf_counter() - t0) * 1000
+    results['bulk: 100 whole docs'] = {'p50': whole_ms, 'p99': whole_ms, 'bytes_per_op': whole_bytes}
+    results['bulk: JSON.MGET 1 path'] = {'p50': mget_ms, 'p99': mget_ms, 'bytes_per_op': mget_bytes}
+
+    r.delete(*keys)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Partial-path vs whole-document RedisJSON access")
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000',
+                        help="comma-separated document sizes in bytes (default: 1KB..1MB)")
+    parser.add_argument('--docs', type=int, default=100, help="documents per size (default: 100)")
+    parser.add_argument('--ops', type=int, default=500, help="timed operations per scenario (default: 500)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    r = get_client()
+    raw = get_client(decode_responses=False)
+    rng = random.Random(args.seed)
+    for target in [int(s) for s in args.sizes.split(',')]:
+        print(f"\n~{target:,} byte documents:")
+        print(f"  {'scenario':<26} {'p50 ms':>9} {'p99 ms':>9} {'bytes/op':>12}")
+        for name, res in bench_size(r, raw, target, args, rng).items():
+            nbytes = f"{res['bytes_per_op']:,.0f}" if 'bytes_per_op' in res else '-'
+            print(f"  {name:<26} {res['p50']:>9.3f} {res['p99']:>9.3f} {nbytes:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import multiprocessing
+from collections import deque
+import redis
+from redis_connection import get_client
+
+try:
+    import resource
+except ImportError:  # optional: Unix only, peak RSS is reported as n/a on Windows
+    resource = None
+
+# =================== Input ===================
+
+def read_chunks(path, offset=0, lines_per_chunk=5000, max_chunk_bytes=8 << 20):
+    """
+    Yields (start, end, lines) byte ranges of an NDJSON file, reading it
+    incrementally from `offset`. Chunks always end on a line boundary, so
+    `end` is a safe resume point once the chunk is written.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        start, size, lines = offset, 0, []
+        for line in f:
+            lines.append(line)
+            size += len(line)
+            if len(lines) >= lines_per_chunk or size >= max_chunk_bytes:
+                yield start, start + size, lines
+                start, size, lines = start + size, 0, []
+        if lines:
+            yield start, start + size, lines
+
+def derive_key(doc, path, prefix):
+    value = doc
+    for part in path:
+        value = value[part]
+    if isinstance(value, (dict, list)) or value is None:
+        raise TypeError("key field must be a scalar")
+    return f"{prefix}{value}"
+
+# =================== Workers ===================
+
+_worker = {}
+
+def resolve_mode(r, mode):
+    # JSON.MSET needs RedisJSON 2.6+; fall back to pipelined JSON.SET without it
+    if mode != 'auto':
+        return mode
+    probe = 'json_loader:probe'
+    try:
+        r.execute_command('JSON.MSET', probe, '$', '1')
+        r.delete(probe)
+        return 'mset'
+    except redis.exceptions.ResponseError:
+        return 'set'
+
+def init_worker(key_field, key_prefix, mode, batch):
+    r = get_client(decode_responses=False, max_connections=2)
+    _worker.update(r=r, path=key_field.split('.'), prefix=key_prefix,
+                   mode=resolve_mode(r, mode), batch=batch)
+
+def write_documents(r, pairs, mode, batch):
+    # The original line is sent as-is: it has been validated, so re-serializing would only cost CPU
+    pipe = r.pipeline(transaction=False)
+    for i in range(0, len(pairs), batch):
+        chunk = pairs[i:i + batch]
+        if mode == 'mset':
+            args = []
+            for key, line in chunk:
+                args.extend((key, '$', line))
+            pipe.execute_command('JSON.MSET', *args)
+        else:
+            for key, line in chunk:
+                pipe.execute_command('JSON.SET', key, '$', line)
+        pipe.execute()
+
+def load_chunk(start, end, lines):
+    """
+    Parses one chunk and writes it; returns (end, docs, bytes, errors).
+    """
+    pairs = []
+    errors = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            key = derive_key(json.loads(line), _worker['path'], _worker['prefix'])
+        except (ValueError, KeyError, IndexError, TypeError):
+            errors += 1
+            continue
+        pairs.append((key, line))
+    write_documents(_worker['r'], pairs, _worker['mode'], _worker['batch'])
+    return end, len(pairs), end - start, errors
+
+# =================== Checkpoints ===================
+
+def read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def write_checkpoint(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+# =================== Loader ===================
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux but bytes on macOS; children are only counted once they have exited
+    if resource is None:
+        return None, None
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit
+    return own, children
+
+def run_loader(args):
+    """
+    Streams args.input through a pool of parse-and-write worker processes. At
+    most workers * inflight chunks are in memory at a time. Chunks complete in
+    order, so after each one the checkpoint records the byte offset up to
+    which every document has been written; --resume restarts from there.
+    JSON.SET overwrites, so replaying the chunk that was in flight is safe.
+    """
+    checkpoint_path = args.checkpoint or f"{args.input}.checkpoint"
+    state = {'offset': 0, 'docs': 0, 'errors': 0}
+    if args.resume:
+        saved = read_checkpoint(checkpoint_path)
+        if saved:
+            if saved.get('input_size') not in (None, os.path.getsize(args.input)) and not args.force:
+                raise SystemExit(f"{args.input} changed size since the checkpoint; use --force to resume anyway")
+            state.update(saved)
+            print(f"Resuming at byte {state['offset']:,} ({state['docs']:,} documents already loaded)")
+    state['input_size'] = os.path.getsize(args.input)
+
+    pool = multiprocessing.Pool(args.workers, initializer=init_worker,
+                                initargs=(args.key_field, args.key_prefix, args.mode, args.batch))
+    pending = deque()
+    docs = nbytes = errors = 0
+    start = last_report = time.perf_counter()
+
+    def complete_oldest():
+        nonlocal docs, nbytes, errors, last_report
+        end, n, size, bad = pending.popleft().get()
+        docs += n
+        nbytes += size
+        errors += bad
+        state.update(offset=end, docs=state['docs'] + n, errors=state['errors'] + bad)
+        write_checkpoint(checkpoint_path, state)
+        now = time.perf_counter()
+        if now - last_report >= args.report_interval:
+            elapsed = now - start
+            print(f"  {state['docs']:,} docs  {docs / elapsed:,.0f} docs/s  {nbytes / elapsed / 1e6:,.1f} MB/s  "
+                  f"{state['offset'] / state['input_size']:.1%} of input")
+            last_report = now
+
+    try:
+        for chunk in read_chunks(args.input, state['offset'], args.chunk_lines):
+            pending.append(pool.apply_async(load_chunk, chunk))
+            if len(pending) >= args.workers * args.inflight:
+                complete_oldest()
+        while pending:
+            complete_oldest()
+    except BaseException:
+        pool.terminate()
+        pool.join()
+        print(f"Load interrupted; checkpoint at byte {state['offset']:,} in {checkpoint_path}. "
+              f"Rerun with --resume to continue.")
+        raise
+    pool.close()
+    pool.join()
+
+    elapsed = time.perf_counter() - start
+    own_rss, worker_rss = peak_rss_mb()
+    print(f"\nLoaded {docs:,} documents ({errors:,} rejected) in {elapsed:.1f}s")
+    print(f"  {docs / elapsed:,.0f} docs/s, {nbytes / elapsed / 1e6:,.1f} MB/s")
+    if own_rss is None:
+        print("  peak RSS: n/a (no resource module on this platform)")
+    else:
+        print(f"  peak RSS: loader {own_rss:,.0f} MB, largest worker {worker_rss:,.0f} MB")
+    if not args.keep_checkpoint:
+        os.remove(checkpoint_path)
+    return docs
+
+# =================== Synthetic input ===================
+
+def generate(path, count, seed=1):
+    """
+    Writes `count` user documents shaped like redis-json.py's nested_json.
+    """
+    rng = random.Random(seed)
+    cities = [("New York", "10001"), ("San Francisco", "94105"), ("Boston", "02108"), ("Austin", "73301")]
+    with open(path, 'w') as f:
+        for user_id in range(count):
+            city, zipcode = rng.choice(cities)
+            doc = {"user": {"id": user_id, "name": f"user{user_id}",
+                            "address": {"city": city, "zip": zipcode},
+                            "contacts": [{"type": "email", "value": f"user{user_id}@example.com"}],
+                            "stats": {"visits": rng.randrange(1000), "is_active": rng.random() < 0.8}}}
+            f.write(json.dumps(doc, separators=(',', ':')))
+            f.write('\n')
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream NDJSON documents into RedisJSON")
+    parser.add_argument('input', help="NDJSON file, one document per line")
+    parser.add_argument('--key-field', default='user.id', help="dotted path of the key field (default: user.id)")
+    parser.add_argument('--key-prefix', default='user:', help="prefix for derived keys (default: 'user:')")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                        help="parse/write worker processes (default: CPU count)")
+    parser.add_argument('--chunk-lines', type=int, default=5000, help="lines per work unit (default: 5000)")
+    parser.add_argument('--batch', type=int, default=500,
+                        help="documents per JSON.MSET / pipeline flush (default: 500)")
+    parser.add_argument('--inflight', type=int, default=2, help="chunks queued per worker (default: 2)")
+    parser.add_argument('--mode', choices=['auto', 'mset', 'set'], default='auto',
+                        help="JSON.MSET, pipelined JSON.SET, or detect (default: auto)")
+    parser.add_argument('--resume', action='store_true', help="continue from the last checkpoint")
+    parser.add_argument('--force', action='store_true', help="resume even if the input file changed size")
+    parser.add_argument('--checkpoint', default=None, help="checkpoint file (default: <input>.checkpoint)")
+    parser.add_argument('--keep-checkpoint', action='store_true', help="keep the checkpoint after a full load")
+    parser.add_argument('--report-interval', type=float, default=5.0)
+    parser.add_argument('--generate', type=int, default=None, metavar='N',
+                        help="write N synthetic documents to INPUT and exit")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.input, args.generate)
+        print(f"Wrote {args.generate:,} documents to {args.input}")
+        return
+    run_loader(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import time
+import random
+import argparse
+import datetime
+import threading
+from redis_connection import get_client
+from workshop_bench import LatencyHistogram
+
+# Daily boards are kept a little over a week so weekly rollups can always be rebuilt
+DAY_TTL = 8 * 86400
+# A weekly board is a ZUNIONSTORE of its daily boards, rebuilt when older than this
+WEEK_TTL = 60
+
+AGGREGATE = {'gt': 'MAX', 'incr': 'SUM'}
+
+class Leaderboard:
+    """
+    Leaderboard on a sorted set, for boards far too large to fetch whole.
+
+    mode 'gt' keeps each player's best score (ZADD GT), mode 'incr' adds to it
+    (ZINCRBY). Writes go to the all-time key and, with windows=True, to a daily
+    key; weekly boards are built from the daily ones with ZUNIONSTORE. Top-N
+    pages are cached in-process for cache_ttl seconds and dropped on every write
+    made through this instance; writes from other processes show up once the
+    TTL runs out.
+    """
+
+    def __init__(self, r, name='game:leaderboard', mode='gt', windows=True, cache_ttl=1.0, batch=1000):
+        if mode not in AGGREGATE:
+            raise ValueError(f"unknown leaderboard mode '{mode}' (expected 'gt' or 'incr')")
+        self.r = r
+        self.key = name
+        self.mode = mode
+        self.windows = windows
+        self.cache_ttl = cache_ttl
+        self.batch = batch
+        # Window keys share a hash tag so ZUNIONSTORE works on a cluster too
+        self.window_prefix = f"{{{name}}}"
+        self.pages = {}  # (key, start, stop) -> (expires_at, rows)
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    # --- keys ---
+
+    def day_key(self, day=None):
+        day = day or datetime.datetime.now(datetime.timezone.utc).date()
+        return f"{self.window_prefix}:day:{day:%Y%m%d}"
+
+    def week_key(self, day=None):
+        day = day or datetime.datetime.now(datetime.timezone.utc).date()
+        year, week, _ = day.isocalendar()
+        return f"{self.window_prefix}:week:{year}-W{week:02d}"
+
+    # --- writes ---
+
+    def _queue(self, pipe, key, scores):
+        if self.mode == 'gt':
+            pipe.zadd(key, scores, gt=True)
+        else:
+            for member, delta in scores.items():
+                pipe.zincrby(key, delta, member)
+
+    def submit(self, scores, day=None):
+        """
+        Applies a {member: score} mapping in variadic, pipelined batches and
+        returns the number of members written.
+        """
+        items = list(scores.items())
+        day_key = self.day_key(day) if self.windows else None
+        pipe = self.r.pipeline(transaction=False)
+        for i in range(0, len(items), self.batch):
+            chunk = dict(items[i:i + self.batch])
+            self._queue(pipe, self.key, chunk)
+            if day_key:
+                self._queue(pipe, day_key, chunk)
+            if len(pipe) >= 100:
+                pipe.execute()
+        if day_key:
+            pipe.expire(day_key, DAY_TTL)
+        pipe.execute()
+        self.invalidate()
+        return len(items)
+
+    def submit_one(self, member, score, day=None):
+        return self.submit({member: score}, day)
+
+    # --- reads ---
+
+    def invalidate(self):
+        with self.lock:
+            if self.pages:
+                self.pages.clear()
+                self.counters['invalidations'] += 1
+
+    def _range(self, key, start, stop):
+        if self.cache_ttl > 0:
+            with self.lock:
+                cached = self.pages.get((key, start, stop))
+                if cached is not None and cached[0] >= time.monotonic():
+                    self.counters['hits'] += 1
+                    return cached[1]
+                self.counters['misses'] += 1
+        rows = [(start + i + 1, member, score)
+                for i, (member, score) in enumerate(self.r.zrevrange(key, start, stop, withscores=True))]
+        if self.cache_ttl > 0:
+            with self.lock:
+                self.pages[(key, start, stop)] = (time.monotonic() + self.cache_ttl, rows)
+        return rows
+
+    def top(self, count=10, offset=0, board=None):
+        """
+        Returns [(rank, member, score), ...] for ranks offset+1 .. offset+count.
+        """
+        if count <= 0:
+            return []  # an end index of -1 would mean the whole board to ZREVRANGE
+        return self._range(board or self.key, offset, offset + count - 1)
+
+    def page(self, number, page_size=10, board=None):
+        return self.top(page_size, number * page_size, board)
+
+    def rank(self, member, board=None):
+        rank = self.r.zrevrank(board or self.key, member)
+        return None if rank is None else rank + 1
+
+    def around(self, member, radius=5, board=None):
+        """
+        Returns the member's rank and score plus up to `radius` players on each
+        side, or None if the member is not on the board.
+        """
+        key = board or self.key
+        pipe = self.r.pipeline(transaction=False)
+        pipe.zrevrank(key, member)
+        pipe.zscore(key, member)
+        rank, score = pipe.execute()
+        if rank is None:
+            return None
+        start = max(0, rank - radius)
+        rows = self.r.zrevrange(key, start, rank + radius, withscores=True)
+        return {'rank': rank + 1, 'score': score,
+                'neighbours': [(start + i + 1, m, s) for i, (m, s) in enumerate(rows)]}
+
+    def size(self, board=None):
+        return self.r.zcard(board or self.key)
+
+    # --- time windows ---
+
+    def week_board(self, day=None, refresh=False):
+        """
+        Returns the key of the ISO week's board, rebuilding it from the daily
+        boards when it is missing, expired or refresh is set.
+        """
+        day = day or datetime.datetime.now(datetime.timezone.utc).date()
+        key = self.week_key(day)
+        if refresh or not self.r.exists(key):
+            monday = day - datetime.timedelta(days=day.weekday())
+            days = [self.day_key(monday + datetime.timedelta(days=i)) for i in range(7)]
+            pipe = self.r.pipeline(transaction=False)
+            pipe.zunionstore(key, days, aggregate=AGGREGATE[self.mode])
+            pipe.expire(key, WEEK_TTL)
+            pipe.execute()
+        return key
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['pages'] = len(self.pages)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+# =================== Benchmark ===================
+
+def load_board(board, members, batch, seed):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for i in range(0, members, batch):
+        board.submit({f"player:{j}": rng.randint(0, 10**7) for j in range(i, min(members, i + batch))})
+        if i and i % (batch * 1000) == 0:
+            print(f"  {i:,} members loaded...")
+    return members / (time.perf_counter() - start)
+
+def timed(ops, op, rng):
+    hist = LatencyHistogram()
+    for _ in range(ops):
+        t0 = time.perf_counter()
+        op(rng)
+        hist.record(time.perf_counter() - t0)
+    return hist.summary_ms()
+
+def print_row(name, summary):
+    print(f"  {name:<22} {summary['count']:>8} {summary['p50']:>9.3f} {summary['p99']:>9.3f} "
+          f"{summary['p999']:>9.3f} {summary['max']:>9.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Leaderboard read/update latency at scale")
+    parser.add_argument('--name', default='bench:leaderboard')
+    parser.add_argument('--members', type=int, default=10_000_000, help="players on the board (default: 10M)")
+    parser.add_argument('--batch', type=int, default=1000, help="members per ZADD when loading (default: 1000)")
+    parser.add_argument('--ops', type=int, default=20000, help="timed operations per scenario (default: 20000)")
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--pages', type=int, default=100, help="read pages drawn from the first N (default: 100)")
+    parser.add_argument('--radius', type=int, default=5, help="neighbours on each side for around() (default: 5)")
+    parser.add_argument('--cache-ttl', type=float, default=1.0, help="top-N page cache TTL in seconds (default: 1)")
+    parser.add_argument('--write-every', type=int, default=10,
+                        help="one write per N reads in the mixed cached scenario (default: 10)")
+    parser.add_argument('--window-members', type=int, default=100000,
+                        help="players per daily board for the weekly rollup (default: 100000)")
+    parser.add_argument('--skip-load', action='store_true', help="reuse a board loaded by a previous run")
+    parser.add_argument('--keep', action='store_true', help="keep the benchmark keys after the run")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    r = get_client()
+    board = Leaderboard(r, args.name, windows=False, cache_ttl=0, batch=args.batch)
+    if not args.skip_load:
+        r.delete(board.key)
+        print(f"Loading {args.members:,} members in batches of {args.batch}...")
+        rate = load_board(board, args.members, args.batch, args.seed)
+        print(f"  {rate:,.0f} members/s")
+    members = board.size()
+    print(f"Board '{board.key}': {members:,} members, {r.memory_usage(board.key, samples=0) / 1e6:,.1f} MB\n")
+
+    rng = random.Random(args.seed)
+    def player(rng):
+        return f"player:{rng.randrange(members)}"
+    def page(rng):
+        return rng.randrange(args.pages)
+
+    cached = Leaderboard(r, args.name, windows=False, cache_ttl=args.cache_ttl)
+    counter = [0]
+    def mixed(rng):
+        counter[0] += 1
+        if counter[0] % args.write_every == 0:
+            cached.submit_one(player(rng), rng.randint(0, 10**7))
+        else:
+            cached.page(page(rng), args.page_size)
+
+    print(f"  {'operation':<22} {'ops':>8} {'p50 ms':>9} {'p99 ms':>9} {'p999 ms':>9} {'max ms':>9}")
+    print_row('update (ZADD GT)', timed(args.ops, lambda g: board.submit_one(player(g), g.randint(0, 10**7)), rng))
+    print_row('update batch of 100', timed(max(1, args.ops // 100), lambda g: board.submit(
+        {player(g): g.randint(0, 10**7) for _ in range(100)}), rng))
+    print_row('rank', timed(args.ops, lambda g: board.rank(player(g)), rng))
+    print_row(f'around (+/-{args.radius})', timed(args.ops, lambda g: board.around(player(g), args.radius), rng))
+    print_row(f'top page ({args.page_size})', timed(args.ops, lambda g: board.page(page(g), args.page_size), rng))
+    print_row('top page, cached', timed(args.ops, lambda g: cached.page(page(g), args.page_size), rng))
+    cached.invalidate()
+    cached.counters.update(hits=0, misses=0, invalidations=0)
+    print_row(f'mixed 1:{args.write_every - 1}, cached', timed(args.ops, mixed, rng))
+    stats = cached.stats()
+    print(f"  page cache during mixed run: hit ratio {stats['hit_ratio']:.1%}, {stats['invalidations']} invalidations")
+
+    # Weekly rollup over seven daily boards; a board of its own, since submit() also writes the all-time key
+    windows = Leaderboard(r, f"{args.name}:rollup", windows=True, cache_ttl=0, batch=args.batch)
+    r.delete(windows.key)
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    monday = today - datetime.timedelta(days=today.weekday())
+    for d in range(7):
+        day = monday + datetime.timedelta(days=d)
+        r.delete(windows.day_key(day))
+        day_rng = random.Random(args.seed + d)
+        windows.submit({f"player:{day_rng.randrange(members)}": day_rng.randint(0, 10**7)
+                        for _ in range(args.window_members)}, day=day)
+    start = time.perf_counter()
+    week = windows.week_board(today, refresh=True)
+    elapsed = time.perf_counter() - start
+    print(f"\nWeekly rollup of 7 x {args.window_members:,} daily entries: {elapsed * 1000:.1f} ms "
+          f"({windows.size(week):,} players)")
+
+    if not args.keep:
+        r.delete(board.key, windows.key, week, *[windows.day_key(monday + datetime.timedelta(days=d)) for d in range(7)])
+
+if __name__ == "__main__":
+    main()
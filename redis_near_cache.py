@@ -0,0 +1,208 @@
+import time
+import threading
+from collections import OrderedDict
+import redis
+
+INVALIDATE_CHANNEL = '__redis__:invalidate'
+
+def _key_str(key):
+    return key.decode() if isinstance(key, bytes) else str(key)
+
+class NearCache:
+    """
+    Opt-in in-process cache for GET, HGET and HGETALL results in front of a
+    redis.Redis client, kept coherent with server-assisted client tracking.
+
+    Cached reads go over a dedicated pool whose connections run
+    CLIENT TRACKING ON REDIRECT <listener id>, so every key they read is
+    tracked by the server. When any client modifies such a key, the server
+    sends an invalidation to the listener connection, which drops the local
+    entries. Entries are also bounded by max_entries (LRU) and ttl seconds.
+    Every other command is passed through to the wrapped client unchanged.
+    """
+
+    def __init__(self, r, max_entries=10000, ttl=60.0):
+        self.r = r
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()   # (command, key, field) -> (expires_at, value)
+        self.by_key = {}               # key -> set of cache entries for that key
+        self.lock = threading.RLock()
+        self.seq = 0
+        self.reset_seq = 0
+        self.last_invalidated = {}
+        self.counters = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0,
+                         'expirations': 0, 'resets': 0}
+
+        pool = r.connection_pool
+        self.connection_class = pool.connection_class
+        self.connection_kwargs = dict(pool.connection_kwargs)
+        self.connection_kwargs.pop('redis_connect_func', None)
+
+        self.stop_event = threading.Event()
+        self.listener = None
+        self.listener_id = None
+        self._connect_listener()
+        self.data = redis.Redis(connection_pool=redis.ConnectionPool(
+            connection_class=self.connection_class,
+            redis_connect_func=self._enable_tracking,
+            **self.connection_kwargs))
+        self.thread = threading.Thread(target=self._listen, name="near-cache-invalidations", daemon=True)
+        self.thread.start()
+
+    # --- tracking plumbing ---
+
+    def _connect_listener(self):
+        conn = self.connection_class(**self.connection_kwargs)
+        conn.connect()
+        conn.send_command('CLIENT', 'ID')
+        self.listener_id = int(conn.read_response())
+        conn.send_command('SUBSCRIBE', INVALIDATE_CHANNEL)
+        conn.read_response()
+        self.listener = conn
+
+    def _enable_tracking(self, conn):
+        conn.on_connect()
+        conn.send_command('CLIENT', 'TRACKING', 'ON', 'REDIRECT', self.listener_id)
+        conn.read_response()
+
+    def _listen(self):
+        while not self.stop_event.is_set():
+            try:
+                if not self.listener.can_read(timeout=1.0):
+                    continue
+                message = self.listener.read_response()
+            except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, OSError):
+                if self.stop_event.is_set():
+                    return
+                self._recover()
+                continue
+            if isinstance(message, list) and len(message) == 3 and _key_str(message[0]) == 'message':
+                self._invalidate(message[2])
+
+    def _recover(self):
+        # Invalidations may have been lost and the redirect target is gone:
+        # drop everything and make the data connections re-register tracking.
+        self.clear()
+        while not self.stop_event.is_set():
+            try:
+                self._connect_listener()
+                self.data.connection_pool.disconnect()
+                return
+            except (redis.exceptions.ConnectionError, OSError):
+                time.sleep(1.0)
+
+    def _invalidate(self, keys):
+        with self.lock:
+            self.seq += 1
+            if keys is None:
+                # FLUSHDB / FLUSHALL: the server invalidates everything at once
+                self.reset_seq = self.seq
+                self._drop_all()
+                return
+            for key in keys:
+                key = _key_str(key)
+                self.last_invalidated[key] = self.seq
+                for entry in self.by_key.pop(key, ()):
+                    if self.entries.pop(entry, None) is not None:
+                        self.counters['invalidations'] += 1
+            if len(self.last_invalidated) > self.max_entries * 4:
+                self.last_invalidated.clear()
+                self.reset_seq = self.seq
+
+    def _drop_all(self):
+        self.entries.clear()
+        self.by_key.clear()
+        self.last_invalidated.clear()
+        self.counters['resets'] += 1
+
+    # --- cache bookkeeping ---
+
+    def _lookup(self, entry):
+        with self.lock:
+            cached = self.entries.get(entry)
+            if cached is not None:
+                expires_at, value = cached
+                if expires_at >= time.monotonic():
+                    self.entries.move_to_end(entry)
+                    self.counters['hits'] += 1
+                    return True, value, self.seq
+                self._remove(entry)
+                self.counters['expirations'] += 1
+            self.counters['misses'] += 1
+            return False, None, self.seq
+
+    def _store(self, entry, value, started_seq):
+        key = entry[1]
+        with self.lock:
+            # An invalidation that arrived while the read was in flight makes the value stale
+            if self.reset_seq > started_seq or self.last_invalidated.get(key, 0) > started_seq:
+                return
+            self.entries[entry] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(entry)
+            self.by_key.setdefault(key, set()).add(entry)
+            while len(self.entries) > self.max_entries:
+                oldest, _ = self.entries.popitem(last=False)
+                self._unindex(oldest)
+                self.counters['evictions'] += 1
+
+    def _remove(self, entry):
+        self.entries.pop(entry, None)
+        self._unindex(entry)
+
+    def _unindex(self, entry):
+        entries = self.by_key.get(entry[1])
+        if entries is not None:
+            entries.discard(entry)
+            if not entries:
+                del self.by_key[entry[1]]
+
+    def _cached(self, entry, fetch):
+        found, value, started_seq = self._lookup(entry)
+        if found:
+            return value
+        value = fetch()
+        self._store(entry, value, started_seq)
+        return value
+
+    # --- public API ---
+
+    def get(self, key):
+        return self._cached(('get', _key_str(key), None), lambda: self.data.get(key))
+
+    def hget(self, key, field):
+        return self._cached(('hget', _key_str(key), _key_str(field)), lambda: self.data.hget(key, field))
+
+    def hgetall(self, key):
+        value = self._cached(('hgetall', _key_str(key), None), lambda: self.data.hgetall(key))
+        # Callers may mutate the dict they get back; keep the cached copy intact
+        return dict(value)
+
+    def clear(self):
+        with self.lock:
+            self.seq += 1
+            self.reset_seq = self.seq
+            self._drop_all()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self.entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        self.stop_event.set()
+        self.thread.join(timeout=2.0)
+        self.listener.disconnect()
+        self.data.connection_pool.disconnect()
+
+    def __getattr__(self, name):
+        # Writes and every uncached read go straight to the wrapped client
+        return getattr(self.r, name)
+
+def format_stats(stats):
+    return (f"hits={stats['hits']} misses={stats['misses']} hit-ratio={stats['hit_ratio']:.1%} "
+            f"invalidations={stats['invalidations']} evictions={stats['evictions']} "
+            f"expirations={stats['expirations']} entries={stats['entries']}")
@@ -0,0 +1,329 @@
+import json
+import time
+import random
+import argparse
+from redis_connection import get_client
+from workshop_bench import LatencyHistogram
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for the msgpack variants
+    msgpack = None
+
+# =================== Formats ===================
+
+class HashFormat:
+    """
+    One HASH per profile, as demo_hash stores user:1001.
+    """
+    name = 'hash'
+
+    def __init__(self, prefix='pf:hash:'):
+        self.prefix = prefix
+
+    def key(self, i):
+        return f"{self.prefix}{i}"
+
+    def write(self, pipe, i, profile):
+        pipe.hset(self.key(i), mapping=profile)
+
+    def read(self, pipe, i):
+        pipe.hgetall(self.key(i))
+
+    def read_field(self, r, i, field):
+        return r.hget(self.key(i), field)
+
+    def update_field(self, r, i, field, value):
+        r.hset(self.key(i), field, value)
+
+    def memory_keys(self, indexes):
+        return [self.key(i) for i in indexes]
+
+    def keys_per_profile(self):
+        return 1
+
+class JsonFormat(HashFormat):
+    """
+    One RedisJSON document per profile, as redis-json.py stores user:1002.
+    """
+    name = 'json'
+
+    def __init__(self, prefix='pf:json:'):
+        super().__init__(prefix)
+
+    def write(self, pipe, i, profile):
+        pipe.json().set(self.key(i), '$', profile)
+
+    def read(self, pipe, i):
+        pipe.json().get(self.key(i), '$')
+
+    def read_field(self, r, i, field):
+        return r.json().get(self.key(i), f'$.{field}')
+
+    def update_field(self, r, i, field, value):
+        r.json().set(self.key(i), f'$.{field}', value)
+
+class PackedStringFormat(HashFormat):
+    """
+    The whole profile serialized into one STRING. Field reads decode the
+    value client-side; field updates are a WATCHed read-modify-write.
+    """
+
+    def __init__(self, codec='msgpack', prefix=None):
+        super().__init__(prefix or f"pf:str:{codec}:")
+        self.name = f"string-{codec}"
+        if codec == 'msgpack':
+            if msgpack is None:
+                raise RuntimeError("the msgpack variants need the 'msgpack' package (pip install msgpack)")
+            self.dumps = msgpack.packb
+            self.loads = msgpack.unpackb
+        else:
+            self.dumps = lambda obj: json.dumps(obj, separators=(',', ':'))
+            self.loads = json.loads
+
+    def write(self, pipe, i, profile):
+        pipe.set(self.key(i), self.dumps(profile))
+
+    def read(self, pipe, i):
+        pipe.get(self.key(i))
+
+    def read_field(self, r, i, field):
+        return self.loads(r.get(self.key(i))).get(field)
+
+    def update_field(self, r, i, field, value):
+        key = self.key(i)
+        def apply(pipe):
+            profile = self.loads(pipe.get(key))
+            profile[field] = value
+            pipe.multi()
+            pipe.set(key, self.dumps(profile))
+        r.transaction(apply, key)
+
+class BucketedFormat(PackedStringFormat):
+    """
+    per_bucket packed profiles as fields of one small HASH, so the bucket stays
+    listpack-encoded and the per-key overhead is paid once per bucket. Only
+    works while per_bucket <= hash-max-listpack-entries and each packed
+    profile <= hash-max-listpack-value bytes.
+    """
+
+    def __init__(self, codec='msgpack', per_bucket=100, prefix=None):
+        super().__init__(codec, prefix or f"pf:bucket:{codec}:")
+        self.name = f"bucketed-{codec}"
+        self.per_bucket = per_bucket
+
+    def key(self, i):
+        return f"{self.prefix}{i // self.per_bucket}"
+
+    def write(self, pipe, i, profile):
+        pipe.hset(self.key(i), str(i % self.per_bucket), self.dumps(profile))
+
+    def read(self, pipe, i):
+        pipe.hget(self.key(i), str(i % self.per_bucket))
+
+    def read_field(self, r, i, field):
+        return self.loads(r.hget(self.key(i), str(i % self.per_bucket))).get(field)
+
+    def update_field(self, r, i, field, value):
+        key, slot = self.key(i), str(i % self.per_bucket)
+        def apply(pipe):
+            profile = self.loads(pipe.hget(key, slot))
+            profile[field] = value
+            pipe.multi()
+            pipe.hset(key, slot, self.dumps(profile))
+        r.transaction(apply, key)
+
+    def memory_keys(self, indexes):
+        return sorted({self.key(i) for i in indexes})
+
+    def keys_per_profile(self):
+        return 1 / self.per_bucket
+
+def make_formats(names, per_bucket):
+    formats = []
+    for name in names:
+        try:
+            if name == 'hash':
+                formats.append(HashFormat())
+            elif name == 'json':
+                formats.append(JsonFormat())
+            elif name.startswith('string-'):
+                formats.append(PackedStringFormat(name.split('-', 1)[1]))
+            elif name.startswith('bucketed-'):
+                formats.append(BucketedFormat(name.split('-', 1)[1], per_bucket))
+            else:
+                raise ValueError(f"unknown format '{name}'")
+        except RuntimeError as e:
+            print(f"skipping {name}: {e}")
+    return formats
+
+# =================== Benchmark ===================
+
+COUNTRIES = ['Wonderland', 'Oz', 'Narnia', 'Neverland', 'Atlantis']
+
+def make_profile(i, rng, extra_fields=0, bio_bytes=0):
+    """
+    A demo_hash-style profile, optionally with extra short attributes and a
+    bio; a bio longer than hash-max-listpack-value turns the hash into a hashtable.
+    """
+    profile = {'name': f"user{i}", 'email': f"user{i}@example.com",
+               'age': str(rng.randint(18, 90)), 'country': rng.choice(COUNTRIES)}
+    for n in range(extra_fields):
+        profile[f"attr{n}"] = str(rng.randrange(10**6))
+    if bio_bytes:
+        profile['bio'] = ''.join(rng.choice('abcdefghij ') for _ in range(bio_bytes))
+    return profile
+
+def listpack_config(r):
+    # Redis 7 renamed the ziplist settings to listpack; older servers only know the old names
+    for entries, value in (('hash-max-listpack-entries', 'hash-max-listpack-value'),
+                           ('hash-max-ziplist-entries', 'hash-max-ziplist-value')):
+        config = r.config_get(entries)
+        if config:
+            config.update(r.config_get(value))
+            return {k.decode() if isinstance(k, bytes) else k: int(v) for k, v in config.items()}
+    return {}
+
+def set_listpack_config(r, entries=None, value=None):
+    """
+    Applies the given thresholds and returns {name: previous value} for the
+    settings it changed, so the caller can restore exactly those.
+    """
+    if entries is None and value is None:
+        return {}
+    current = listpack_config(r)
+    if not current:
+        raise RuntimeError("the server does not report hash listpack/ziplist thresholds")
+    names = list(current)
+    changed = {}
+    try:
+        for name, new in ((names[0], entries), (names[1], value)):
+            if new is not None:
+                r.config_set(name, new)
+                changed[name] = current[name]
+    except Exception:
+        for name, old in changed.items():
+            r.config_set(name, old)
+        raise
+    return changed
+
+def delete_prefix(r, prefix):
+    pipe = r.pipeline(transaction=False)
+    for key in r.scan_iter(f"{prefix}*", count=1000):
+        pipe.unlink(key)
+        if len(pipe) >= 1000:
+            pipe.execute()
+    pipe.execute()
+
+def bench_format(r, fmt, profiles, args, rng):
+    delete_prefix(r, fmt.prefix)
+    used_before = r.info('memory')['used_memory']
+
+    start = time.perf_counter()
+    pipe = r.pipeline(transaction=False)
+    for i, profile in enumerate(profiles):
+        fmt.write(pipe, i, profile)
+        if len(pipe) >= args.batch:
+            pipe.execute()
+    pipe.execute()
+    write_rate = len(profiles) / (time.perf_counter() - start)
+    used_after = r.info('memory')['used_memory']
+
+    start = time.perf_counter()
+    pipe = r.pipeline(transaction=False)
+    for i in range(len(profiles)):
+        fmt.read(pipe, i)
+        if len(pipe) >= args.batch:
+            pipe.execute()
+    pipe.execute()
+    read_rate = len(profiles) / (time.perf_counter() - start)
+
+    sample = range(min(args.sample, len(profiles)))
+    keys = fmt.memory_keys(sample)
+    pipe = r.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key, samples=0)
+    sizes = pipe.execute()
+    memory_per_profile = sum(sizes) / len(keys) * fmt.keys_per_profile()
+    encoding = r.object('encoding', keys[0])
+
+    field_read, field_update = LatencyHistogram(), LatencyHistogram()
+    for _ in range(args.ops):
+        i = rng.randrange(len(profiles))
+        t0 = time.perf_counter()
+        fmt.read_field(r, i, 'email')
+        field_read.record(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        fmt.update_field(r, i, 'age', str(rng.randint(18, 90)))
+        field_update.record(time.perf_counter() - t0)
+
+    if not args.keep:
+        delete_prefix(r, fmt.prefix)
+    return {
+        'format': fmt.name,
+        'encoding': encoding.decode() if isinstance(encoding, bytes) else encoding,
+        'memory_usage_per_profile': memory_per_profile,
+        'used_memory_per_profile': (used_after - used_before) / len(profiles),
+        'writes_per_sec': write_rate,
+        'reads_per_sec': read_rate,
+        'field_read_ms': field_read.summary_ms(),
+        'field_update_ms': field_update.summary_ms(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HASH, JSON and packed-string profile storage")
+    parser.add_argument('--profiles', type=int, default=100000, help="synthetic profiles per format (default: 100000)")
+    parser.add_argument('--formats', default='hash,json,string-json,string-msgpack,bucketed-msgpack',
+                        help="comma-separated formats to compare")
+    parser.add_argument('--extra-fields', type=int, default=0, help="extra short attributes per profile")
+    parser.add_argument('--bio-bytes', type=int, default=0,
+                        help="add a bio field of this size; above hash-max-listpack-value it forces hashtable encoding")
+    parser.add_argument('--per-bucket', type=int, default=100, help="profiles per bucketed hash (default: 100)")
+    parser.add_argument('--listpack-entries', type=int, default=None,
+                        help="CONFIG SET hash-max-listpack-entries for the run (restored afterwards)")
+    parser.add_argument('--listpack-value', type=int, default=None,
+                        help="CONFIG SET hash-max-listpack-value for the run (restored afterwards)")
+    parser.add_argument('--batch', type=int, default=1000, help="commands per pipeline (default: 1000)")
+    parser.add_argument('--sample', type=int, default=1000, help="keys sampled with MEMORY USAGE (default: 1000)")
+    parser.add_argument('--ops', type=int, default=2000, help="timed field reads/updates (default: 2000)")
+    parser.add_argument('--target', type=float, default=100e6,
+                        help="profile count to project memory for (default: 100M)")
+    parser.add_argument('--out', default=None, help="write results as JSON to this file")
+    parser.add_argument('--keep', action='store_true')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    r = get_client(decode_responses=False)
+    rng = random.Random(args.seed)
+    profiles = [make_profile(i, rng, args.extra_fields, args.bio_bytes) for i in range(args.profiles)]
+    print(f"{args.profiles:,} profiles, {len(profiles[0])} fields each")
+
+    results = []
+    # CONFIG is only touched when a threshold is overridden; managed servers often disable it
+    changed = set_listpack_config(r, args.listpack_entries, args.listpack_value)
+    if changed:
+        print(f"listpack thresholds for this run: {listpack_config(r)}")
+    try:
+        for fmt in make_formats([f.strip() for f in args.formats.split(',') if f.strip()], args.per_bucket):
+            print(f"Running {fmt.name}...")
+            results.append(bench_format(r, fmt, profiles, args, rng))
+    finally:
+        for name, value in changed.items():
+            r.config_set(name, value)
+
+    print(f"\n{'format':<18} {'encoding':<10} {'MEMORY USAGE':>13} {'used_memory':>12} {'GB @ target':>12} "
+          f"{'writes/s':>10} {'reads/s':>10} {'field read p50/p99 ms':>20} {'update p50/p99 ms':>18}")
+    for res in results:
+        read, update = res['field_read_ms'], res['field_update_ms']
+        projected = res['used_memory_per_profile'] * args.target / 1e9
+        print(f"{res['format']:<18} {res['encoding']:<10} {res['memory_usage_per_profile']:>11.0f} B "
+              f"{res['used_memory_per_profile']:>10.0f} B {projected:>12.1f} "
+              f"{res['writes_per_sec']:>10,.0f} {res['reads_per_sec']:>10,.0f} "
+              f"{read['p50']:>9.3f}/{read['p99']:<10.3f} {update['p50']:>8.3f}/{update['p99']:<9.3f}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    main()
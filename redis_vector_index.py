@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import argparse
+import threading
+import numpy as np
+import redis
+from redis_connection import get_client
+from workshop_bench import LatencyHistogram
+
+ALGORITHMS = ('FLAT', 'HNSW')
+# BFLOAT16/FLOAT16 need RediSearch 2.10+ (Redis 8 has them built in)
+VECTOR_TYPES = ('FLOAT32', 'FLOAT64', 'FLOAT16', 'BFLOAT16')
+
+def to_bfloat16(vectors):
+    # Round to nearest even, then keep the top 16 bits of each float32
+    bits = np.ascontiguousarray(vectors, dtype=np.float32).view(np.uint32)
+    rounded = bits + 0x7FFF + ((bits >> 16) & 1)
+    return (rounded >> 16).astype(np.uint16)
+
+class VectorIndexSpec:
+    """
+    Describes the VECTOR field of an index and how vectors must be serialized
+    for it. HNSW takes M, EF_CONSTRUCTION, EF_RUNTIME and INITIAL_CAP; FLAT
+    takes INITIAL_CAP and BLOCK_SIZE. Parameters left as None use the server
+    defaults.
+    """
+
+    def __init__(self, algorithm='FLAT', dim=384, metric='COSINE', vector_type='FLOAT32', m=None,
+                 ef_construction=None, ef_runtime=None, initial_cap=None, block_size=None):
+        algorithm, vector_type = algorithm.upper(), vector_type.upper()
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown vector algorithm '{algorithm}' (expected FLAT or HNSW)")
+        if vector_type not in VECTOR_TYPES:
+            raise ValueError(f"unknown vector type '{vector_type}' (expected one of {', '.join(VECTOR_TYPES)})")
+        self.algorithm = algorithm
+        self.dim = dim
+        self.metric = metric.upper()
+        self.vector_type = vector_type
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_runtime = ef_runtime
+        self.initial_cap = initial_cap
+        self.block_size = block_size
+
+    def vector_args(self, field='embedding'):
+        attrs = ['TYPE', self.vector_type, 'DIM', str(self.dim), 'DISTANCE_METRIC', self.metric]
+        optional = {'INITIAL_CAP': self.initial_cap}
+        if self.algorithm == 'HNSW':
+            optional.update(M=self.m, EF_CONSTRUCTION=self.ef_construction, EF_RUNTIME=self.ef_runtime)
+        else:
+            optional['BLOCK_SIZE'] = self.block_size
+        for name, value in optional.items():
+            if value is not None:
+                attrs += [name, str(value)]
+        return [field, 'VECTOR', self.algorithm, str(len(attrs))] + attrs
+
+    def to_bytes(self, vector):
+        """
+        Serializes a float32 vector (or a 2-D batch) in this index's TYPE.
+        """
+        if self.vector_type == 'BFLOAT16':
+            return to_bfloat16(vector).tobytes()
+        dtype = {'FLOAT32': np.float32, 'FLOAT64': np.float64, 'FLOAT16': np.float16}[self.vector_type]
+        return np.asarray(vector, dtype=dtype).tobytes()
+
+    def describe(self):
+        if self.algorithm == 'FLAT':
+            return f"FLAT {self.vector_type}"
+        return (f"HNSW {self.vector_type} M={self.m or 'default'} "
+                f"EF_CONSTRUCTION={self.ef_construction or 'default'}")
+
+def spec_from_env(dim):
+    """
+    The spec redis-vector-search.py uses: FLAT FLOAT32 COSINE unless
+    VECTOR_ALGORITHM / VECTOR_TYPE / HNSW_* / VECTOR_INITIAL_CAP are set.
+    """
+    def env_int(name):
+        value = os.getenv(name)
+        return int(value) if value else None
+    return VectorIndexSpec(os.getenv('VECTOR_ALGORITHM', 'FLAT'), dim, os.getenv('VECTOR_METRIC', 'COSINE'),
+                           os.getenv('VECTOR_TYPE', 'FLOAT32'), m=env_int('HNSW_M'),
+                           ef_construction=env_int('HNSW_EF_CONSTRUCTION'), ef_runtime=env_int('HNSW_EF_RUNTIME'),
+                           initial_cap=env_int('VECTOR_INITIAL_CAP'))
+
+def create_index(client, spec, index='idx:vector_search', prefix='doc:', text_fields=('id', 'content'),
+                 field='embedding', tag_fields=(), numeric_fields=()):
+    """
+    (Re)creates a HASH index with the given text fields and one vector field.
+    TAG and NUMERIC fields are what KNN pre-filters can restrict on.
+    """
+    try:
+        client.execute_command("FT.DROPINDEX", index)
+    except redis.exceptions.ResponseError:
+        pass  # ignore if index doesn't exist
+    schema = []
+    for name in text_fields:
+        schema += [name, 'TEXT']
+    for name in tag_fields:
+        schema += [name, 'TAG']
+    for name in numeric_fields:
+        schema += [name, 'NUMERIC']
+    try:
+        client.execute_command("FT.CREATE", index, "ON", "HASH", "PREFIX", "1", prefix,
+                               "SCHEMA", *schema, *spec.vector_args(field))
+    except redis.exceptions.ResponseError as e:
+        if spec.vector_type in ('FLOAT16', 'BFLOAT16'):
+            raise RuntimeError(f"server rejected {spec.vector_type} vectors (needs RediSearch 2.10+): {e}") from e
+        raise
+
+def index_info(client, index):
+    reply = client.execute_command("FT.INFO", index)
+    info = {}
+    for name, value in zip(reply[::2], reply[1::2]):
+        info[name.decode() if isinstance(name, bytes) else name] = value
+    return info
+
+def wait_for_indexing(client, index, timeout=3600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = index_info(client, index)
+        if int(info.get('indexing', 0)) == 0 and float(info.get('percent_indexed', 1)) >= 1:
+            return info
+        time.sleep(0.2)
+    raise TimeoutError(f"index {index} still indexing after {timeout}s")
+
+def knn_query(spec, k, ef_runtime=None, field='embedding', filter_expr='*'):
+    """
+    Returns the KNN query string; EF_RUNTIME only applies to HNSW fields.
+    """
+    ef = " EF_RUNTIME $ef" if ef_runtime and spec.algorithm == 'HNSW' else ""
+    return f"({filter_expr})=>[KNN {k} @{field} $vec{ef} AS score]"
+
+def search_ids(client, index, spec, query_bytes, k, ef_runtime=None):
+    params = ['vec', query_bytes]
+    if ef_runtime and spec.algorithm == 'HNSW':
+        params += ['ef', str(ef_runtime)]
+    reply = client.execute_command("FT.SEARCH", index, knn_query(spec, k, ef_runtime),
+                                   "PARAMS", str(len(params)), *params,
+                                   "SORTBY", "score", "LIMIT", "0", str(k), "NOCONTENT", "DIALECT", "2")
+    return reply[1:]
+
+# =================== Benchmark ===================
+
+def clustered_vectors(n, dim, clusters, rng):
+    """
+    Normalized vectors drawn around random centroids, closer to real
+    embeddings than uniform noise (which makes every neighbour equally far).
+    """
+    centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centroids[rng.integers(0, clusters, n)] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def exact_knn(data, queries, k):
+    """
+    Brute-force top-k by cosine similarity (dot product of normalized vectors).
+    """
+    scores = queries @ data.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+def load_vectors(client, spec, data, prefix, batch=1000):
+    start = time.perf_counter()
+    pipe = client.pipeline(transaction=False)
+    for i, vector in enumerate(data):
+        pipe.hset(f"{prefix}{i}", mapping={'embedding': spec.to_bytes(vector)})
+        if len(pipe) >= batch:
+            pipe.execute()
+    pipe.execute()
+    return time.perf_counter() - start
+
+def measure(client, index, spec, queries, truth, k, ef, concurrency):
+    prefix_len = len(b'vbench:')
+    encoded = [spec.to_bytes(q) for q in queries]
+    hist = LatencyHistogram()
+    hits = 0
+    for q, expected in zip(encoded, truth):
+        t0 = time.perf_counter()
+        ids = search_ids(client, index, spec, q, k, ef)
+        hist.record(time.perf_counter() - t0)
+        found = {int(key[prefix_len:]) for key in ids}
+        hits += len(found & set(expected.tolist()))
+
+    # Throughput: the same queries spread over `concurrency` client threads
+    def worker(part):
+        for q in part:
+            search_ids(client, index, spec, q, k, ef)
+    threads = [threading.Thread(target=worker, args=(encoded[i::concurrency],)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    qps = len(encoded) / (time.perf_counter() - start)
+
+    summary = hist.summary_ms()
+    return {'ef_runtime': ef, 'recall': hits / (len(queries) * k), 'qps': qps,
+            'p50_ms': summary['p50'], 'p99_ms': summary['p99']}
+
+def main():
+    parser = argparse.ArgumentParser(description="FLAT vs HNSW recall@k, QPS and latency against exact NumPy KNN")
+    parser.add_argument('--sizes', default='10000,100000', help="comma-separated corpus sizes (default: 10000,100000)")
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--types', default='FLOAT32,FLOAT16', help="vector types to compare (default: FLOAT32,FLOAT16)")
+    parser.add_argument('--m', type=int, default=16)
+    parser.add_argument('--ef-construction', type=int, default=200)
+    parser.add_argument('--ef', default='10,20,50,100,200', help="EF_RUNTIME values to sweep")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8, help="client threads for the QPS run (default: 8)")
+    parser.add_argument('--clusters', type=int, default=100)
+    parser.add_argument('--skip-flat', action='store_true', help="do not benchmark the FLAT baseline")
+    parser.add_argument('--out', default=None, help="write results as JSON to this file")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    client = get_client(decode_responses=False, max_connections=args.concurrency + 2)
+    rng = np.random.default_rng(args.seed)
+    index, prefix = 'idx:vbench', 'vbench:'
+    efs = [int(e) for e in args.ef.split(',')]
+    results = []
+
+    print(f"{'size':>9} {'index':<38} {'ef':>5} {'recall@' + str(args.k):>10} {'QPS':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        data = clustered_vectors(size, args.dim, args.clusters, rng)
+        queries = clustered_vectors(args.queries, args.dim, args.clusters, rng)
+        truth = exact_knn(data, queries, args.k)
+
+        specs = [] if args.skip_flat else [VectorIndexSpec('FLAT', args.dim)]
+        for vector_type in args.types.split(','):
+            specs.append(VectorIndexSpec('HNSW', args.dim, vector_type=vector_type, m=args.m,
+                                         ef_construction=args.ef_construction, initial_cap=size))
+        for spec in specs:
+            for key in client.scan_iter(f"{prefix}*", count=1000):
+                client.unlink(key)
+            try:
+                create_index(client, spec, index, prefix, text_fields=())
+            except RuntimeError as e:
+                print(f"  skipping {spec.describe()}: {e}")
+                continue
+            load_s = load_vectors(client, spec, data, prefix)
+            start = time.perf_counter()
+            info = wait_for_indexing(client, index)
+            build_s = load_s + (time.perf_counter() - start)
+            for ef in (efs if spec.algorithm == 'HNSW' else [None]):
+                res = measure(client, index, spec, queries, truth, args.k, ef, args.concurrency)
+                res.update(size=size, index=spec.describe(), build_s=build_s,
+                           vector_index_sz_mb=float(info.get('vector_index_sz_mb', 0) or 0))
+                results.append(res)
+                print(f"{size:>9,} {spec.describe():<38} {ef or '-':>5} {res['recall']:>10.3f} "
+                      f"{res['qps']:>9,.0f} {res['p50_ms']:>8.3f} {res['p99_ms']:>8.3f}")
+            print(f"{'':>9} built in {build_s:.1f}s, vector index {results[-1]['vector_index_sz_mb']:.1f} MB")
+
+    for key in client.scan_iter(f"{prefix}*", count=1000):
+        client.unlink(key)
+    try:
+        client.execute_command("FT.DROPINDEX", index)
+    except redis.exceptions.ResponseError:
+        pass
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import os
+import re
+import json
+import time
+import queue
+import random
+import hashlib
+import argparse
+import threading
+import numpy as np
+from redis_connection import get_client
+from redis_vector_index import VectorIndexSpec, create_index
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+
+# =================== Embedders ===================
+
+class SentenceTransformerEmbedder:
+    """
+    Batched sentence-transformers encoder. The model is loaded on first use,
+    so importing this module (or building the embedder) stays cheap.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, batch_size=64, device=None):
+        self.name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self.model = None
+        self.lock = threading.Lock()
+        self._dim = None
+
+    def _load(self):
+        with self.lock:
+            if self.model is None:
+                from sentence_transformers import SentenceTransformer
+                self.model = SentenceTransformer(self.name, device=self.device)
+                self._dim = self.model.get_sentence_embedding_dimension()
+        return self.model
+
+    @property
+    def dim(self):
+        if self._dim is None:
+            self._load()
+        return self._dim
+
+    @property
+    def lowercases(self):
+        # Uncased models (all-MiniLM-L6-v2 among them) lowercase their input in the tokenizer
+        model = self.model or self._load()
+        return bool(getattr(model.tokenizer, 'do_lower_case', False))
+
+    def encode(self, texts):
+        """
+        Returns a (len(texts), dim) float32 array of L2-normalized vectors.
+        """
+        model = self.model or self._load()
+        vectors = model.encode(list(texts), batch_size=self.batch_size,
+                               convert_to_numpy=True, normalize_embeddings=True)
+        return vectors.astype(np.float32, copy=False)
+
+class HashingEmbedder:
+    """
+    Deterministic stand-in for a real model: hashes each token into one of
+    `dim` signed buckets and normalizes. Texts that share words get similar
+    vectors, which is enough to test ingestion and search end to end without
+    downloading a model.
+    """
+
+    lowercases = True
+
+    def __init__(self, dim=384):
+        self.name = f"hashing-{dim}"
+        self.dim = dim
+
+    def _vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little')
+            vector[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self._vector(text) for text in texts])
+
+def get_embedder(name=None, batch_size=64, dim=384):
+    """
+    'hashing' gives the deterministic stand-in; anything else is a
+    sentence-transformers model name ('minilm' is all-MiniLM-L6-v2). The
+    default comes from WORKSHOP_EMBEDDER.
+    """
+    name = name or os.getenv('WORKSHOP_EMBEDDER', 'minilm')
+    if name == 'hashing':
+        return HashingEmbedder(dim)
+    return SentenceTransformerEmbedder(DEFAULT_MODEL if name == 'minilm' else name, batch_size)
+
+# =================== Index and input ===================
+
+def create_flat_index(client, index='idx:vector_search', prefix='doc:', dim=384, metric='COSINE'):
+    """
+    The original FLAT FLOAT32 index; drops any existing index first.
+    """
+    create_index(client, VectorIndexSpec('FLAT', dim, metric), index, prefix)
+
+def read_documents(path, id_field='id', text_field='content'):
+    """
+    Streams (doc_id, text) pairs from an NDJSON file (.jsonl/.ndjson) or a
+    plain text file with one document per line (the line number is the id).
+    """
+    as_json = path.endswith(('.jsonl', '.ndjson'))
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            if as_json:
+                doc = json.loads(line)
+                yield str(doc[id_field]), doc[text_field]
+            else:
+                yield str(number), line
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# =================== Pipeline ===================
+
+class IngestStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.docs = 0
+        self.read_s = 0.0
+        self.encode_s = 0.0
+        self.write_s = 0.0
+        self.started = time.perf_counter()
+
+    def add(self, field, seconds, docs=0):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + seconds)
+            self.docs += docs
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        rate = lambda busy: self.docs / busy if busy else 0.0
+        return {'docs': self.docs, 'elapsed_s': elapsed, 'docs_per_sec': self.docs / elapsed if elapsed else 0.0,
+                'read_docs_per_sec': rate(self.read_s), 'encode_docs_per_sec': rate(self.encode_s),
+                'write_docs_per_sec': rate(self.write_s)}
+
+def float32_bytes(vector):
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+def write_batch(client, prefix, ids, texts, vectors, to_bytes=float32_bytes):
+    pipe = client.pipeline(transaction=False)
+    for doc_id, text, vector in zip(ids, texts, vectors):
+        pipe.hset(f"{prefix}{doc_id}", mapping={'id': doc_id, 'content': text, 'embedding': to_bytes(vector)})
+    pipe.execute()
+
+def ingest(client, documents, embedder, batch_size=256, prefix='doc:', writers=2, queue_size=4,
+           report_interval=None, to_bytes=float32_bytes):
+    """
+    Encodes (doc_id, text) pairs in batches and writes them as pipelined HSETs
+    of float32 bytes (or whatever to_bytes produces for the index TYPE).
+    Encoding runs in the calling thread while `writers` threads write earlier
+    batches; the bounded queue stops the encoder from running ahead of Redis.
+    Returns IngestStats.report().
+    """
+    stats = IngestStats()
+    pending = queue.Queue(maxsize=queue_size)
+    errors = []
+
+    def writer():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            if errors:
+                continue  # drain after a failure so the encoder never blocks
+            try:
+                t0 = time.perf_counter()
+                write_batch(client, prefix, *item, to_bytes=to_bytes)
+                stats.add('write_s', time.perf_counter() - t0, len(item[0]))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, name=f"vector-writer-{i}", daemon=True) for i in range(writers)]
+    for t in threads:
+        t.start()
+
+    last_report = time.perf_counter()
+    try:
+        batches = batched(documents, batch_size)
+        while not errors:
+            t0 = time.perf_counter()
+            batch = next(batches, None)
+            stats.add('read_s', time.perf_counter() - t0)
+            if batch is None:
+                break
+            ids, texts = [doc_id for doc_id, _ in batch], [text for _, text in batch]
+            t0 = time.perf_counter()
+            vectors = embedder.encode(texts)
+            stats.add('encode_s', time.perf_counter() - t0)
+            pending.put((ids, texts, vectors))
+            if report_interval and time.perf_counter() - last_report >= report_interval:
+                report = stats.report()
+                print(f"  {report['docs']:,} docs written, {report['docs_per_sec']:,.0f} docs/s")
+                last_report = time.perf_counter()
+    finally:
+        for _ in threads:
+            pending.put(None)
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+    return stats.report()
+
+# =================== Synthetic corpus ===================
+
+ADJECTIVES = ['wireless', 'waterproof', 'organic', 'lightweight', 'ergonomic', 'vintage', 'smart', 'compact',
+              'stainless', 'handmade', 'portable', 'noise-cancelling', 'carbon fiber', 'bestselling']
+PRODUCTS = ['headphones', 'hiking jacket', 'coffee', 'suitcase', 'desk lamp', 'running shoes', 'tent',
+            'frying pan', 'road bike', 'fantasy novel', 'essential oil', 'smartphone', 'neck pillow', 'backpack']
+DETAILS = ['for travel', 'for 4 people', 'with OLED display', 'dark roast', 'for men', 'for women',
+           'with long battery life', 'gift set', 'limited edition', 'for kids']
+
+def generate_corpus(path, count, seed=1):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            text = f"{rng.choice(ADJECTIVES)} {rng.choice(PRODUCTS)} {rng.choice(DETAILS)}"
+            f.write(json.dumps({'id': f"g{i}", 'content': text}) + '\n')
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream documents into Redis as batched, pipelined embeddings")
+    parser.add_argument('input', help="NDJSON (.jsonl/.ndjson with id/content) or a text file, one document per line")
+    parser.add_argument('--embedder', default=None,
+                        help="'hashing' for the deterministic stand-in, 'minilm' or any sentence-transformers "
+                             "model name (default: $WORKSHOP_EMBEDDER or minilm)")
+    parser.add_argument('--batch-size', type=int, default=256, help="documents per encode/write batch (default: 256)")
+    parser.add_argument('--writers', type=int, default=2, help="pipelined HSET writer threads (default: 2)")
+    parser.add_argument('--queue', type=int, default=4, help="encoded batches buffered for the writers (default: 4)")
+    parser.add_argument('--prefix', default='doc:', help="key prefix (default: doc:)")
+    parser.add_argument('--id-field', default='id')
+    parser.add_argument('--text-field', default='content')
+    parser.add_argument('--create-index', action='store_true', help="(re)create the FLAT index before loading")
+    parser.add_argument('--index', default='idx:vector_search')
+    parser.add_argument('--limit', type=int, default=None, help="stop after this many documents")
+    parser.add_argument('--report-interval', type=float, default=5.0)
+    parser.add_argument('--generate', type=int, default=None, metavar='N',
+                        help="write N synthetic product documents to INPUT and exit")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_corpus(args.input, args.generate)
+        print(f"Wrote {args.generate:,} documents to {args.input}")
+        return
+
+    client = get_client(decode_responses=False, max_connections=args.writers + 2)
+    embedder = get_embedder(args.embedder, args.batch_size)
+    if args.create_index:
+        create_flat_index(client, args.index, args.prefix, embedder.dim)
+    documents = read_documents(args.input, args.id_field, args.text_field)
+    if args.limit:
+        documents = (doc for _, doc in zip(range(args.limit), documents))
+
+    print(f"Ingesting {args.input} with {embedder.name}, batches of {args.batch_size}, {args.writers} writers")
+    report = ingest(client, documents, embedder, args.batch_size, args.prefix, args.writers, args.queue,
+                    args.report_interval)
+    print(f"\n{report['docs']:,} documents in {report['elapsed_s']:.1f}s: {report['docs_per_sec']:,.0f} docs/s end to end")
+    print(f"  read   {report['read_docs_per_sec']:>12,.0f} docs/s")
+    print(f"  encode {report['encode_docs_per_sec']:>12,.0f} docs/s")
+    print(f"  write  {report['write_docs_per_sec']:>12,.0f} docs/s (per writer thread)")
+
+if __name__ == "__main__":
+    main()
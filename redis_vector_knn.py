@@ -0,0 +1,232 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import redis
+from redis_connection import get_client
+from redis_vector_index import (VectorIndexSpec, create_index, wait_for_indexing, search_ids,
+                                clustered_vectors, load_vectors)
+
+class ExactKNN:
+    """
+    Exact top-k cosine search over a float32 matrix held client-side.
+
+    Loaded with from_npy() the matrix is memory-mapped, so it opens instantly
+    and processes on the same host share its pages through the page cache.
+    Queries are answered in batches: one matrix multiplication per block of
+    block_rows corpus rows, argpartition for the block's top-k, then a merge,
+    so memory stays bounded however large the corpus is. Scores are cosine
+    distances (1 - similarity), the same scale FT.SEARCH returns for COSINE.
+    """
+
+    def __init__(self, vectors, ids=None, normalized=True, block_rows=65536):
+        self.vectors = vectors
+        self.ids = list(ids) if ids is not None else [str(i) for i in range(len(vectors))]
+        if len(self.ids) != len(vectors):
+            raise ValueError(f"{len(self.ids)} ids for {len(vectors)} vectors")
+        self.block_rows = block_rows
+        self.inv_norms = None
+        if not normalized:
+            # One pass over the corpus; afterwards scores are divided by the row norms
+            norms = np.linalg.norm(vectors, axis=1)
+            self.inv_norms = np.where(norms > 0, 1.0 / norms, 0.0).astype(np.float32)
+        self._positions = None
+
+    @classmethod
+    def from_npy(cls, path, ids_path=None, mmap=True, **kwargs):
+        vectors = np.load(path, mmap_mode='r' if mmap else None)
+        if vectors.dtype != np.float32 or vectors.ndim != 2:
+            raise ValueError(f"{path} must hold a 2-D float32 matrix, got {vectors.dtype} {vectors.shape}")
+        ids_path = ids_path or ids_path_for(path)
+        ids = None
+        if os.path.exists(ids_path):
+            with open(ids_path, encoding='utf-8') as f:
+                ids = [line.rstrip('\n') for line in f]
+        return cls(vectors, ids, **kwargs)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, queries, k=5):
+        """
+        queries: (m, dim) or (dim,) array. Returns (ids, distances), each a list
+        of m lists of k entries ordered from nearest to farthest.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1.0)
+        k = min(k, len(self.vectors))
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.vectors), self.block_rows):
+            block = np.asarray(self.vectors[start:start + self.block_rows])
+            scores = queries @ block.T
+            if self.inv_norms is not None:
+                scores *= self.inv_norms[start:start + len(block)]
+            take = min(k, scores.shape[1])
+            top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, top + start], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        ids = [[self.ids[row] for row in rows] for rows in best_rows]
+        return ids, (1.0 - best_scores).tolist()
+
+    def rerank(self, query, candidate_ids, k=None):
+        """
+        Exact re-scoring of candidates (e.g. from an HNSW search); returns
+        [(id, distance)] sorted nearest first.
+        """
+        if self._positions is None:
+            self._positions = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        # Sorted rows keep the memmap reads sequential
+        rows = np.array(sorted({self._positions[doc_id] for doc_id in candidate_ids if doc_id in self._positions}),
+                        dtype=np.int64)
+        if not len(rows):
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = np.asarray(self.vectors[rows]) @ query
+        if self.inv_norms is not None:
+            scores *= self.inv_norms[rows]
+        order = np.argsort(-scores)[:k or len(rows)]
+        return [(self.ids[rows[i]], float(1.0 - scores[i])) for i in order]
+
+def ids_path_for(path):
+    return f"{os.path.splitext(path)[0]}.ids.txt"
+
+def save_corpus(path, vectors, ids):
+    np.save(path, np.ascontiguousarray(vectors, dtype=np.float32))
+    with open(ids_path_for(path), 'w', encoding='utf-8') as f:
+        for doc_id in ids:
+            f.write(f"{doc_id}\n")
+
+def export_from_redis(client, path, prefix='doc:', dim=384, field='embedding', to_float32=None, batch=1000):
+    """
+    Copies every `prefix`* hash's vector into a .npy file (written through a
+    memmap, so the corpus never has to fit in memory) plus an ids sidecar.
+    to_float32 converts the stored bytes when the index TYPE is not FLOAT32.
+    Returns the number of vectors exported.
+    """
+    convert = to_float32 or (lambda raw: np.frombuffer(raw, dtype=np.float32))
+    keys = list(client.scan_iter(f"{prefix}*", count=batch))
+    matrix = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(len(keys), dim))
+    ids = []
+    row = 0
+    for i in range(0, len(keys), batch):
+        chunk = keys[i:i + batch]
+        pipe = client.pipeline(transaction=False)
+        for key in chunk:
+            pipe.hget(key, field)
+        for key, raw in zip(chunk, pipe.execute()):
+            if raw is None or len(raw) == 0:
+                continue
+            matrix[row] = convert(raw)
+            name = key.decode() if isinstance(key, bytes) else key
+            ids.append(name[len(prefix):])
+            row += 1
+    matrix.flush()
+    del matrix
+    if row != len(keys):
+        # Some keys had no vector: rewrite the file at its real length
+        trimmed = np.array(np.load(path, mmap_mode='r')[:row])
+        np.save(path, trimmed)
+    with open(ids_path_for(path), 'w', encoding='utf-8') as f:
+        for doc_id in ids:
+            f.write(f"{doc_id}\n")
+    return row
+
+def knn_search(client, index, spec, query_vector, k=5, local=None, prefix='doc:'):
+    """
+    Top-k via FT.SEARCH, falling back to the local engine when the search
+    module or the index is unavailable. Returns ([ids], source).
+    """
+    try:
+        keys = search_ids(client, index, spec, spec.to_bytes(query_vector), k)
+        names = [key.decode() if isinstance(key, bytes) else key for key in keys]
+        return [name[len(prefix):] for name in names], 'server'
+    except redis.exceptions.ResponseError:
+        if local is None:
+            raise
+        ids, _ = local.search(query_vector, k)
+        return ids[0], 'local'
+
+# =================== Benchmark ===================
+
+def main():
+    parser = argparse.ArgumentParser(description="Local exact KNN on a memory-mapped .npy vs the FLAT index")
+    parser.add_argument('--size', type=int, default=100000, help="corpus vectors (default: 100000)")
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--batches', default='1,16,64,256', help="query batch sizes (default: 1,16,64,256)")
+    parser.add_argument('--queries', type=int, default=512, help="queries per batch size (default: 512)")
+    parser.add_argument('--npy', default=None, help="corpus file (default: a temporary file)")
+    parser.add_argument('--local-only', action='store_true', help="skip the FLAT index comparison")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    path = args.npy or os.path.join(tempfile.mkdtemp(), 'corpus.npy')
+    data = clustered_vectors(args.size, args.dim, 100, rng)
+    queries = clustered_vectors(args.queries, args.dim, 100, rng)
+    save_corpus(path, data, [str(i) for i in range(args.size)])
+
+    t0 = time.perf_counter()
+    engine = ExactKNN.from_npy(path)
+    print(f"Opened {len(engine):,} x {engine.dim} corpus in {(time.perf_counter() - t0) * 1000:.1f} ms (mmap)")
+    engine.search(queries[:1], args.k)  # fault the pages in before timing
+
+    client = None
+    spec = VectorIndexSpec('FLAT', args.dim)
+    if not args.local_only:
+        client = get_client(decode_responses=False)
+        create_index(client, spec, 'idx:knn_bench', 'knnbench:', text_fields=())
+        load_vectors(client, spec, data, 'knnbench:')
+        wait_for_indexing(client, 'idx:knn_bench')
+
+    print(f"\n{'batch':>6} {'local q/s':>12} {'FLAT q/s':>12} {'agreement':>10}")
+    for batch in [int(b) for b in args.batches.split(',')]:
+        start = time.perf_counter()
+        local_ids = []
+        for i in range(0, len(queries), batch):
+            ids, _ = engine.search(queries[i:i + batch], args.k)
+            local_ids.extend(ids)
+        local_qps = len(queries) / (time.perf_counter() - start)
+
+        flat_qps, agreement = None, None
+        if client is not None:
+            start = time.perf_counter()
+            server_ids = []
+            for i in range(0, len(queries), batch):
+                # One pipeline per batch, the server-side equivalent of a batched matmul
+                pipe = client.pipeline(transaction=False)
+                for q in queries[i:i + batch]:
+                    pipe.execute_command("FT.SEARCH", 'idx:knn_bench', f"*=>[KNN {args.k} @embedding $vec AS score]",
+                                         "PARAMS", "2", "vec", spec.to_bytes(q), "SORTBY", "score",
+                                         "LIMIT", "0", str(args.k), "NOCONTENT", "DIALECT", "2")
+                for reply in pipe.execute():
+                    server_ids.append([key.decode()[len('knnbench:'):] for key in reply[1:]])
+            flat_qps = len(queries) / (time.perf_counter() - start)
+            same = sum(len(set(a) & set(b)) for a, b in zip(local_ids, server_ids))
+            agreement = same / (len(queries) * args.k)
+        print(f"{batch:>6} {local_qps:>12,.0f} "
+              f"{(f'{flat_qps:,.0f}' if flat_qps else '-'):>12} {(f'{agreement:.3f}' if agreement is not None else '-'):>10}")
+
+    if client is not None:
+        client.execute_command("FT.DROPINDEX", 'idx:knn_bench', "DD")
+    if not args.npy:
+        os.remove(path)
+        os.remove(ids_path_for(path))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import re
+import time
+import argparse
+import numpy as np
+import redis
+from redis_connection import get_client
+from redis_vector_index import VectorIndexSpec, create_index, wait_for_indexing, knn_query, clustered_vectors
+from workshop_bench import LatencyHistogram
+
+# =================== Filters ===================
+
+TAG_SPECIAL = re.compile(r"([,.<>{}\[\]\"':;!@#$%^&*()\-+=~|/\\ ])")
+
+def escape_tag(value):
+    return TAG_SPECIAL.sub(r"\\\1", str(value))
+
+def tag_filter(field, values):
+    """
+    @field:{a | b}, matching documents tagged with any of the values.
+    """
+    if isinstance(values, str):
+        values = [values]
+    return f"@{field}:{{{' | '.join(escape_tag(value) for value in values)}}}"
+
+def numeric_filter(field, low=None, high=None, exclusive=False):
+    """
+    @field:[low high]; None leaves that side open.
+    """
+    def bound(value, infinite):
+        if value is None:
+            return infinite
+        return f"({value}" if exclusive else str(value)
+    return f"@{field}:[{bound(low, '-inf')} {bound(high, '+inf')}]"
+
+def all_of(*filters):
+    # Adjacent clauses intersect; '*' alone means no restriction
+    clauses = [f for f in filters if f and f != '*']
+    return ' '.join(clauses) or '*'
+
+# =================== Replies ===================
+
+class SearchResults:
+    """
+    One page of results per query. keys[i] holds query i's keys nearest
+    first; scores is an (m, page_size) float32 array of distances, NaN past
+    the end of a short page; totals is how many KNN results each query had
+    before LIMIT cut out the page. fields is None unless extra RETURN fields
+    were requested.
+    """
+
+    def __init__(self, keys, scores, totals, fields=None):
+        self.keys = keys
+        self.scores = scores
+        self.totals = totals
+        self.fields = fields
+
+    def __len__(self):
+        return len(self.keys)
+
+    def ids(self, prefix='doc:'):
+        """
+        Keys as str with the prefix stripped.
+        """
+        cut = len(prefix)
+        return [[(key.decode() if isinstance(key, bytes) else key)[cut:] for key in keys] for keys in self.keys]
+
+def decode_replies(replies, page_size, return_fields=()):
+    """
+    Turns raw FT.SEARCH replies ([total, key, [b'score', b'0.12', ...], ...])
+    into SearchResults. The score is always the first RETURN field, so every
+    distance in the batch is gathered in one pass and parsed by a single
+    NumPy conversion instead of a float() per hit.
+    """
+    m = len(replies)
+    totals = np.fromiter((reply[0] for reply in replies), dtype=np.int64, count=m)
+    keys = [reply[1::2] for reply in replies]
+    counts = np.fromiter((len(page) for page in keys), dtype=np.int64, count=m)
+    raw = [fields[1] for reply in replies for fields in reply[2::2]]
+
+    scores = np.full((m, page_size), np.nan, dtype=np.float32)
+    if raw:
+        rows = np.repeat(np.arange(m), counts)
+        cols = np.arange(len(raw)) - np.repeat(np.cumsum(counts) - counts, counts)
+        scores[rows, cols] = np.array(raw).astype(np.float32)
+
+    fields = None
+    if return_fields:
+        fields = [[{(name.decode() if isinstance(name, bytes) else name): value
+                    for name, value in zip(doc[2::2], doc[3::2])} for doc in reply[2::2]]
+                  for reply in replies]
+    return SearchResults(keys, scores, totals, fields)
+
+# =================== Searcher ===================
+
+class VectorSearcher:
+    """
+    Batched KNN search: every query of a call goes out in pipelines of
+    `batch` FT.SEARCH commands, so hundreds of queries cost a few round trips
+    instead of one each. Query vectors are serialized as one block and passed
+    to Redis as memoryview slices of it. Use a client that does not decode
+    responses; keys then come back as bytes and nothing is decoded that the
+    caller does not ask for.
+    """
+
+    def __init__(self, client, index, spec, field='embedding', batch=256):
+        self.client = client
+        self.index = index
+        self.spec = spec
+        self.field = field
+        self.batch = batch
+
+    def _command(self, vector, filter_expr, offset, page_size, ef_runtime, return_fields):
+        params = ['vec', vector]
+        if ef_runtime and self.spec.algorithm == 'HNSW':
+            params += ['ef', str(ef_runtime)]
+        # KNN has to reach past the skipped pages for LIMIT to have anything to return
+        query = knn_query(self.spec, offset + page_size, ef_runtime, self.field, filter_expr)
+        return ["FT.SEARCH", self.index, query, "PARAMS", str(len(params)), *params,
+                "SORTBY", "score", "LIMIT", str(offset), str(page_size),
+                "RETURN", str(1 + len(return_fields)), "score", *return_fields, "DIALECT", "2"]
+
+    def search(self, vectors, k=10, filters='*', offset=0, ef_runtime=None, return_fields=()):
+        """
+        vectors: (m, dim) float32 array (or one vector). filters is one
+        expression for every query or a list with one per query. Returns the
+        k results after `offset` for each query as SearchResults.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        m = len(vectors)
+        if isinstance(filters, str):
+            filters = [filters] * m
+        elif len(filters) != m:
+            raise ValueError(f"{len(filters)} filters for {m} queries")
+
+        blob = memoryview(self.spec.to_bytes(vectors))
+        width = len(blob) // m if m else 0
+        replies = []
+        for start in range(0, m, self.batch):
+            pipe = self.client.pipeline(transaction=False)
+            for i in range(start, min(start + self.batch, m)):
+                pipe.execute_command(*self._command(blob[i * width:(i + 1) * width], filters[i],
+                                                    offset, k, ef_runtime, return_fields))
+            replies.extend(pipe.execute())
+        return decode_replies(replies, k, return_fields)
+
+    def page(self, vectors, number, page_size=10, filters='*', ef_runtime=None, return_fields=()):
+        """
+        Page `number` (from 0) of each query's neighbours.
+        """
+        return self.search(vectors, page_size, filters, number * page_size, ef_runtime, return_fields)
+
+# =================== Benchmark ===================
+
+def per_query_search(client, index, spec, vectors, k, filter_expr):
+    """
+    The original pattern: one FT.SEARCH round trip per query, parsed field by
+    field with float().
+    """
+    results = []
+    for vector in vectors:
+        reply = client.execute_command("FT.SEARCH", index, knn_query(spec, k, filter_expr=filter_expr),
+                                       "PARAMS", "2", "vec", spec.to_bytes(vector), "SORTBY", "score",
+                                       "RETURN", "1", "score", "DIALECT", "2")
+        hits = []
+        for i in range(len(reply) // 2):
+            key, fields = reply[1 + i * 2], reply[2 + i * 2]
+            score = None
+            for j in range(0, len(fields), 2):
+                if fields[j] == b"score":
+                    score = float(fields[j + 1])
+            hits.append((key, score))
+        results.append(hits)
+    return results
+
+def load_catalog(client, spec, data, prefix, categories, rng, batch=1000):
+    pipe = client.pipeline(transaction=False)
+    for i, vector in enumerate(data):
+        pipe.hset(f"{prefix}{i}", mapping={'embedding': spec.to_bytes(vector),
+                                            'category': f"c{i % categories}",
+                                            'price': int(rng.integers(1, 500))})
+        if len(pipe) >= batch:
+            pipe.execute()
+    pipe.execute()
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-query FT.SEARCH vs pipelined batches with NumPy reply decoding")
+    parser.add_argument('--size', type=int, default=50000, help="catalog vectors (default: 50000)")
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--per-request', default='1,50,200,500',
+                        help="queries per service request (default: 1,50,200,500)")
+    parser.add_argument('--requests', type=int, default=20, help="requests timed per setting (default: 20)")
+    parser.add_argument('--batch', type=int, default=256, help="FT.SEARCH commands per pipeline (default: 256)")
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    client = get_client(decode_responses=False)
+    rng = np.random.default_rng(args.seed)
+    index, prefix = 'idx:query_bench', 'qbench:'
+    spec = VectorIndexSpec('FLAT', args.dim)
+    create_index(client, spec, index, prefix, text_fields=(), tag_fields=('category',), numeric_fields=('price',))
+    load_catalog(client, spec, clustered_vectors(args.size, args.dim, 100, rng), prefix, args.categories, rng)
+    wait_for_indexing(client, index)
+    searcher = VectorSearcher(client, index, spec, batch=args.batch)
+
+    filters = {'none': '*', 'tag+numeric': all_of(tag_filter('category', ['c1', 'c2']),
+                                                  numeric_filter('price', 50, 200))}
+    print(f"{args.size:,} vectors, k={args.k}, {args.requests} requests per row\n")
+    print(f"{'queries':>8} {'filter':<12} {'mode':<10} {'request p50 ms':>15} {'p99 ms':>9} {'queries/s':>11}")
+    for per_request in [int(n) for n in args.per_request.split(',')]:
+        for label, filter_expr in filters.items():
+            requests = [clustered_vectors(per_request, args.dim, 100, rng) for _ in range(args.requests)]
+            for mode in ('per-query', 'pipelined'):
+                hist = LatencyHistogram()
+                for vectors in requests:
+                    t0 = time.perf_counter()
+                    if mode == 'per-query':
+                        per_query_search(client, index, spec, vectors, args.k, filter_expr)
+                    else:
+                        searcher.search(vectors, args.k, filter_expr)
+                    hist.record(time.perf_counter() - t0)
+                summary = hist.summary_ms()
+                qps = per_request * 1000 / summary['mean']
+                print(f"{per_request:>8} {label:<12} {mode:<10} {summary['p50']:>15.2f} {summary['p99']:>9.2f} "
+                      f"{qps:>11,.0f}")
+
+    for key in client.scan_iter(f"{prefix}*", count=1000):
+        client.unlink(key)
+    try:
+        client.execute_command("FT.DROPINDEX", index)
+    except redis.exceptions.ResponseError:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+import os
+import sys
+import math
+import json
+import time
+import random
+import argparse
+import threading
+import redis
+from dotenv import load_dotenv
+from redis_connection import get_client, pool_metrics
+
+load_dotenv()  # Loads variables from .env
+
+# =================== Latency histogram ===================
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram: each bucket is 2% wider than the previous
+    one, so percentiles are accurate to about 1% from microseconds to minutes
+    while memory stays constant however many samples are recorded.
+    """
+    RATIO = 1.02
+    _LOG_RATIO = math.log(RATIO)
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = max(seconds * 1e6, 1.0)
+        bucket = int(math.log(micros) / self._LOG_RATIO)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for bucket, n in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct):
+        """
+        Returns the pct-th percentile in seconds (upper edge of its bucket).
+        """
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.RATIO ** (bucket + 1) / 1e6, self.max)
+        return self.max
+
+    def summary_ms(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count * 1000 if self.count else 0.0,
+            'p50': self.percentile(50) * 1000,
+            'p95': self.percentile(95) * 1000,
+            'p99': self.percentile(99) * 1000,
+            'p999': self.percentile(99.9) * 1000,
+            'max': self.max * 1000,
+        }
+
+# =================== Workload registry ===================
+
+WORKLOADS = {}
+
+class Workload:
+    def __init__(self, name, description, setup, raw=False):
+        self.name = name
+        self.description = description
+        self.setup = setup
+        self.raw = raw
+
+def workload(name, description, raw=False):
+    """
+    Registers a workload. The decorated function gets (r, size), loads its
+    dataset and returns op(rng), which performs exactly one timed operation.
+    raw=True workloads get a client that does not decode responses.
+    Workloads call the workshop modules themselves, so the numbers are those
+    of the shipped code; the modules are imported in setup because several of
+    them import LatencyHistogram from here.
+    """
+    def register(setup):
+        WORKLOADS[name] = Workload(name, description, setup, raw)
+        return setup
+    return register
+
+def load_pipelined(r, items, queue, batch=500):
+    pipe = r.pipeline(transaction=False)
+    for item in items:
+        queue(pipe, item)
+        if len(pipe) >= batch:
+            pipe.execute()
+    pipe.execute()
+
+# --- strings (redis-datastructures.py demo_string) ---
+
+@workload('string.set', "SET of a small string value")
+def string_set(r, size):
+    return lambda rng: r.set(f"bench:str:{rng.randrange(size)}", 'Hello, Redis!')
+
+@workload('string.get', "GET of a small string value")
+def string_get(r, size):
+    load_pipelined(r, range(size), lambda p, i: p.set(f"bench:str:{i}", 'Hello, Redis!'))
+    return lambda rng: r.get(f"bench:str:{rng.randrange(size)}")
+
+# --- hashes (demo_hash) ---
+
+PROFILE = {'name': 'Alice', 'email': 'alice@example.com', 'age': '29', 'country': 'Wonderland'}
+
+@workload('hash.hset', "HSET of a 4-field user profile")
+def hash_hset(r, size):
+    return lambda rng: r.hset(f"bench:user:{rng.randrange(size)}", mapping=PROFILE)
+
+@workload('hash.hgetall', "HGETALL of a 4-field user profile")
+def hash_hgetall(r, size):
+    load_pipelined(r, range(size), lambda p, i: p.hset(f"bench:user:{i}", mapping=PROFILE))
+    return lambda rng: r.hgetall(f"bench:user:{rng.randrange(size)}")
+
+@workload('hash.hget', "HGET of one profile field")
+def hash_hget(r, size):
+    load_pipelined(r, range(size), lambda p, i: p.hset(f"bench:user:{i}", mapping=PROFILE))
+    return lambda rng: r.hget(f"bench:user:{rng.randrange(size)}", 'email')
+
+# --- lists (demo_list) ---
+
+@workload('list.rpush', "RPUSH of one search query")
+def list_rpush(r, size):
+    r.delete('bench:searches')
+    return lambda rng: r.rpush('bench:searches', 'redis tutorial')
+
+@workload('list.lindex', "LINDEX at a random position")
+def list_lindex(r, size):
+    r.delete('bench:searches')
+    load_pipelined(r, range(0, size, 1000), lambda p, i: p.rpush('bench:searches', *range(i, min(size, i + 1000))))
+    return lambda rng: r.lindex('bench:searches', rng.randrange(size))
+
+# --- sets (demo_set) ---
+
+@workload('set.sadd', "SADD of one tag")
+def set_sadd(r, size):
+    r.delete('bench:tags')
+    return lambda rng: r.sadd('bench:tags', f"tag:{rng.randrange(size)}")
+
+@workload('set.sismember', "SISMEMBER on a set of `size` tags")
+def set_sismember(r, size):
+    r.delete('bench:tags')
+    load_pipelined(r, range(0, size, 1000),
+                   lambda p, i: p.sadd('bench:tags', *[f"tag:{j}" for j in range(i, min(size, i + 1000))]))
+    return lambda rng: r.sismember('bench:tags', f"tag:{rng.randrange(size * 2)}")
+
+# --- sorted sets (demo_sorted_set, redis_leaderboard.py) ---
+
+def bench_leaderboard(r):
+    from redis_leaderboard import Leaderboard
+    r.delete('bench:leaderboard')
+    # No daily windows (their keys fall outside bench:*) and no page cache, so every op reaches Redis
+    return Leaderboard(r, 'bench:leaderboard', windows=False, cache_ttl=0)
+
+@workload('zset.zadd', "Leaderboard.submit_one: ZADD GT of one player score")
+def zset_zadd(r, size):
+    board = bench_leaderboard(r)
+    return lambda rng: board.submit_one(f"player:{rng.randrange(size)}", rng.randint(0, 10**6))
+
+@workload('zset.top10', "Leaderboard.top(10) on a `size`-member leaderboard")
+def zset_top10(r, size):
+    board = bench_leaderboard(r)
+    rng = random.Random(0)
+    board.submit({f"player:{i}": rng.randint(0, 10**6) for i in range(size)})
+    return lambda rng: board.top(10)
+
+@workload('zset.around', "Leaderboard.around: a player's rank plus 5 neighbours each side")
+def zset_around(r, size):
+    board = bench_leaderboard(r)
+    rng = random.Random(0)
+    board.submit({f"player:{i}": rng.randint(0, 10**6) for i in range(size)})
+    return lambda rng: board.around(f"player:{rng.randrange(size)}", 5)
+
+# --- JSON (redis-json.py) ---
+
+def nested_doc(i):
+    return {"user": {"id": i, "name": "Alice",
+                     "address": {"city": "New York", "zip": "10001"},
+                     "contacts": [{"type": "email", "value": "alice@example.com"},
+                                  {"type": "phone", "value": "555-1234"}],
+                     "stats": {"visits": 34, "is_active": True}}}
+
+def bench_documents(r, size=0):
+    """
+    Probes for RedisJSON (a server without it raises ResponseError here, so the
+    runner skips the workload) and loads `size` documents.
+    """
+    from redis_json_docs import JsonDocuments
+    r.json().set('bench:json:probe', '$', {})
+    docs = JsonDocuments(r)
+    for start in range(0, size, 500):
+        with docs.batch() as batch:
+            for i in range(start, min(size, start + 500)):
+                batch.set(f"bench:json:{i}", '$', nested_doc(i))
+    return docs
+
+@workload('json.set', "JsonDocuments.update: JSON.SET of a whole nested user document")
+def json_set(r, size):
+    docs = bench_documents(r)
+    return lambda rng: docs.update(f"bench:json:{rng.randrange(size)}", values={'$': nested_doc(1002)})
+
+@workload('json.get_path', "JsonDocuments.get_paths of one nested path ($.user.address.city)")
+def json_get_path(r, size):
+    docs = bench_documents(r, size)
+    return lambda rng: docs.get_paths(f"bench:json:{rng.randrange(size)}", ['$.user.address.city'])
+
+@workload('json.get_paths', "JsonDocuments.get_paths of three paths in one JSON.GET")
+def json_get_paths(r, size):
+    docs = bench_documents(r, size)
+    paths = ['$.user.name', '$.user.address.city', '$.user.stats.visits']
+    return lambda rng: docs.get_paths(f"bench:json:{rng.randrange(size)}", paths)
+
+@workload('json.numincrby', "JsonDocuments.update: JSON.NUMINCRBY on $.user.stats.visits")
+def json_numincrby(r, size):
+    docs = bench_documents(r, size)
+    return lambda rng: docs.update(f"bench:json:{rng.randrange(size)}", increments={'$.user.stats.visits': 1})
+
+# --- search (redis-search.py) ---
+
+def search_index(r, size):
+    from redis.commands.search.field import TextField, NumericField, TagField
+    from redis.commands.search.index_definition import IndexDefinition, IndexType
+    search = r.ft('idx:bench')
+    try:
+        search.dropindex(delete_documents=True)
+    except redis.exceptions.ResponseError:
+        pass
+    search.create_index((TextField('title', weight=5.0), TextField('body'), NumericField('price'), TagField('category')),
+                        definition=IndexDefinition(prefix=['bench:doc:'], index_type=IndexType.HASH))
+    words = ['red', 'green', 'apple', 'bike', 'mountain', 'tasty', 'sour', 'bright']
+    categories = ['fruit,food', 'sports,vehicle', 'home', 'books']
+    rng = random.Random(0)
+    load_pipelined(r, range(size), lambda p, i: p.hset(f"bench:doc:{i}", mapping={
+        'title': f"{rng.choice(words)} {rng.choice(words)}",
+        'body': ' '.join(rng.choice(words) for _ in range(8)),
+        'price': round(rng.uniform(1, 500), 2),
+        'category': rng.choice(categories)}))
+    # Wait for the background indexer to catch up before measuring
+    while int(search.info().get('indexing', 0)):
+        time.sleep(0.1)
+    return search
+
+@workload('search.text', "FT.SEARCH full-text query, first 10 results")
+def search_text(r, size):
+    from redis.commands.search.query import Query
+    search = search_index(r, size)
+    return lambda rng: search.search(Query(rng.choice(['red', 'apple', 'mountain bike'])).paging(0, 10))
+
+@workload('search.numeric', "FT.SEARCH numeric range on price")
+def search_numeric(r, size):
+    from redis.commands.search.query import Query
+    search = search_index(r, size)
+    return lambda rng: search.search(Query("@price:[1 50]").paging(0, 10))
+
+@workload('search.tag', "FT.SEARCH tag filter on category")
+def search_tag(r, size):
+    from redis.commands.search.query import Query
+    search = search_index(r, size)
+    return lambda rng: search.search(Query("@category:{vehicle}").paging(0, 10))
+
+# --- vector search (redis-vector-search.py, redis_vector_query.py) ---
+
+def bench_searcher(r, size):
+    import numpy as np
+    from redis_vector_index import VectorIndexSpec, create_index, wait_for_indexing, clustered_vectors
+    from redis_vector_query import VectorSearcher
+    spec = VectorIndexSpec('FLAT', 384)
+    create_index(r, spec, 'idx:bench_vec', 'bench:vec:', text_fields=())
+    vectors = clustered_vectors(size, spec.dim, 100, np.random.default_rng(0))
+    load_pipelined(r, range(size), lambda p, i: p.hset(f"bench:vec:{i}", mapping={'embedding': spec.to_bytes(vectors[i])}))
+    wait_for_indexing(r, 'idx:bench_vec')
+    return VectorSearcher(r, 'idx:bench_vec', spec), vectors[:256]
+
+@workload('vector.knn', "VectorSearcher.search: KNN 5 on a FLAT FLOAT32 index of 384-d vectors", raw=True)
+def vector_knn(r, size):
+    searcher, queries = bench_searcher(r, size)
+    return lambda rng: searcher.search(queries[rng.randrange(len(queries))], k=5)
+
+@workload('vector.knn_batch', "VectorSearcher.search: 64 KNN 5 queries in one pipeline", raw=True)
+def vector_knn_batch(r, size):
+    searcher, queries = bench_searcher(r, size)
+    return lambda rng: searcher.search(queries[rng.sample(range(len(queries)), min(64, len(queries)))], k=5)
+
+# --- streams (redis-streams/) ---
+
+def stream_modules():
+    # The stream helpers live in redis-streams/, which is not a package
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'redis-streams')
+    if path not in sys.path:
+        sys.path.append(path)
+
+EVENT = {'user': 'alice', 'action': 'login', 'timestamp': '1700000000.0'}
+
+@workload('stream.xadd', "XADD of one activity event encoded by the producer's fields codec", raw=True)
+def stream_xadd(r, size):
+    stream_modules()
+    from stream_codec import ActivityEvent, get_codec
+    fields = get_codec('fields').encode(ActivityEvent.from_entry(EVENT))
+    r.delete('bench:activity')
+    return lambda rng: r.xadd('bench:activity', fields, maxlen=size, approximate=True)
+
+@workload('stream.read_ack', "read_batch (XREADGROUP COUNT 10, batch decode) plus ack_batch", raw=True)
+def stream_read_ack(r, size):
+    stream_modules()
+    from stream_codec import ActivityEvent, get_codec
+    from stream_batches import read_batch, ack_batch
+    fields = get_codec('fields').encode(ActivityEvent.from_entry(EVENT))
+    r.delete('bench:activity')
+    load_pipelined(r, range(size), lambda p, i: p.xadd('bench:activity', fields))
+    r.xgroup_create('bench:activity', 'bench', id='0')
+    lock = threading.Lock()
+
+    def op(rng):
+        rows, pending = read_batch(r, 'bench', f"c-{threading.get_ident()}", ['bench:activity'], 10, None)
+        if not rows:
+            # Rewind the group so the stream can be consumed again
+            with lock:
+                r.xgroup_setid('bench:activity', 'bench', '0')
+            return
+        ack_batch(r, 'bench', pending)
+    return op
+
+# =================== Runner ===================
+
+def cleanup(r):
+    cursor = 0
+    while True:
+        cursor, keys = r.scan(cursor, match='bench:*', count=1000)
+        if keys:
+            r.unlink(*keys)
+        if cursor == 0:
+            break
+    for index in ('idx:bench', 'idx:bench_vec'):
+        try:
+            r.execute_command("FT.DROPINDEX", index)
+        except redis.exceptions.ResponseError:
+            pass
+
+def run_workload(r, name, concurrency=1, duration=5.0, size=10000, warmup=1.0, seed=1, raw=None):
+    """
+    Runs one workload with `concurrency` threads for `duration` seconds after
+    `warmup` seconds of unmeasured load. Returns a JSON-serializable result.
+    raw is the non-decoding client for raw=True workloads (default: r).
+    """
+    w = WORKLOADS[name]
+    op = w.setup(raw if w.raw and raw is not None else r, size)
+    histograms = [LatencyHistogram() for _ in range(concurrency)]
+    counters = [[0, 0] for _ in range(concurrency)]  # ops, errors
+    start_at = time.perf_counter() + warmup
+    stop_at = start_at + duration
+    first_error = []
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        hist, counts = histograms[index], counters[index]
+        perf_counter = time.perf_counter
+        while True:
+            t0 = perf_counter()
+            if t0 >= stop_at:
+                return
+            try:
+                op(rng)
+            except redis.exceptions.RedisError as e:
+                if t0 >= start_at:
+                    counts[1] += 1
+                if not first_error:
+                    first_error.append(str(e))
+                continue
+            if t0 >= start_at:
+                hist.record(perf_counter() - t0)
+                counts[0] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    merged = LatencyHistogram()
+    for hist in histograms:
+        merged.merge(hist)
+    ops = sum(c[0] for c in counters)
+    return {
+        'workload': name,
+        'description': WORKLOADS[name].description,
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'size': size,
+        'ops': ops,
+        'errors': sum(c[1] for c in counters),
+        'first_error': first_error[0] if first_error else None,
+        'ops_per_sec': ops / duration,
+        'latency_ms': merged.summary_ms(),
+    }
+
+def connect(args):
+    """
+    Returns (r, raw): a decoding client and a bytes client on the same server.
+    """
+    if args.fake:
+        # In-process stand-in; has no RediSearch, so search.* and vector.* are skipped
+        import fakeredis
+        server = fakeredis.FakeServer()
+        return fakeredis.FakeRedis(server=server, decode_responses=True), fakeredis.FakeRedis(server=server)
+    return (get_client(max_connections=args.concurrency + 4),
+            get_client(decode_responses=False, max_connections=args.concurrency + 4))
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark runner for the workshop's Redis operations")
+    parser.add_argument('--workloads', default='all',
+                        help="comma-separated workload names or prefixes such as 'hash' (default: all)")
+    parser.add_argument('--concurrency', type=int, default=4, help="client threads (default: 4)")
+    parser.add_argument('--duration', type=float, default=5.0, help="measured seconds per workload (default: 5)")
+    parser.add_argument('--warmup', type=float, default=1.0, help="unmeasured seconds per workload (default: 1)")
+    parser.add_argument('--size', type=int, default=10000, help="dataset size per workload (default: 10000)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default=None, help="write results as JSON to this file (default: stdout)")
+    parser.add_argument('--fake', action='store_true', help="run against fakeredis instead of a server")
+    parser.add_argument('--list', action='store_true', help="list workloads and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, w in WORKLOADS.items():
+            print(f"{name:<18} {w.description}")
+        return
+
+    selected = []
+    for pattern in args.workloads.split(','):
+        pattern = pattern.strip()
+        matches = [n for n in WORKLOADS if pattern == 'all' or n == pattern or n.startswith(pattern + '.')]
+        if not matches:
+            parser.error(f"unknown workload '{pattern}' (see --list)")
+        selected.extend(m for m in matches if m not in selected)
+
+    r, raw = connect(args)
+    results = []
+    for name in selected:
+        print(f"Running {name} (concurrency {args.concurrency}, {args.duration}s)...", file=sys.stderr)
+        try:
+            res = run_workload(r, name, args.concurrency, args.duration, args.size, args.warmup, args.seed, raw)
+        except (redis.exceptions.ResponseError, ImportError) as e:
+            # Typically a missing module (RedisJSON / RediSearch) on the target server
+            print(f"  skipped: {e}", file=sys.stderr)
+            results.append({'workload': name, 'skipped': str(e)})
+            continue
+        finally:
+            cleanup(r)
+        lat = res['latency_ms']
+        print(f"  {res['ops_per_sec']:,.0f} ops/s  p50 {lat['p50']:.3f}  p95 {lat['p95']:.3f}  "
+              f"p99 {lat['p99']:.3f}  p999 {lat['p999']:.3f} ms  errors {res['errors']}", file=sys.stderr)
+        results.append(res)
+
+    report = {'config': {k: v for k, v in vars(args).items() if k != 'list'}, 'results': results,
+              'pool': pool_metrics(r), 'raw_pool': pool_metrics(raw)}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()